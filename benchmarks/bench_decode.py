@@ -0,0 +1,81 @@
+"""
+Decode throughput of large synthetic atom pages with each available JSON backend, and memory/time of
+formatting the atoms as dicts vs. compact records (`FriendlyAuthenticator(records=True)`).
+
+Usage: python bench_decode.py [--atoms 200000] [--page-size 1000]
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from umls_api_tool.decode import available_backends, get_decoder
+from umls_api_tool.records import Atom
+
+
+def make_pages(n_atoms, page_size):
+    """Response bodies (bytes) as returned by content/.../atoms"""
+    pages = []
+    for start in range(0, n_atoms, page_size):
+        pages.append(json.dumps({
+            'pageSize': page_size, 'pageNumber': start // page_size + 1, 'pageCount': -(-n_atoms // page_size),
+            'result': [{
+                'classType': 'Atom', 'ui': f'A{i:08d}', 'suppressible': False, 'obsolete': False,
+                'rootSource': 'SNOMEDCT_US', 'termType': 'PT', 'code': f'{i}', 'language': 'ENG',
+                'name': f'Synthetic concept name number {i} with some words', 'concept': f'C{i // 10:07d}',
+            } for i in range(start, min(start + page_size, n_atoms))],
+        }).encode('utf8'))
+    return pages
+
+
+def bench_decode(pages):
+    total_mb = sum(len(page) for page in pages) / 1e6
+    start = time.perf_counter()
+    for page in pages:
+        json.loads(page.decode('utf8'))
+    elapsed = time.perf_counter() - start
+    print(f'{"json (text)":>14}: {total_mb / elapsed:7.1f} MB/s')
+    for backend in available_backends():
+        decode = get_decoder(backend)
+        start = time.perf_counter()
+        for page in pages:
+            decode(page)
+        elapsed = time.perf_counter() - start
+        print(f'{backend + " (bytes)":>14}: {total_mb / elapsed:7.1f} MB/s')
+
+
+def format_atoms(pages, make_atom):
+    decode = get_decoder('auto')
+    atoms = []
+    for page in pages:
+        for atom in decode(page)['result']:
+            atoms.append(make_atom(cui=atom['concept'], aui=atom['ui'], name=atom['name'],
+                                   source=atom['rootSource'], termtype=atom['termType']))
+    return atoms
+
+
+def bench_records(pages):
+    for label, make_atom in (('dict', dict), ('Atom', Atom)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        atoms = format_atoms(pages, make_atom)
+        elapsed = time.perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f'{label:>14}: {len(atoms) / elapsed:10.0f} atoms/s, {current / 1e6:6.1f} MB retained,'
+              f' {peak / 1e6:6.1f} MB peak')
+        del atoms
+
+
+def main(n_atoms=200_000, page_size=1000):
+    pages = make_pages(n_atoms, page_size)
+    print(f'{len(pages)} pages, {sum(len(page) for page in pages) / 1e6:.1f} MB')
+    bench_decode(pages)
+    bench_records(pages)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--atoms', dest='n_atoms', type=int, default=200_000)
+    parser.add_argument('--page-size', dest='page_size', type=int, default=1000)
+    main(**vars(parser.parse_args()))
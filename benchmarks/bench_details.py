@@ -0,0 +1,44 @@
+"""
+Compare latency of FriendlyAuthenticator.get_details_for_cui with and without concurrent sub-requests,
+and throughput of get_details_for_cuis, against a stub server with simulated network latency.
+
+Usage: python bench_details.py [--cuis 50] [--latency 0.05]
+"""
+import argparse
+import time
+
+from umls_api_tool.auth import FriendlyAuthenticator
+from umls_api_tool.request_limiter import ForgetfulRequestLimiter
+
+from stub_server import StubUtsServer
+
+
+def make_auth(server, max_workers):
+    return FriendlyAuthenticator.from_apikey(
+        'stub', request_limiter=ForgetfulRequestLimiter(), max_workers=max_workers,
+        base_url=server.base_url, auth_url=server.auth_url,
+    )
+
+
+def main(n_cuis=50, latency=0.05):
+    cuis = [f'C{i:07d}' for i in range(n_cuis)]
+    with StubUtsServer(latency=latency) as server:
+        for label, max_workers in [('sequential', 0), ('concurrent', 4)]:
+            with make_auth(server, max_workers) as auth:
+                start = time.perf_counter()
+                for cui in cuis:
+                    auth.get_details_for_cui(cui)
+                elapsed = time.perf_counter() - start
+            print(f'{label:>12}: {1000 * elapsed / n_cuis:7.1f} ms/CUI')
+        with make_auth(server, 4) as auth:
+            start = time.perf_counter()
+            list(auth.get_details_for_cuis(cuis, workers=8))
+            elapsed = time.perf_counter() - start
+        print(f'{"batch (8)":>12}: {1000 * elapsed / n_cuis:7.1f} ms/CUI')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cuis', dest='n_cuis', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.05)
+    main(**vars(parser.parse_args()))
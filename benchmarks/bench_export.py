@@ -0,0 +1,85 @@
+"""
+Write time, peak memory, file size and read-back time of synthetic atom and details records with each
+export sink (csv, jsonl, and parquet/arrow if pyarrow is installed).
+
+Usage: python bench_export.py [--records 1000000] [--batch-size 10000]
+"""
+import argparse
+import csv
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from umls_api_tool.export import FIELDS, SINKS, ArrowSink, open_sink
+from umls_api_tool.records import Atom, Details
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+SEMTYPES = ['Disease or Syndrome', 'Finding', 'Pharmacologic Substance', 'Organic Chemical', 'Body Part']
+
+
+def make_records(kind, n_records):
+    for i in range(n_records):
+        if kind == 'atoms':
+            yield Atom(cui=f'C{i // 10:07d}', aui=f'A{i:08d}', name=f'Synthetic concept name number {i}',
+                       source='SNOMEDCT_US', termtype='PT')
+        else:
+            yield Details(cui=f'C{i:07d}', name=f'Synthetic concept {i}', definition=f'Definition of concept {i}',
+                          source='MSH', semtypes=SEMTYPES[:i % len(SEMTYPES) + 1])
+
+
+def read_back(output_format, path):
+    if output_format == 'csv':
+        with open(path, newline='', encoding='utf8') as fh:
+            return sum(1 for _ in csv.DictReader(fh))
+    elif output_format == 'jsonl':
+        with open(path, encoding='utf8') as fh:
+            return sum(1 for line in fh if json.loads(line))
+    elif output_format == 'parquet':
+        return pyarrow.parquet.read_table(path).num_rows
+    return pyarrow.ipc.open_file(path).read_all().num_rows
+
+
+def bench_sink(output_format, kind, n_records, batch_size):
+    with tempfile.TemporaryDirectory() as outdir:
+        tracemalloc.start()
+        start = time.perf_counter()
+        if issubclass(SINKS[output_format], ArrowSink):
+            sink_class = SINKS[output_format]
+            sink = sink_class(os.path.join(outdir, f'cui-{kind}.{sink_class.extension}'), FIELDS[kind],
+                              batch_size=batch_size)
+        else:
+            sink = open_sink(output_format, outdir, kind)
+        with sink:
+            sink.write_all(make_records(kind, n_records))
+        write_elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        size = os.path.getsize(sink.path)
+        start = time.perf_counter()
+        assert read_back(output_format, sink.path) == n_records
+        read_elapsed = time.perf_counter() - start
+    print(f'{kind:>8} {output_format:>8}: write {n_records / write_elapsed:10.0f} records/s,'
+          f' {peak / 1e6:6.1f} MB peak, {size / 1e6:7.1f} MB on disk, read {read_elapsed:6.2f}s')
+
+
+def main(n_records=1_000_000, batch_size=10_000):
+    formats = [output_format for output_format in SINKS
+               if pyarrow is not None or not issubclass(SINKS[output_format], ArrowSink)]
+    for kind in ('atoms', 'details'):
+        for output_format in formats:
+            bench_sink(output_format, kind, n_records, batch_size)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--records', dest='n_records', type=int, default=1_000_000)
+    parser.add_argument('--batch-size', dest='batch_size', type=int, default=10_000,
+                        help='Records per batch (row group) in parquet/arrow')
+    main(**vars(parser.parse_args()))
@@ -0,0 +1,44 @@
+"""
+Two-hop expansion of a set of CUIs against a stub server with simulated network latency: the first
+traversal retrieves relations concurrently; a repeat traversal from a saved graph makes no requests.
+
+Usage: python bench_graph.py [--cuis 10] [--latency 0.01] [--workers 8]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from umls_api_tool.auth import FriendlyAuthenticator
+from umls_api_tool.graph import ConceptGraph
+from umls_api_tool.memo import LruMemo
+from umls_api_tool.request_limiter import TokenBucketRequestLimiter
+
+from stub_server import StubUtsServer
+
+
+def main(n_cuis=10, latency=0.01, workers=8):
+    cuis = [f'C{i:07d}' for i in range(100, 100 + n_cuis)]
+    path = os.path.join(tempfile.mkdtemp(), 'graph.pkl')
+    with StubUtsServer(items_per_cui=30, latency=latency) as server:
+        for label, n_workers, graph in (('sequential', 1, ConceptGraph()), ('concurrent', workers, ConceptGraph()),
+                                        ('saved', workers, None)):
+            graph = ConceptGraph.load(path) if graph is None else graph
+            with FriendlyAuthenticator.from_apikey(
+                    'stub', '2022AA', TokenBucketRequestLimiter(requests_per_second=1000), related_memo=LruMemo(),
+                    base_url=server.base_url, auth_url=server.auth_url) as auth:
+                start_requests = server.request_count
+                start = time.perf_counter()
+                depths = graph.expand(cuis, depth=2, auth=auth, workers=n_workers)
+                elapsed = time.perf_counter() - start
+            print(f'{label:>10}: {elapsed:6.2f}s, {len(depths)} concepts, {graph.n_edges} edges,'
+                  f' {server.request_count - start_requests} requests')
+            graph.save(path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cuis', dest='n_cuis', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.01)
+    parser.add_argument('--workers', type=int, default=8)
+    main(**vars(parser.parse_args()))
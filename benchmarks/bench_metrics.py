@@ -0,0 +1,51 @@
+"""
+Overhead of instrumentation: retrieve details for CUIs from the stub server with and without `Metrics`,
+then show where the time went.
+
+Usage: python bench_metrics.py [--cuis 200] [--prometheus]
+"""
+import argparse
+import time
+
+from umls_api_tool.auth import FriendlyAuthenticator
+from umls_api_tool.metrics import Metrics
+from umls_api_tool.request_limiter import TokenBucketRequestLimiter
+
+from stub_server import StubUtsServer
+
+
+def run(server, n_cuis, metrics):
+    start = time.perf_counter()
+    with FriendlyAuthenticator.from_apikey(
+            'stub', '2022AA', TokenBucketRequestLimiter(requests_per_second=10_000), metrics=metrics,
+            base_url=server.base_url, auth_url=server.auth_url) as auth:
+        for i in range(n_cuis):
+            auth.get_details_for_cui(f'C{i:07d}')
+            list(auth.get_relations_for_cui(f'C{i:07d}'))
+    return time.perf_counter() - start
+
+
+def main(n_cuis=200, prometheus=False):
+    with StubUtsServer(items_per_cui=30) as server:
+        run(server, 10, None)  # warm up
+        disabled = run(server, n_cuis, None)
+        metrics = Metrics()
+        enabled = run(server, n_cuis, metrics)
+    print(f'metrics disabled: {disabled:.2f}s')
+    print(f' metrics enabled: {enabled:.2f}s ({(enabled / disabled - 1) * 100:+.1f}%)')
+    if prometheus:
+        print(metrics.to_prometheus())
+        return
+    snapshot = metrics.snapshot()
+    for endpoint, phases in sorted(snapshot['histograms'].items()):
+        summary = ', '.join(f'{phase} {h["sum"] / h["count"] * 1000:.2f}ms' for phase, h in phases.items())
+        print(f'{endpoint:>22}: {summary}')
+    for endpoint, counters in sorted(snapshot['counters'].items()):
+        print(f'{endpoint:>22}: {counters}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cuis', dest='n_cuis', type=int, default=200)
+    parser.add_argument('--prometheus', action='store_true', default=False)
+    main(**vars(parser.parse_args()))
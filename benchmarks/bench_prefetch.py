@@ -0,0 +1,42 @@
+"""
+Enrich CUIs one at a time (as a simple consumer would) against a stub server with simulated latency,
+with and without `FriendlyAuthenticator.prefetch` retrieving upcoming CUIs in the background.
+
+Usage: python bench_prefetch.py [--cuis 50] [--latency 0.01] [--workers 8]
+"""
+import argparse
+import time
+
+from umls_api_tool.auth import FriendlyAuthenticator
+from umls_api_tool.enrich import enrich_cui
+from umls_api_tool.memo import LruMemo
+from umls_api_tool.request_limiter import TokenBucketRequestLimiter
+
+from stub_server import StubUtsServer
+
+KINDS = ('details', 'definitions', 'atoms', 'relations')
+
+
+def main(n_cuis=50, latency=0.01, workers=8):
+    cuis = [f'C{i:07d}' for i in range(n_cuis)]
+    with StubUtsServer(items_per_cui=30, latency=latency) as server:
+        for label in ('on demand', 'prefetch'):
+            with FriendlyAuthenticator.from_apikey(
+                    'stub', '2022AA', TokenBucketRequestLimiter(requests_per_second=1000), related_memo=LruMemo(),
+                    max_workers=workers, base_url=server.base_url, auth_url=server.auth_url) as auth:
+                start = time.perf_counter()
+                source = auth.prefetch(cuis, KINDS, max_ahead=2 * workers) if label == 'prefetch' else cuis
+                for cui in source:
+                    enrich_cui(auth, cui, KINDS)
+                elapsed = time.perf_counter() - start
+                cache = auth.auth.auth.cache
+                cache_stats = f', cache {cache.stats()}' if cache is not None else ''
+            print(f'{label:>10}: {1000 * elapsed / n_cuis:7.1f} ms/CUI{cache_stats}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cuis', dest='n_cuis', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.01)
+    parser.add_argument('--workers', type=int, default=8)
+    main(**vars(parser.parse_args()))
@@ -0,0 +1,38 @@
+"""
+Enrich CUIs from the stub server with worker processes sharing one rate budget per API key, and check
+that the combined request rate for each key stays within its budget.
+
+Usage: python bench_processes.py [--cuis 200] [--processes 4] [--keys 2] [--rps 50]
+"""
+import argparse
+import time
+
+from umls_api_tool.parallel import enrich_cuis_parallel
+
+from stub_server import StubUtsServer
+
+
+def main(n_cuis=200, processes=4, n_keys=2, rps=50.0):
+    apikeys = [f'key{i}' for i in range(n_keys)]
+    cuis = [f'C{i:07d}' for i in range(n_cuis)]
+    with StubUtsServer(items_per_cui=20, latency=0.002) as server:
+        start = time.perf_counter()
+        results = list(enrich_cuis_parallel(
+            apikeys, cuis, '2022AA', kinds=('details', 'atoms'), processes=processes, requests_per_second=rps,
+            base_url=server.base_url, auth_url=server.auth_url,
+        ))
+        elapsed = time.perf_counter() - start
+        n_requests = server.request_count + server._ticket_count
+    assert [cui for cui, _ in results] == cuis, 'results out of order'
+    n_failed = sum(records is None for _, records in results)
+    print(f'{n_cuis} CUIs ({n_failed} failed) with {processes} processes and {n_keys} keys in {elapsed:.2f}s')
+    print(f'{n_requests / elapsed:.1f} requests/s overall; budget {rps * n_keys:.0f}/s ({rps:.0f}/s per key)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cuis', dest='n_cuis', type=int, default=200)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--keys', dest='n_keys', type=int, default=2)
+    parser.add_argument('--rps', type=float, default=50.0)
+    main(**vars(parser.parse_args()))
@@ -0,0 +1,69 @@
+"""
+Compare request limiters against the UTS limit of 20 requests/second with several threads (real clock).
+
+The limits themselves are verified with a fake clock in tests/test_request_limiter.py.
+
+Usage: python bench_rate_limiter.py [--requests 200] [--threads 4]
+"""
+import argparse
+import threading
+import time
+from bisect import bisect_left
+
+from umls_api_tool.request_limiter import (
+    MAX_REQUESTS_PER_SECOND, EndpointRequestLimiter, SleepyRequestLimiter, TimelyRequestLimiter,
+    TokenBucketRequestLimiter,
+)
+
+
+def max_in_window(timestamps, window=1.0):
+    """Largest number of requests sent within any half-open window of `window` seconds"""
+    timestamps = sorted(timestamps)
+    return max(
+        i - bisect_left(timestamps, ts - window + 1e-9) + 1
+        for i, ts in enumerate(timestamps)
+    )
+
+
+def run_threads(worker, endpoints):
+    threads = [threading.Thread(target=worker, args=(endpoint,)) for endpoint in endpoints]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def real_clock_run(limiter, n_requests, endpoints, label):
+    sent = []
+    lock = threading.Lock()
+
+    def worker(endpoint):
+        for _ in range(n_requests // len(endpoints)):
+            limiter.ready(endpoint)
+            with lock:
+                sent.append(time.monotonic())
+
+    start = time.monotonic()
+    run_threads(worker, endpoints)
+    elapsed = time.monotonic() - start
+    print(f'{label:>24}: {len(sent) / elapsed:6.2f} req/s; max in any 1s window: {max_in_window(sent)}')
+
+
+def main(n_requests=200, n_threads=4):
+    mixed = ['ticket'] * n_threads + ['content'] * n_threads
+    print(f'Real clock ({n_threads} threads; limit: {MAX_REQUESTS_PER_SECOND} req/s):')
+    for label, limiter in [
+        ('token bucket', TokenBucketRequestLimiter()),
+        ('timely', TimelyRequestLimiter()),
+        ('sleepy', SleepyRequestLimiter()),
+    ]:
+        real_clock_run(limiter, n_requests, [None] * n_threads, label)
+    real_clock_run(EndpointRequestLimiter(budgets={'ticket': 5}), n_requests, mixed,
+                   f'endpoint ({n_threads}+{n_threads} thr)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', dest='n_requests', type=int, default=200)
+    parser.add_argument('--threads', dest='n_threads', type=int, default=4)
+    main(**vars(parser.parse_args()))
@@ -0,0 +1,69 @@
+"""
+Caching the 'current' release across a release change, with a persistent SqliteCache.
+
+Each strategy runs three sessions over the same CUIs: two with release A, then (after the stub server
+starts reporting release B as current) a third. Reported per session are requests sent and cache hits;
+hits in the third session are stale (cached for release A) unless they were cached for release B.
+
+    current_ttl: 'current' responses cached as 'current' and expire after `current_ttl` (the default)
+    no cache: 'current' responses are not cached (current_ttl=0)
+    tracker: 'current' is resolved to the concrete release (`umls_api_tool.releases.ReleaseTracker`)
+
+Usage: python bench_release.py [--cuis 200] [--latency 0.005]
+"""
+import argparse
+import functools
+import os
+import tempfile
+
+from umls_api_tool.auth import FriendlyAuthenticator
+from umls_api_tool.cache import SqliteCache
+from umls_api_tool.memo import LruMemo
+from umls_api_tool.releases import INVALIDATE, ReleaseTracker
+from umls_api_tool.request_limiter import TokenBucketRequestLimiter
+
+from stub_server import StubUtsServer
+
+STRATEGIES = {
+    'current_ttl': ({}, None),
+    'no cache': ({'current_ttl': 0}, None),
+    'tracker': ({}, functools.partial(ReleaseTracker, on_change=INVALIDATE)),
+}
+
+
+def run_session(server, cache_path, cuis, cache_kwargs, release_tracker):
+    start_requests = server.request_count
+    cache = SqliteCache(cache_path, **cache_kwargs)
+    with FriendlyAuthenticator.from_apikey(
+            'stub', 'current', TokenBucketRequestLimiter(requests_per_second=10_000), related_memo=LruMemo(),
+            cache=cache, release_tracker=release_tracker, base_url=server.base_url, auth_url=server.auth_url) as auth:
+        for cui in cuis:
+            auth.get_details_for_cui(cui)
+            list(auth.get_atoms_for_cui(cui))
+    cache.close()
+    return server.request_count - start_requests, cache.hits
+
+
+def main(n_cuis=200, latency=0.005):
+    cuis = [f'C{i:07d}' for i in range(n_cuis)]
+    for strategy, (cache_kwargs, release_tracker) in STRATEGIES.items():
+        with StubUtsServer(items_per_cui=20, latency=latency, current_release='2022AA') as server, \
+                tempfile.TemporaryDirectory() as tmpdir:
+            cache_path = os.path.join(tmpdir, 'cache.db')
+            sessions = []
+            for release in ('2022AA', '2022AA', '2022AB'):
+                server.current_release = release
+                sessions.append(run_session(server, cache_path, cuis, cache_kwargs, release_tracker))
+        requests_2, hits_2 = sessions[1]
+        requests_3, hits_3 = sessions[2]
+        stale = hits_3 if release_tracker is None else 0  # tracker only hits entries cached for 2022AB
+        print(f'{strategy:>12}: first session {sessions[0][0]:5d} requests; same release {requests_2:5d} requests,'
+              f' {hits_2:5d} hits; new release {requests_3:5d} requests, {stale:5d} stale responses')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cuis', dest='n_cuis', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='Seconds the stub server waits before each response')
+    main(**vars(parser.parse_args()))
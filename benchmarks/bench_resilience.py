@@ -0,0 +1,40 @@
+"""
+Retrieve atoms for many CUIs from a stub server which injects transient failures
+(429 with Retry-After, 502, 503, connection resets), and check that every CUI is retrieved completely.
+
+Usage: python bench_resilience.py [--cuis 200] [--fault-rate 0.2]
+"""
+import argparse
+import time
+
+from umls_api_tool.auth import BasicAuthenticator
+from umls_api_tool.request_limiter import TokenBucketRequestLimiter
+from umls_api_tool.retry import RetryPolicy
+
+from stub_server import StubUtsServer
+
+
+def main(n_cuis=200, fault_rate=0.2, items_per_cui=60):
+    with StubUtsServer(items_per_cui=items_per_cui, fault_rate=fault_rate) as server:
+        auth = BasicAuthenticator(
+            'stub', TokenBucketRequestLimiter(requests_per_second=1000),
+            retry_policy=RetryPolicy(max_retries=8, backoff=0.01),
+            base_url=server.base_url, auth_url=server.auth_url,
+        )
+        start = time.perf_counter()
+        incomplete = 0
+        with auth:
+            for i in range(n_cuis):
+                data = auth.get('content', '2022AA', 'CUI', f'C{i:07d}', 'atoms')
+                if len(data['result']) != items_per_cui:
+                    incomplete += 1
+        elapsed = time.perf_counter() - start
+    print(f'Injected faults: {server.fault_counts}')
+    print(f'{n_cuis - incomplete}/{n_cuis} CUIs complete in {elapsed:.1f}s')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cuis', dest='n_cuis', type=int, default=200)
+    parser.add_argument('--fault-rate', dest='fault_rate', type=float, default=0.2)
+    main(**vars(parser.parse_args()))
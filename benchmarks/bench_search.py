@@ -0,0 +1,40 @@
+"""
+Wall time of searching many terms in several vocabularies against a stub server with simulated network
+latency: one search at a time (as in examples/get_search_terms.py) vs. `FriendlyAuthenticator.search_many`.
+
+Usage: python bench_search.py [--terms 20] [--sabs 3] [--latency 0.02] [--workers 8] [--top-k 10]
+"""
+import argparse
+import time
+
+from umls_api_tool.auth import FriendlyAuthenticator
+from umls_api_tool.request_limiter import TokenBucketRequestLimiter
+
+from stub_server import StubUtsServer
+
+
+def main(n_terms=20, n_sabs=3, latency=0.02, workers=8, top_k=10):
+    terms = [f'term {i}' for i in range(n_terms)]
+    sabs = ['MSH', 'SNOMEDCT_US', 'ICD10CM', 'MEDLINEPLUS', 'RXNORM'][:n_sabs]
+    with StubUtsServer(items_per_cui=40, latency=latency) as server:
+        for label, n_workers in (('serial', 1), (f'{workers} workers', workers)):
+            with FriendlyAuthenticator.from_apikey(
+                    'stub', '2022AA', TokenBucketRequestLimiter(requests_per_second=1000), max_workers=n_workers,
+                    base_url=server.base_url, auth_url=server.auth_url) as auth:
+                for k in (None, top_k):
+                    start_requests = server.request_count
+                    start = time.perf_counter()
+                    concepts = auth.search_many(terms, sabs, top_k=k)
+                    elapsed = time.perf_counter() - start
+                    print(f'{label:>10}, top_k={str(k):>4}: {elapsed:6.2f}s, {len(concepts):4d} concepts,'
+                          f' {server.request_count - start_requests:4d} requests')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--terms', dest='n_terms', type=int, default=20)
+    parser.add_argument('--sabs', dest='n_sabs', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--top-k', dest='top_k', type=int, default=10)
+    main(**vars(parser.parse_args()))
@@ -0,0 +1,50 @@
+"""
+Measure queries per second of the local TermIndex on a synthetic vocabulary.
+
+Usage: python bench_search_index.py [--names 200000] [--queries 2000]
+"""
+import argparse
+import random
+import time
+
+from umls_api_tool.search_index import TermIndex
+
+WORDS = [
+    'acute', 'chronic', 'pain', 'fever', 'heart', 'attack', 'infarction', 'myocardial', 'renal', 'failure',
+    'disease', 'syndrome', 'of', 'the', 'left', 'right', 'lower', 'upper', 'limb', 'fracture', 'diabetes',
+    'mellitus', 'type', 'insulin', 'resistance', 'hypertension', 'pulmonary', 'embolism', 'neoplasm', 'malignant',
+]
+SOURCES = ['MSH', 'SNOMEDCT_US', 'NCI', 'ICD10CM', 'MTH']
+
+
+def build_index(n_names, rng):
+    index = TermIndex()
+    for i in range(n_names):
+        words = rng.sample(WORDS, rng.randint(1, 4)) + [f'x{i % 5000}']
+        index.add(f'C{i // 3:07d}', ' '.join(words), rng.choice(SOURCES))
+    index.freeze()
+    return index
+
+
+def main(n_names=200_000, n_queries=2000, seed=0):
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    index = build_index(n_names, rng)
+    print(f'Built index of {len(index)} names in {time.perf_counter() - start:.1f}s')
+    terms = [' '.join(rng.sample(WORDS, 2)) + f' x{rng.randrange(5000)}' for _ in range(n_queries)]
+    for search_type, sabs in [('words', None), ('words', 'MSH'), ('exact', None), ('rightTruncation', None),
+                              ('normalizedString', None), ('approximate', None)]:
+        queries = [term.split()[0][:4] for term in terms] if search_type == 'rightTruncation' else terms
+        start = time.perf_counter()
+        n_results = sum(len(list(index.search(term, sabs=sabs, searchType=search_type, max_results=25)))
+                        for term in queries)
+        elapsed = time.perf_counter() - start
+        print(f'{search_type:>16} sabs={str(sabs):<5}: {n_queries / elapsed:9.0f} queries/s'
+              f' ({1e6 * elapsed / n_queries:7.1f} us/query; {n_results / n_queries:.1f} results/query)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--names', dest='n_names', type=int, default=200_000)
+    parser.add_argument('--queries', dest='n_queries', type=int, default=2000)
+    main(**vars(parser.parse_args()))
@@ -0,0 +1,36 @@
+"""
+Compare requests per second with and without a pooled keep-alive session.
+
+Usage: python bench_session_pool.py [--requests 500]
+"""
+import argparse
+import time
+
+from umls_api_tool.auth import BasicAuthenticator
+from umls_api_tool.request_limiter import ForgetfulRequestLimiter
+
+from stub_server import StubUtsServer
+
+
+def run(server, n_requests, pool_size):
+    auth = BasicAuthenticator('stub', ForgetfulRequestLimiter(), pool_size=pool_size,
+                              base_url=server.base_url, auth_url=server.auth_url)
+    with auth:
+        start = time.perf_counter()
+        for i in range(n_requests):
+            auth.get('content', 'current', 'CUI', f'C{i:07d}')
+        elapsed = time.perf_counter() - start
+    return n_requests / elapsed
+
+
+def main(n_requests=500):
+    with StubUtsServer() as server:
+        for label, pool_size in [('no pool', 0), ('pooled', 10)]:
+            rps = run(server, n_requests, pool_size)
+            print(f'{label:>8}: {rps:8.1f} req/s (each includes a service ticket request)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', dest='n_requests', type=int, default=500)
+    main(**vars(parser.parse_args()))
@@ -0,0 +1,68 @@
+"""
+Many threads (or coroutines) request atoms for the same, overlapping set of CUIs at once, as happens
+when workers enrich overlapping CUI lists. Compare the number of service tickets used with and without
+single-flight deduplication.
+
+Usage: python bench_singleflight.py [--cuis 20] [--callers 8]
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from umls_api_tool.auth import BasicAuthenticator
+from umls_api_tool.request_limiter import TokenBucketRequestLimiter
+
+from stub_server import StubUtsServer
+
+
+def run_threaded(server, n_cuis, n_callers, single_flight):
+    auth = BasicAuthenticator(
+        'stub', TokenBucketRequestLimiter(requests_per_second=1000), single_flight=single_flight,
+        base_url=server.base_url, auth_url=server.auth_url,
+    )
+    start_tickets = server._ticket_count
+    start = time.perf_counter()
+    with auth, ThreadPoolExecutor(max_workers=n_callers) as pool:
+        jobs = [f'C{i:07d}' for i in range(n_cuis) for _ in range(n_callers)]
+        list(pool.map(lambda cui: auth.get('content', '2022AA', 'CUI', cui, 'atoms'), jobs))
+    elapsed = time.perf_counter() - start
+    stats = auth.single_flight.stats() if auth.single_flight else {}
+    return server._ticket_count - start_tickets, elapsed, stats
+
+
+def run_async(server, n_cuis, n_callers):
+    from umls_api_tool.async_auth import AsyncBasicAuthenticator
+
+    async def run():
+        async with AsyncBasicAuthenticator(
+                'stub', TokenBucketRequestLimiter(requests_per_second=1000),
+                base_url=server.base_url, auth_url=server.auth_url) as auth:
+            jobs = [f'C{i:07d}' for i in range(n_cuis) for _ in range(n_callers)]
+            await asyncio.gather(*(auth.get('content', '2022AA', 'CUI', cui, 'atoms') for cui in jobs))
+            return auth.single_flight.stats()
+
+    start_tickets = server._ticket_count
+    start = time.perf_counter()
+    stats = asyncio.run(run())
+    return server._ticket_count - start_tickets, time.perf_counter() - start, stats
+
+
+def main(n_cuis=20, n_callers=8):
+    with StubUtsServer(items_per_cui=50, latency=0.02) as server:
+        for label, single_flight in (('no dedup', False), ('single-flight', True)):
+            tickets, elapsed, stats = run_threaded(server, n_cuis, n_callers, single_flight)
+            print(f'{label:>14} (threads): {tickets:5d} tickets in {elapsed:.2f}s {stats}')
+        try:
+            tickets, elapsed, stats = run_async(server, n_cuis, n_callers)
+        except ImportError as e:
+            print(f'Skipping asyncio: {e}')
+        else:
+            print(f'{"single-flight":>14} (asyncio): {tickets:5d} tickets in {elapsed:.2f}s {stats}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cuis', dest='n_cuis', type=int, default=20)
+    parser.add_argument('--callers', dest='n_callers', type=int, default=8)
+    main(**vars(parser.parse_args()))
@@ -0,0 +1,82 @@
+"""
+Startup cost of short-lived processes: import time, authenticator construction, and latency of the first
+call (answered by the stub server, or from a warm SqliteCache without any requests), each measured in a
+fresh interpreter. Also the wall time of `umls-api-tool --help`.
+
+Usage: python bench_startup.py [--repeat 10] [--latency 0.005]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from stub_server import StubUtsServer
+
+SRC = str(Path(__file__).resolve().parent.parent / 'src')
+
+CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+from umls_api_tool.auth import FriendlyAuthenticator
+imported = time.perf_counter()
+kwargs = {'base_url': sys.argv[1], 'auth_url': sys.argv[2]}
+if sys.argv[3]:
+    from umls_api_tool.cache import SqliteCache
+    kwargs['cache'] = SqliteCache(sys.argv[3])
+auth = FriendlyAuthenticator.from_apikey('stub', '2022AA', **kwargs)
+constructed = time.perf_counter()
+auth.get_details_for_cui('C0000001')
+first = time.perf_counter()
+auth.close()
+print(json.dumps({'import': imported - start, 'construct': constructed - imported, 'first_call': first - constructed}))
+'''
+
+
+def run_python(*args):
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, (SRC, os.environ.get('PYTHONPATH'))))}
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, *args], capture_output=True, text=True, env=env, check=True)
+    return time.perf_counter() - start, result.stdout
+
+
+def wall_time(args, repeat):
+    return statistics.median(run_python(*args)[0] for _ in range(repeat))
+
+
+def child_times(server, cache, repeat):
+    runs = [json.loads(run_python('-c', CHILD, server.base_url, server.auth_url, cache or '')[1])
+            for _ in range(repeat)]
+    return {key: statistics.median(run[key] for run in runs) for key in ('import', 'construct', 'first_call')}
+
+
+def main(repeat=10, latency=0.005):
+    baseline = wall_time(['-c', 'pass'], repeat)
+    print(f'{"interpreter":>28}: {1000 * baseline:7.1f}ms')
+    for module in ('umls_api_tool.auth', 'umls_api_tool.enrich', 'umls_api_tool.async_auth'):
+        elapsed = wall_time(['-c', f'import {module}'], repeat)
+        print(f'{"import " + module:>28}: {1000 * (elapsed - baseline):7.1f}ms (excluding interpreter)')
+    elapsed = wall_time(['-m', 'umls_api_tool.cli', '--help'], repeat)
+    print(f'{"umls-api-tool --help":>28}: {1000 * (elapsed - baseline):7.1f}ms (excluding interpreter)')
+    with StubUtsServer(items_per_cui=5, latency=latency) as server, tempfile.TemporaryDirectory() as tmpdir:
+        cache = os.path.join(tmpdir, 'cache.db')
+        for label, cache_path in (('no cache', None), ('warm cache', cache)):
+            if cache_path:
+                child_times(server, cache_path, 1)  # fill cache
+            start_requests = server.request_count
+            times = child_times(server, cache_path, repeat)
+            n_requests = (server.request_count - start_requests) / repeat
+            print(f'{label:>28}: import {1000 * times["import"]:6.1f}ms, construct {1000 * times["construct"]:6.2f}ms,'
+                  f' first call {1000 * times["first_call"]:6.1f}ms ({n_requests:.0f} requests)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='Seconds the stub server waits before each response')
+    main(**vars(parser.parse_args()))
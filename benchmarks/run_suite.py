@@ -0,0 +1,175 @@
+"""
+Benchmark suite: run the standard workloads against a local `StubUtsServer` and emit JSON.
+
+Each workload processes N CUIs (or codes/terms) one at a time with `FriendlyAuthenticator`, recording
+per-item latency; the best of `--repeat` runs is reported. Compare results between commits with:
+
+    python run_suite.py --output before.json
+    (apply change)
+    python run_suite.py --output after.json --compare before.json
+
+Usage: python run_suite.py [--cuis 100] [--latency 0.005] [--fault-rate 0] [--workloads details atoms ...]
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from umls_api_tool.auth import FriendlyAuthenticator
+from umls_api_tool.memo import LruMemo
+from umls_api_tool.request_limiter import TokenBucketRequestLimiter
+from umls_api_tool.retry import RetryPolicy
+
+from stub_server import StubUtsServer
+
+VERSION = '2022AA'
+
+
+def details(auth, cui):
+    return auth.get_details_for_cui(cui)
+
+
+def atoms(auth, cui):
+    return list(auth.get_atoms_for_cui(cui))
+
+
+def definitions(auth, cui):
+    return list(auth.get_definitions_for_cui(cui))
+
+
+def relations(auth, cui):
+    return list(auth.get_relations_for_cui(cui))
+
+
+def crosswalk(auth, cui):
+    code = cui[1:]  # treat as source code
+    return auth.crosswalk('SNOMEDCT_US', code, 'MSH')
+
+
+def search(auth, cui):
+    return list(auth.search(f'term {cui}'))
+
+
+WORKLOADS = {
+    'details': details,
+    'atoms': atoms,
+    'definitions': definitions,
+    'relations': relations,
+    'crosswalk': crosswalk,
+    'search': search,
+}
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def run_workload(server, workload, cuis, requests_per_second):
+    """Run one workload once; return elapsed seconds and per-item latencies"""
+    func = WORKLOADS[workload]
+    latencies = []
+    start_requests = server.request_count
+    with FriendlyAuthenticator.from_apikey(
+            'stub', VERSION, TokenBucketRequestLimiter(requests_per_second=requests_per_second),
+            related_memo=LruMemo(), retry_policy=RetryPolicy(backoff=0.01),
+            base_url=server.base_url, auth_url=server.auth_url) as auth:
+        start = time.perf_counter()
+        for cui in cuis:
+            item_start = time.perf_counter()
+            func(auth, cui)
+            latencies.append(time.perf_counter() - item_start)
+        elapsed = time.perf_counter() - start
+    return elapsed, latencies, server.request_count - start_requests
+
+
+def summarize(elapsed, latencies, n_requests):
+    return {
+        'items': len(latencies),
+        'seconds': round(elapsed, 4),
+        'items_per_second': round(len(latencies) / elapsed, 2),
+        'requests': n_requests,
+        'latency_ms': {
+            'mean': round(1000 * statistics.mean(latencies), 3),
+            'p50': round(1000 * percentile(latencies, 0.5), 3),
+            'p90': round(1000 * percentile(latencies, 0.9), 3),
+            'p99': round(1000 * percentile(latencies, 0.99), 3),
+            'max': round(1000 * max(latencies), 3),
+        },
+    }
+
+
+def get_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(workloads=tuple(WORKLOADS), n_cuis=100, latency=0.005, fault_rate=0.0, items_per_cui=60,
+              repeat=3, requests_per_second=10_000, seed=0):
+    cuis = [f'C{i:07d}' for i in range(n_cuis)]
+    results = {}
+    with StubUtsServer(items_per_cui=items_per_cui, latency=latency, fault_rate=fault_rate, seed=seed) as server:
+        run_workload(server, 'details', cuis[:5], requests_per_second)  # warm up
+        for workload in workloads:
+            runs = [run_workload(server, workload, cuis, requests_per_second) for _ in range(repeat)]
+            results[workload] = summarize(*min(runs, key=lambda run: run[0]))
+            print(f'{workload:>12}: {results[workload]["items_per_second"]:9.1f} items/s, '
+                  f'p50 {results[workload]["latency_ms"]["p50"]:8.2f}ms', file=sys.stderr)
+    return {
+        'meta': {
+            'commit': get_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'params': {
+                'cuis': n_cuis, 'latency': latency, 'fault_rate': fault_rate, 'items_per_cui': items_per_cui,
+                'repeat': repeat, 'requests_per_second': requests_per_second, 'seed': seed,
+            },
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline):
+    """Print change in throughput and median latency relative to baseline"""
+    for workload, result in current['results'].items():
+        if (base := baseline['results'].get(workload)) is None:
+            continue
+        throughput = result['items_per_second'] / base['items_per_second'] - 1
+        p50 = result['latency_ms']['p50'] / base['latency_ms']['p50'] - 1
+        print(f'{workload:>12}: throughput {throughput:+7.1%}, p50 latency {p50:+7.1%}', file=sys.stderr)
+
+
+def main(output=None, baseline=None, **kwargs):
+    data = run_suite(**kwargs)
+    text = json.dumps(data, indent=2)
+    if output:
+        Path(output).write_text(text)
+    else:
+        print(text)
+    if baseline:
+        compare(data, json.loads(Path(baseline).read_text()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workloads', nargs='+', choices=list(WORKLOADS), default=list(WORKLOADS))
+    parser.add_argument('--cuis', dest='n_cuis', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='Seconds the stub server waits before each response')
+    parser.add_argument('--fault-rate', dest='fault_rate', type=float, default=0.0,
+                        help='Fraction of requests failing with 429/502/503/connection reset')
+    parser.add_argument('--items-per-cui', dest='items_per_cui', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--requests-per-second', dest='requests_per_second', type=float, default=10_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write JSON results to this file (default: stdout)')
+    parser.add_argument('--compare', dest='baseline', help='JSON results from a previous run to compare with')
+    main(**vars(parser.parse_args()))
@@ -0,0 +1,236 @@
+"""
+Local stand-in for the UTS CAS and REST endpoints, used by the benchmarks.
+
+Emulates the CAS time granting ticket/single-use service ticket flow, paginated content endpoints
+(concept, atoms, definitions, relations, AUI), search and crosswalk, and the release API (whose current
+release can be changed), with configurable latency and injected errors (including 429 with Retry-After).
+
+Usage:
+    with StubUtsServer() as server:
+        auth = BasicAuthenticator('key', base_url=server.base_url, auth_url=server.auth_url)
+"""
+import json
+import random
+import socket
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubUtsHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # allow keep-alive
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, body, status=200, content_type='application/json', headers=None):
+        if not isinstance(body, bytes):
+            body = body.encode('utf8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _inject_fault(self):
+        """Fail this request if chosen by the server's fault settings; returns True if failed"""
+        if (fault := self.server.choose_fault()) is None:
+            return False
+        if fault == 'reset':
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+        else:
+            headers = {'Retry-After': str(self.server.retry_after)} if fault == 429 else None
+            self._send(json.dumps({'status': fault, 'error': 'Injected fault'}), status=fault, headers=headers)
+        return True
+
+    def do_POST(self):
+        time.sleep(self.server.latency)
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        path = urllib.parse.urlparse(self.path).path
+        if path == '/cas/v1/api-key':
+            action = f'http://{self.server.server_name}:{self.server.server_port}/cas/v1/tickets/TGT-stub'
+            self._send(f'<html><body><form action="{action}" method="POST"></form></body></html>',
+                       content_type='text/html')
+        elif path.startswith('/cas/v1/tickets/'):
+            if not self._inject_fault():
+                self._send(self.server.next_ticket(), content_type='text/plain')
+        else:
+            self._send('', status=404)
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        parsed = urllib.parse.urlparse(self.path)
+        params = dict(urllib.parse.parse_qsl(parsed.query))
+        parts = parsed.path.strip('/').split('/')
+        if parts == ['releases']:
+            self._releases(params)
+            return
+        self.server.count_request()
+        if self._inject_fault():
+            return
+        if 'apiKey' not in params and not self.server.use_ticket(params.get('ticket')):
+            self._send(json.dumps({'status': 401, 'error': 'Invalid ticket'}), status=401)
+            return
+        if parts[:2] == ['rest', 'search'] and len(parts) == 3:
+            self._search(parts[2], params)
+        elif parts[:2] == ['rest', 'crosswalk'] and len(parts) == 6 and parts[3] == 'source':
+            self._crosswalk(parts[2], parts[4], parts[5], params)
+        elif parts[:2] == ['rest', 'content'] and len(parts) >= 5:
+            self._content(parts, params)
+        else:
+            self._send(json.dumps({'status': 404, 'error': 'Not found'}), status=404)
+
+    def _releases(self, params):
+        """Release API: no authentication needed"""
+        with self.server._lock:
+            self.server.release_lookups += 1
+        releases = [{'releaseVersion': self.server.current_release, 'releaseType': params.get('releaseType'),
+                     'product': 'UMLS', 'current': True}]
+        if params.get('current') != 'true':
+            releases.append({'releaseVersion': '2021AB', 'releaseType': params.get('releaseType'),
+                             'product': 'UMLS', 'current': False})
+        self._send(json.dumps(releases))
+
+    def _page(self, params, make_item):
+        """Paginated result of `items_per_cui` items"""
+        page_size = int(params.get('pageSize', 25))
+        page_number = int(params.get('pageNumber', 1))
+        total = self.server.items_per_cui
+        start = (page_number - 1) * page_size
+        self._send(json.dumps({
+            'pageSize': page_size, 'pageNumber': page_number, 'pageCount': max(1, -(-total // page_size)),
+            'recCount': total, 'result': [make_item(i) for i in range(start, min(start + page_size, total))],
+        }))
+
+    def _content(self, parts, params):
+        version = parts[2]
+        if parts[3] == 'AUI':
+            concept_url = f'{self.server.base_url}/content/{version}/CUI/C{parts[4][1:]}'
+            self._send(json.dumps({'result': {'classType': 'Atom', 'ui': parts[4], 'concept': concept_url}}))
+            return
+        cui = parts[4]
+        kind = parts[5] if len(parts) > 5 else None
+        if kind is None:
+            self._send(json.dumps({'pageSize': 25, 'pageNumber': 1, 'pageCount': 1, 'result': {
+                'classType': 'Concept', 'ui': cui, 'name': f'Concept {cui}',
+                'semanticTypes': [{'name': 'Disease or Syndrome'}],
+            }}))
+        elif kind == 'relations':
+            self._page(params, lambda i: {
+                'ui': f'R{i:07d}', 'relatedId': f'{self.server.base_url}/content/{version}/AUI/A{i:07d}',
+                'relatedIdName': f'Related {i}', 'relationLabel': 'RO', 'additionalRelationLabel': '',
+            })
+        else:
+            self._page(params, lambda i: {
+                'ui': f'A{i:07d}', 'name': f'{cui} item {i}', 'rootSource': 'MTH', 'termType': 'PT',
+                'value': f'Definition {i}',
+            })
+
+    def _search(self, version, params):
+        """Like UTS, search results have no page count: a page with the 'NONE' result follows the last page"""
+        page_size = int(params.get('pageSize', 25))
+        page_number = int(params.get('pageNumber', 1))
+        term = params.get('string', '')
+        start = (page_number - 1) * page_size
+        results = [
+            {'ui': f'C{i:07d}', 'rootSource': 'MTH', 'name': f'{term} {i}',
+             'uri': f'{self.server.base_url}/content/{version}/CUI/C{i:07d}'}
+            for i in range(start, min(start + page_size, self.server.items_per_cui))
+        ] or [{'ui': 'NONE', 'name': 'NO RESULTS'}]
+        self._send(json.dumps({'pageSize': page_size, 'pageNumber': page_number, 'result': {
+            'classType': 'searchResults', 'results': results,
+        }}))
+
+    def _crosswalk(self, version, source, code, params):
+        target = params.get('targetSource', 'MSH')
+        self._page(params, lambda i: {
+            'ui': f'{target}{code}-{i}', 'name': f'{source} {code} in {target} {i}', 'rootSource': target,
+            'uri': f'{self.server.base_url}/content/{version}/source/{target}/{target}{code}-{i}',
+        })
+
+
+class StubUtsServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, host='127.0.0.1', port=0, items_per_cui=10, latency=0.0, fault_rate=0.0,
+                 faults=(429, 502, 503, 'reset'), retry_after=0, seed=0, current_release='2022AA'):
+        """
+
+        :param items_per_cui: number of atoms/definitions/relations for each CUI (and of search and
+            crosswalk results)
+        :param latency: seconds to wait before responding to each request
+        :param fault_rate: fraction of ticket and content requests which fail
+        :param faults: failures to choose from: HTTP status or 'reset' (close connection without responding)
+        :param retry_after: value of Retry-After header sent with 429 responses
+        :param current_release: release reported as current by the release API (may be changed while running)
+        """
+        super().__init__((host, port), StubUtsHandler)
+        self.items_per_cui = items_per_cui
+        self.latency = latency
+        self.fault_rate = fault_rate
+        self.faults = faults
+        self.retry_after = retry_after
+        self.fault_counts = {}
+        self.current_release = current_release
+        self.release_lookups = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._ticket_count = 0
+        self.request_count = 0  # content, search and crosswalk requests
+        self._tickets = set()  # issued and unused
+        self._thread = None
+
+    def choose_fault(self):
+        with self._lock:
+            if self._random.random() >= self.fault_rate:
+                return None
+            fault = self._random.choice(self.faults)
+            self.fault_counts[fault] = self.fault_counts.get(fault, 0) + 1
+            return fault
+
+    def count_request(self):
+        with self._lock:
+            self.request_count += 1
+
+    def next_ticket(self):
+        with self._lock:
+            self._ticket_count += 1
+            ticket = f'ST-{self._ticket_count}'
+            self._tickets.add(ticket)
+            return ticket
+
+    def use_ticket(self, ticket):
+        """Service tickets are single-use"""
+        with self._lock:
+            if ticket in self._tickets:
+                self._tickets.remove(ticket)
+                return True
+            return False
+
+    @property
+    def root_url(self):
+        return f'http://{self.server_name}:{self.server_port}'
+
+    @property
+    def base_url(self):
+        return f'{self.root_url}/rest'
+
+    @property
+    def auth_url(self):
+        return f'{self.root_url}/cas/v1/api-key'
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+        self.server_close()
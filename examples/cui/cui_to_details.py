@@ -2,11 +2,14 @@
 Example program. Creates CSV file from list/file of CUIs.
 
 Usage: python cui_to_details.py -k API_KEY [-v current]
+
+See also: umls-api-tool enrich --kinds details --format parquet
 """
 import csv
 
 from umls_api_tool.args import get_apikey_version
 from umls_api_tool.auth import BasicAuthenticator, FriendlyAuthenticator
+from umls_api_tool.export import open_sink
 
 
 def cui_to_details(apikey, version='current'):
@@ -39,31 +42,19 @@ def cui_to_details(apikey, version='current'):
         writer.writerows(cui_data)
 
 
-def cui_to_details_friendly(apikey, version='current'):
-    """Same as above, but using friendly authenticator."""
-    auth = FriendlyAuthenticator.from_apikey(apikey, version)
-    cui_data = []
-    semtypes = set()  # needed for determining all possible headers
-    with open('cui-list.txt') as fh:
-        for line in fh:
-            cui = line.strip()
-            data = auth.get_details_for_cui(cui)
-            cui_data.append(
-                {
-                    'cui': data['cui'],
-                    'name': data['name'],
-                    'definition': data['definition'],  # not in previous model
-                    'source': data['source'],
-                } | {
-                    semtype: 1 for semtype in data['semtypes']
-                }
-            )
-            semtypes |= set(data['semtypes'])
+def cui_to_details_friendly(apikey, version='current', output_format='csv'):
+    """Same as above, but using friendly authenticator.
 
-    with open('cui-details.csv', 'w', newline='', encoding='utf8') as out:
-        writer = csv.DictWriter(out, fieldnames=['cui', 'name', 'definition', 'source'] + list(sorted(semtypes)))
-        writer.writeheader()
-        writer.writerows(cui_data)
+    Rows are streamed to `cui-details.{output_format}` rather than collected first: semtypes are a single
+    column (a list in jsonl/parquet/arrow, '|'-separated in csv) rather than one column per semtype.
+    """
+    with FriendlyAuthenticator.from_apikey(apikey, version) as auth, \
+            open_sink(output_format, '.', 'details') as sink:
+        with open('cui-list.txt') as fh:
+            for line in fh:
+                cui = line.strip()
+                if data := auth.get_details_for_cui(cui):
+                    sink.write(data)
 
 
 if __name__ == '__main__':
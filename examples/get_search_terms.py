@@ -5,42 +5,30 @@ Usage: python get_search_terms.py -k API_KEY [-v current] --search-terms covid
     * the 'src' directory must be on your PYTHONPATH (set/export PYTHONPATH=/path/to/src
 """
 from umls_api_tool.args import get_arg_dict
-from umls_api_tool.auth import BasicAuthenticator
+from umls_api_tool.auth import FriendlyAuthenticator
 
 from loguru import logger
 
 
-def find_search_terms(apikey, version, search_terms, source_vocabs=None, any_term=False):
+def find_search_terms(apikey, version, search_terms, source_vocabs=None, any_term=False, top_k=None):
     """
 
-    :param source_vocabs:
+    :param source_vocabs: search each of these vocabularies (concurrently)
     :param apikey:
     :param version:
     :param search_terms:
-    :param any_term: if True, each term in `search_terms` is executed as a separate search
+    :param any_term: if True, each term in `search_terms` is executed as a separate search (concurrently)
+    :param top_k: only retrieve this many CUIs
     :return:
     """
-    auth = BasicAuthenticator(apikey)
     if not any_term:
         search_terms = [' '.join(search_terms)]
-    for term in search_terms:
-        for json_data in _search(auth, version, term, source_vocabs):
-            for result in json_data['result']['results']:
-                print(f'{result["ui"]},{result["rootSource"]},{result["name"]}')
-
-
-def _search(auth, version, term, source_vocabs=None):
-    if source_vocabs:
-        for vocab in source_vocabs:
-            if json_data := auth.get('search', version, string=term, sabs=vocab,):
-                yield json_data
-            else:
-                logger.warning(f'No results for "{term}" in "{vocab}"')
-    else:
-        if json_data := auth.get('search', version, string=term,):
-            yield json_data
-        else:
-            logger.warning(f'No results for "{term}".')
+    with FriendlyAuthenticator.from_apikey(apikey, version) as auth:
+        concepts = auth.search_many(search_terms, source_vocabs, top_k=top_k)
+    if not concepts:
+        logger.warning(f'No results for {search_terms}.')
+    for concept in concepts:
+        print(f'{concept["cui"]},{"|".join(concept["sources"])},{concept["name"]}')
 
 
 if __name__ == '__main__':
@@ -57,4 +45,6 @@ if __name__ == '__main__':
                              ' Note: This currently appears to be broken!')
     parser.add_argument('--any-term', default=False, action='store_true',
                         help='Add flag to search for any of the search terms.')
+    parser.add_argument('--top-k', default=None, type=int, dest='top_k',
+                        help='Only retrieve this many CUIs (best ranked in any search).')
     find_search_terms(**get_arg_dict(parser))
@@ -4,27 +4,23 @@ Example program. Maps codes from Human Phenotype Ontology
 
 Usage: python crosswalk.py -k API_KEY [-v current]
     * the 'src' directory must be on your PYTHONPATH (set/export PYTHONPATH=/path/to/src
+    * for large files of codes, see `umls-api-tool crosswalk`
 """
 from umls_api_tool.args import get_apikey_version
-from umls_api_tool.auth import BasicAuthenticator
+from umls_api_tool.auth import FriendlyAuthenticator
 
 
 def parse_hpo_code_file(apikey, version='current'):
-    auth = BasicAuthenticator(apikey)
-    with open('hpo-codes.txt') as fh:
-        for line in fh:
-            code = line.strip()
-            json_data = auth.get(
-                'crosswalk', version, 'source', 'HPO', code,
-                targetSource='SNOMEDCT_US'
-            )
-            if err := json_data.get('error'):
-                print(f'Error for {code}: {err}')
+    with FriendlyAuthenticator.from_apikey(apikey, version) as auth, open('hpo-codes.txt') as fh:
+        codes = (line.strip() for line in fh if line.strip())
+        for code, mappings in auth.crosswalk_codes('HPO', codes, 'SNOMEDCT_US'):
+            if mappings is None:
+                print(f'Error for {code}')
                 continue
-            for source_atom_cluster in json_data['result']:
+            for mapping in mappings:
                 print(
                     f'HPO Code - {code} - \t SNOMEDCT concept -- '
-                    f'{source_atom_cluster["ui"]}: {source_atom_cluster["name"]}'
+                    f'{mapping["target_code"]}: {mapping["target_name"]}'
                 )
 
 
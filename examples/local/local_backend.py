@@ -0,0 +1,34 @@
+"""
+Example program. Build a local store from RRF files and query it with the FriendlyAuthenticator.
+
+The `rrf` directory contains a tiny synthetic release in the same format as the licensed
+UMLS Metathesaurus files (MRCONSO, MRDEF, MRSTY, MRREL).
+
+Usage: python local_backend.py [--rrf-dir rrf] [--db local-umls.db]
+"""
+import argparse
+
+from umls_api_tool.auth import FriendlyAuthenticator
+from umls_api_tool.local import LocalAuthenticator, build_local_store
+
+
+def local_backend(rrf_dir='rrf', db_path='local-umls.db'):
+    build_local_store(rrf_dir, db_path, version='2022AA')
+    with FriendlyAuthenticator(LocalAuthenticator(db_path)) as auth:
+        with open('cui-list.txt') as fh:
+            for line in fh:
+                cui = line.strip()
+                print(auth.get_details_for_cui(cui))
+                for atom in auth.get_atoms_for_cui(cui, language='ENG'):
+                    print(f'\t{atom}')
+                for relation in auth.get_relations_for_cui(cui):
+                    print(f'\t{relation}')
+        for result in auth.search('fever'):
+            print(result)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rrf-dir', dest='rrf_dir', default='rrf')
+    parser.add_argument('--db', dest='db_path', default='local-umls.db')
+    local_backend(**vars(parser.parse_args()))
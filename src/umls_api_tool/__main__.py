@@ -0,0 +1,3 @@
+from umls_api_tool.cli import main
+
+main()
@@ -1,14 +1,20 @@
 import argparse
 
 
-def get_arg_dict(parser: argparse.ArgumentParser = None):
-    """Add apikey and version to arg dict"""
-    if not parser:
-        parser = argparse.ArgumentParser(fromfile_prefix_chars='@')
+def add_auth_args(parser: argparse.ArgumentParser):
+    """Add apikey and version arguments to parser (or subparser)"""
     parser.add_argument('-k', '--apikey', required=True,
                         help='Key from UMLS; see https://documentation.uts.nlm.nih.gov/rest/authentication.html')
     parser.add_argument('-v', '--version', default='current',
                         help='Specify UMLS version (e.g., 2015AA)')
+    return parser
+
+
+def get_arg_dict(parser: argparse.ArgumentParser = None):
+    """Add apikey and version to arg dict"""
+    if not parser:
+        parser = argparse.ArgumentParser(fromfile_prefix_chars='@')
+    add_auth_args(parser)
     return vars(parser.parse_args())
 
 
@@ -0,0 +1,384 @@
+"""
+Asyncio versions of the authenticators in `umls_api_tool.auth`.
+
+Requires `aiohttp` (`pip install umls_api_tool[async]`).
+
+Usage:
+    async with AsyncFriendlyAuthenticator.from_apikey(apikey) as auth:
+        async for atom in auth.get_atoms_for_cui('C0000737'):
+            ...
+"""
+import asyncio
+import json
+import time
+from typing import AsyncIterator
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+from umls_api_tool.auth import (
+    UTS_BASE_URL, UTS_AUTH_URL, DEFAULT_POOL_SIZE, FORM_HEADERS, TICKET_REJECTED_STATUSES, check_error,
+    parse_related_concept, related_concept_url, successful_response,
+)
+from umls_api_tool.cache import make_cache_key, redact_auth_params
+from umls_api_tool.log import logger
+from umls_api_tool.memo import LruMemo, RELATED_CONCEPTS
+from umls_api_tool.request_limiter import AsyncRequestLimiter, TICKET_ENDPOINT, CONTENT_ENDPOINT, endpoint_ready
+from umls_api_tool.singleflight import AsyncSingleFlight
+from umls_api_tool.tickets import TGT_LIFETIME, TICKET_REFRESH_MARGIN, parse_form_action
+
+
+class AsyncBasicAuthenticator:
+
+    def __init__(self, apikey, request_limiter=None, *, max_concurrency=DEFAULT_POOL_SIZE,
+                 base_url=UTS_BASE_URL, auth_url=UTS_AUTH_URL, use_apikey_param=False, single_flight=True):
+        """
+
+        :param apikey: key from UMLS profile
+        :param request_limiter: must provide either `async_ready()` (e.g., TokenBucketRequestLimiter)
+            or `async ready()`; defaults to AsyncRequestLimiter
+        :param max_concurrency: maximum number of requests in flight (also the size of the connection pool)
+        :param base_url: root of UTS REST API
+        :param auth_url: CAS endpoint used to retrieve time granting ticket
+        :param use_apikey_param: send the apikey with each request rather than requesting service tickets
+        :param single_flight: if True, concurrent identical requests share a single call to the API; may also
+            be an `AsyncSingleFlight` shared between authenticators (in the same event loop), or False to disable
+        """
+        if aiohttp is None:
+            raise ImportError('AsyncBasicAuthenticator requires aiohttp: pip install aiohttp')
+        self.apikey = apikey
+        self.base_url = base_url
+        self.auth_url = auth_url
+        self.use_apikey_param = use_apikey_param
+        self.max_concurrency = max_concurrency
+        self.single_flight = AsyncSingleFlight() if single_flight is True else (single_flight or None)
+        self.request_limiter = request_limiter if request_limiter else AsyncRequestLimiter()
+        self._limiter_ready = None  # see `_wait_for_limiter`
+        self.time_granting_ticket = None
+        self._tgt_created = None
+        self._session = None
+        self._semaphore = None
+        self._tgt_lock = None
+
+    def _get_session(self):
+        # aiohttp sessions must be created inside the running event loop
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._tgt_lock = asyncio.Lock()
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def ensure_time_granting_ticket(self, max_age=TGT_LIFETIME * (1 - TICKET_REFRESH_MARGIN), force=False):
+        """Retrieve a new time granting ticket if there is none or it is close to expiring."""
+        session = self._get_session()
+        async with self._tgt_lock:
+            if force or self._tgt_created is None or time.monotonic() - self._tgt_created > max_age:
+                await self._wait_for_limiter(TICKET_ENDPOINT)
+                async with session.post(self.auth_url, data={'apikey': self.apikey}, headers=FORM_HEADERS) as r:
+                    r.raise_for_status()
+                    text = await r.text()
+                self.time_granting_ticket = parse_form_action(text)
+                self._tgt_created = time.monotonic()
+        return self.time_granting_ticket
+
+    async def get_time_granting_ticket(self):
+        return await self.ensure_time_granting_ticket()
+
+    async def _post_service_ticket(self, tgt):
+        await self._wait_for_limiter(TICKET_ENDPOINT)
+        async with self._semaphore:
+            async with self._get_session().post(
+                    tgt, data={'service': 'http://umlsks.nlm.nih.gov'}, headers=FORM_HEADERS) as r:
+                return r.status, await r.text()
+
+    async def get_service_ticket(self):
+        status, text = await self._post_service_ticket(await self.ensure_time_granting_ticket())
+        if status in TICKET_REJECTED_STATUSES or status == 404:
+            # time granting ticket no longer valid
+            logger.warning(f'Time granting ticket rejected ({status}); requesting a new one.')
+            status, text = await self._post_service_ticket(await self.ensure_time_granting_ticket(force=True))
+        if status >= 400:
+            raise ValueError(f'{status} Error requesting service ticket')
+        return text
+
+    async def _wait_for_limiter(self, endpoint):
+        if self._limiter_ready is None:  # called with the endpoint only if accepted (see `endpoint_ready`)
+            name = 'async_ready' if hasattr(self.request_limiter, 'async_ready') else 'ready'
+            self._limiter_ready = endpoint_ready(self.request_limiter, name)
+        await self._limiter_ready(endpoint)
+
+    def _build_url(self, *url):
+        if len(url) == 1 and url[0].startswith('http'):
+            return url[0]
+        else:
+            return '/'.join((self.base_url, *url))
+
+    def _has_error(self, data: dict):
+        if 'status' in data:
+            logger.error(data)
+            return True
+        return False
+
+    async def _fetch_page(self, url, params):
+        """Retrieve and decode a single page of results"""
+        if self.single_flight is None:
+            return await self._request_page(url, params)
+        return await self.single_flight.do(make_cache_key(url, params), self._request_page, url, params)
+
+    async def _request_page(self, url, params):
+        session = self._get_session()
+        if self.use_apikey_param:
+            params = {**params, 'apiKey': self.apikey}
+        else:
+            params = {**params, 'ticket': await self.get_service_ticket()}
+        await self._wait_for_limiter(CONTENT_ENDPOINT)
+        async with self._semaphore:
+            async with session.get(url, params={k: str(v) for k, v in params.items()}) as r:
+                if r.status >= 400:
+                    logger.error(f'{r.status} Error for url: {redact_auth_params(str(r.url))}')
+                text = await r.text(encoding='utf-8')
+                if r.status == 502:
+                    logger.error(text)
+                    raise ValueError(text)
+        return json.loads(text)
+
+    async def get(self, *url, limit_pages=None, **params):
+        """
+
+        :param url: destination to query
+        :param limit_pages: return no more than this number of pages (None/0 will be interpreted as return everything)
+        :param params: these will be passed onto the UTS UMLS API
+        :return:
+        """
+        url = self._build_url(*url)
+        params = {
+            'pageSize': 25,
+            'pageNumber': 1,
+            **params,
+        }
+        first_page = params['pageNumber']
+        result = await self._fetch_page(url, params)
+        if self._has_error(result):
+            return {'result': []}
+        rec_count = result.get('recCount', None)
+        if rec_count == 0:
+            return None
+        elif rec_count == 1:
+            return result
+        page_count = result.get('pageCount', 1)  # check for single-page results
+        if page_count == 1:
+            return result
+        results = {**result, 'result': list(result['result'])}
+        last_page = page_count
+        if limit_pages:
+            last_page = min(page_count, first_page + limit_pages - 1)
+        page_numbers = range(first_page + 1, last_page + 1)
+        pages = await asyncio.gather(*(
+            self._fetch_page(url, {**params, 'pageNumber': page_number}) for page_number in page_numbers
+        ))
+        for page_number, result in zip(page_numbers, pages):
+            if self._has_error(result):
+                break
+            if result['pageNumber'] != page_number:  # problem, different page retrieved than requested
+                logger.warning(f'Page {page_number} not retrievable (expected page count: {page_count}).')
+                break
+            results['result'] += result['result']
+        return results
+
+
+class AsyncLazyAuthenticator:
+    """ Authenticator which just pass on the queries to the end user. """
+
+    def __init__(self, authenticator: AsyncBasicAuthenticator, version='current'):
+        self.auth = authenticator
+        self.version = version
+
+    async def get(self, *url, **params):
+        return await self.auth.get(*url, **params)
+
+    @classmethod
+    def from_apikey(cls, apikey, version='current', request_limiter=None, **kwargs):
+        return cls(AsyncBasicAuthenticator(apikey, request_limiter=request_limiter, **kwargs), version=version)
+
+    async def close(self):
+        await self.auth.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def get_atoms_for_cui(self, cui, version=None, **params):
+        return await self.auth.get(
+            'content', version or self.version, 'CUI', cui, 'atoms',
+            **params,
+        )
+
+    async def get_definitions_for_cui(self, cui, version=None, language='ENG', **params):
+        return await self.auth.get(
+            'content', version or self.version, 'CUI', cui, 'definitions',
+            language=language, **params
+        )
+
+    async def get_details_for_cui(self, cui, version=None, **params):
+        return await self.auth.get(
+            'content', version or self.version, 'CUI', cui,
+            **params
+        )
+
+    async def get_relations_for_cui(self, cui, version=None, **params):
+        return await self.auth.get(
+            'content', version or self.version, 'CUI', cui, 'relations',
+            **params,
+        )
+
+    async def search_for_term(self, term, version=None, **params):
+        return await self.auth.get(
+            'search', version or self.version, string=term, **params
+        )
+
+
+class AsyncFriendlyAuthenticator:
+    """Async generator versions of FriendlyAuthenticator."""
+
+    def __init__(self, authenticator: AsyncBasicAuthenticator, version='current', related_memo: LruMemo = None):
+        self.auth = AsyncLazyAuthenticator(authenticator, version=version)
+        self.version = version
+        self.related_memo = RELATED_CONCEPTS if related_memo is None else related_memo
+
+    @classmethod
+    def from_apikey(cls, apikey, version='current', request_limiter=None, related_memo=None, **kwargs):
+        return cls(AsyncBasicAuthenticator(apikey, request_limiter=request_limiter, **kwargs), version=version,
+                   related_memo=related_memo)
+
+    async def close(self):
+        await self.auth.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    _check_error = staticmethod(check_error)
+
+    async def search(self, term, version=None, **params) -> AsyncIterator[dict]:
+        """Search terms and get back result CUIs"""
+        data = await self.auth.search_for_term(term, version or self.version, **params)
+        if self._check_error(data, term):
+            return
+        for result in data['result']['results']:
+            yield {
+                'cui': result['ui'],
+                'name': result['name'],
+                'source': result['rootSource'],
+            }
+
+    async def get_atoms_for_cui(self, cui, version=None, **params) -> AsyncIterator[dict]:
+        data = await self.auth.get_atoms_for_cui(cui, version or self.version, **params)
+        if self._check_error(data, cui):
+            return
+        for atom in data['result']:
+            yield {
+                'cui': cui,
+                'aui': atom['ui'],
+                'name': atom['name'],
+                'source': atom['rootSource'],
+                'termtype': atom['termType'],
+            }
+
+    async def get_definitions_for_cui(self, cui, version=None, **params) -> AsyncIterator[dict]:
+        data = await self.auth.get_definitions_for_cui(cui, version or self.version, **params)
+        if self._check_error(data, cui):
+            return
+        for definition in data['result']:
+            yield {
+                'cui': cui,
+                'source': definition['rootSource'],
+                'definition': definition['value'],
+            }
+
+    async def _first_definition(self, cui, version=None, **params):
+        async for definition in self.get_definitions_for_cui(cui, version, pageSize=1, limit_pages=1, **params):
+            return definition
+        return None
+
+    async def get_details_for_cui(self, cui, version=None, **params) -> dict:
+        data, definition = await asyncio.gather(
+            self.auth.get_details_for_cui(cui, version or self.version, **params),
+            self._first_definition(cui, version, **params),
+        )
+        if self._check_error(data, cui):
+            return None
+        details = data['result']
+        return {
+            'cui': cui,
+            'name': details['name'],
+            'definition': definition['definition'] if definition else '',
+            'source': definition['source'] if definition else '',
+            'semtypes': [semtype['name'] for semtype in details['semanticTypes']],
+        }
+
+    async def _get_related_concept(self, relation):
+        related_id = relation['relatedId']
+        if related_id in self.related_memo:
+            return self.related_memo.get(related_id)
+        try:
+            concept = await self._resolve_related_concept(related_id)
+        except LookupError:  # not remembered, so that it is retried
+            return None
+        self.related_memo.set(related_id, concept)
+        return concept
+
+    async def _resolve_related_concept(self, related_id):
+        """Resolve relatedId to (target cui, name)"""
+        rel_data = successful_response(await self.auth.get(related_id), related_id)['result']
+        cui_url = related_concept_url(rel_data)
+        return parse_related_concept(
+            rel_data, None if cui_url is None else successful_response(await self.auth.get(cui_url), cui_url),
+        )
+
+    async def get_relations_for_cui(self, cui, version=None, **params) -> AsyncIterator[dict]:
+        data = await self.auth.get_relations_for_cui(cui, version or self.version, **params)
+        if self._check_error(data, cui):
+            return
+        relations = []
+        related_ids = set()  # to prevent duplicates/excess queries
+        for relation in data['result']:
+            if relation['relatedIdName'] in related_ids:
+                continue
+            related_ids.add(relation['relatedIdName'])
+            relations.append(relation)
+        concepts = await asyncio.gather(*(self._get_related_concept(relation) for relation in relations))
+        found_cuis = set()  # cui, relation -> to prevent dupes
+        for relation, concept in zip(relations, concepts):
+            if concept is None:
+                continue
+            target_cui, name = concept
+            relation_label = relation['relationLabel']
+            addl_relation_label = relation['additionalRelationLabel']
+            if (cui_group := (target_cui, relation_label, addl_relation_label)) not in found_cuis:
+                found_cuis.add(cui_group)
+                yield {
+                    'source_cui': cui,
+                    'target_cui': target_cui,
+                    'name': name,
+                    'relation_label': relation_label,
+                    'additional_relation_label': addl_relation_label,
+                }
@@ -1,53 +1,332 @@
+import itertools
 import json
+import threading
+import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from typing import Iterator
 
-import requests
-from lxml.html import fromstring
-from loguru import logger
+from umls_api_tool.cache import make_cache_key, redact_auth_params
+from umls_api_tool.concurrency import map_ordered
+from umls_api_tool.decode import get_decoder
+from umls_api_tool.log import logger
+from umls_api_tool.memo import LruMemo, RELATED_CONCEPTS
+from umls_api_tool.metrics import endpoint_label
+from umls_api_tool.records import Atom, Definition, Details, Mapping, Relation
+from umls_api_tool.request_limiter import TokenBucketRequestLimiter, TICKET_ENDPOINT, CONTENT_ENDPOINT, endpoint_ready
+from umls_api_tool.retry import CircuitBreaker, RetryPolicy
+from umls_api_tool.singleflight import SingleFlight
+from umls_api_tool.tickets import ServiceTicketProvider, TGT_LIFETIME, TICKET_REFRESH_MARGIN, parse_form_action
 
-from umls_api_tool.request_limiter import TimelyRequestLimiter
+
+UTS_BASE_URL = 'https://uts-ws.nlm.nih.gov/rest'
+UTS_AUTH_URL = 'https://utslogin.nlm.nih.gov/cas/v1/api-key'
+DEFAULT_POOL_SIZE = 10
+FORM_HEADERS = {
+    'Content-type': 'application/x-www-form-urlencoded',
+    'Accept': 'text/plain',
+    'User-Agent': 'python'
+}
+TICKET_REJECTED_STATUSES = frozenset({401, 403})
+AUTO_PAGE_SIZE = 100  # used when fetching pages in parallel and no pageSize is specified
+MAX_SEARCH_PAGE_SIZE = 100  # page size used by `search_many` when only the top results are needed
+
+
+def make_session(pool_size=DEFAULT_POOL_SIZE, keep_alive=True):
+    """Build a `requests.Session` which keeps up to `pool_size` open connections to each host."""
+    import requests.adapters  # deferred (here and below) until a request is made, as it is slow to import
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+    return session
+
+
+def check_error(data, context):
+    """Log and return True if `data` is missing or an error response"""
+    if data is None:
+        logger.warning(f'Data is empty: {context}')
+        return True
+    elif err := data.get('error'):
+        logger.warning(f'Error for {context}: {err}')
+        return True
+    return False
+
+
+def successful_response(data, url):
+    """Return `data` unless it is the empty result which `get` returns for a failed request
+
+    :raise LookupError: if the request for `url` failed (e.g., so that the failure is not memoized)
+    """
+    if data is not None and data.get('result') == []:
+        raise LookupError(f'Request failed: {url}')
+    return data
+
+
+def related_concept_url(rel_data):
+    """Url of the concept of a relation's relatedId (e.g., an atom or source concept), or None if it has none"""
+    return rel_data.get('concepts', rel_data.get('concept', None))
+
+
+def parse_related_concept(rel_data, cui_data):
+    """Find (target cui, name) for a relation's relatedId, or None
+
+    :param rel_data: result retrieved from the relatedId url
+    :param cui_data: response retrieved from `related_concept_url(rel_data)` (None if there is no such url)
+    """
+    if related_concept_url(rel_data) is not None:
+        if not cui_data:
+            logger.warning(f'Failed: {rel_data}')
+            return None
+        cui_data = cui_data['result']
+    elif rel_data['classType'] == 'Concept':
+        cui_data = rel_data
+    else:
+        logger.warning(f'Failed to identify concept: {rel_data}')
+        return None
+    if not cui_data or cui_data.get('recCount', -1) == 0:
+        return None
+    elif 'results' in cui_data:
+        return cui_data['results'][0]['ui'], cui_data['results'][0]['name']
+    else:
+        return cui_data['ui'], cui_data['name']
 
 
 class BasicAuthenticator:
+    """Send requests to the UTS REST API.
+
+    Nothing is sent (and `requests` is not imported) until the first request: the session is created and
+    the time granting ticket retrieved when first needed.
+    """
+
+    def __init__(self, apikey, request_limiter=None, *, session=None, pool_size=DEFAULT_POOL_SIZE,
+                 keep_alive=True, base_url=UTS_BASE_URL, auth_url=UTS_AUTH_URL, ticket_provider=None,
+                 page_workers=1, cache=None, retry_policy=None, circuit_breaker=None, single_flight=True,
+                 metrics=None, json_backend=None, release_tracker=None):
+        """
 
-    def __init__(self, apikey, request_limiter=None):
-        self.time_granting_ticket = self.get_time_granting_ticket(apikey)
-        self.base_url = 'https://uts-ws.nlm.nih.gov/rest'
+        :param apikey: key from UMLS profile
+        :param request_limiter: defaults to TokenBucketRequestLimiter
+        :param session: use this `requests.Session` for all ticket and content requests (will not be
+            closed by `close`)
+        :param pool_size: number of connections to keep open per host; if 0, no session will be used
+            and each request opens a new connection
+        :param keep_alive: if False, ask the server to close connection after each request
+        :param base_url: root of UTS REST API
+        :param auth_url: CAS endpoint used to retrieve time granting ticket
+        :param ticket_provider: callable taking this authenticator and returning the strategy used to
+            authenticate each request (e.g., `PrefetchTicketProvider` or `ApiKeyProvider` from
+            `umls_api_tool.tickets`); defaults to requesting a service ticket before each request
+        :param page_workers: number of threads used to retrieve the remaining pages of a result once the
+            page count is known; 1 retrieves pages sequentially
+        :param cache: ResponseCache (e.g., `SqliteCache` from `umls_api_tool.cache`) consulted before each request
+        :param retry_policy: how to retry transient failures (see `umls_api_tool.retry`); each retry
+            waits for the rate limiter again
+        :param circuit_breaker: stops requests to hosts which keep failing (may be shared between authenticators)
+        :param single_flight: if True, concurrent identical requests (same url and parameters) share a single
+            call to the API; may also be a `SingleFlight` shared between authenticators, or False to disable
+        :param metrics: record latency of each request phase, counts and hooks (see `umls_api_tool.metrics`)
+        :param json_backend: decode response bytes directly with 'orjson', 'msgspec', 'json' or 'auto' (the
+            fastest installed); by default, the response is decoded to text and parsed with `json.loads`
+        :param release_tracker: callable taking this authenticator and returning a `ReleaseTracker` (e.g.,
+            `ReleaseTracker` or `functools.partial(ReleaseTracker, refresh_interval=86400)` from
+            `umls_api_tool.releases`); requests for the 'current' release are then sent (and cached) for the
+            concrete release it refers to
+        """
+        self._owns_session = session is None and pool_size > 0
+        self._session = session
+        self._pool_size = pool_size
+        self._keep_alive = keep_alive
+        self._session_lock = threading.Lock()
+        self.base_url = base_url
+        self.auth_url = auth_url
+        self.apikey = apikey
+        self.time_granting_ticket = None
+        self._tgt_created = None
+        self._tgt_lock = threading.Lock()
         self._message_count = 0
-        self.request_limiter = request_limiter if request_limiter else TimelyRequestLimiter()
+        self.request_limiter = request_limiter if request_limiter else TokenBucketRequestLimiter()
+        self._limiter_ready = None  # request_limiter.ready, taking the endpoint (see `endpoint_ready`)
+        self.page_workers = page_workers
+        self.cache = cache
+        self.retry_policy = retry_policy if retry_policy else RetryPolicy()
+        self.circuit_breaker = circuit_breaker if circuit_breaker else CircuitBreaker()
+        self.single_flight = SingleFlight() if single_flight is True else (single_flight or None)
+        self.metrics = metrics
+        self._decode = get_decoder(json_backend) if json_backend else None
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self.ticket_provider = (ticket_provider or ServiceTicketProvider)(self)
+        self.release_tracker = release_tracker(self) if release_tracker else None
+
+    @property
+    def session(self):
+        """`requests.Session` used for all requests (created on first use), or None if not pooling"""
+        if self._session is None and self._owns_session:
+            with self._session_lock:
+                if self._session is None and self._owns_session:
+                    self._session = make_session(self._pool_size, keep_alive=self._keep_alive)
+        return self._session
+
+    @property
+    def _http(self):
+        """Session if pooling, else fallback to `requests` (new connection each time)"""
+        if (session := self.session) is not None:
+            return session
+        import requests
+        return requests
+
+    def close(self):
+        """Stop ticket prefetching and release pooled connections."""
+        self.ticket_provider.close()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        with self._session_lock:
+            if self._owns_session:
+                self._owns_session = False  # do not create a new session after closing
+                if self._session is not None:
+                    self._session.close()
+                    self._session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @staticmethod
+    def _parse_time_granting_ticket(text):
+        return parse_form_action(text)
 
     @staticmethod
-    def get_time_granting_ticket(apikey):
-        r = requests.post(
-            f'https://utslogin.nlm.nih.gov/cas/v1/api-key',
+    def get_time_granting_ticket(apikey, auth_url=UTS_AUTH_URL, session=None):
+        import requests
+        r = (session or requests).post(
+            auth_url,
             data={'apikey': apikey},
-            headers={
-                'Content-type': 'application/x-www-form-urlencoded',
-                'Accept': 'text/plain',
-                'User-Agent': 'python'
-            },
+            headers=FORM_HEADERS,
         )
-        return fromstring(r.text).xpath('//form/@action')[0]
+        return BasicAuthenticator._parse_time_granting_ticket(r.text)
+
+    def ensure_time_granting_ticket(self, max_age=TGT_LIFETIME * (1 - TICKET_REFRESH_MARGIN), force=False):
+        """Retrieve a new time granting ticket if there is none or it is close to expiring."""
+        with self._tgt_lock:
+            if force or self._tgt_created is None or time.monotonic() - self._tgt_created > max_age:
+                r = self._send('POST', self.auth_url, TICKET_ENDPOINT, data={'apikey': self.apikey},
+                               headers=FORM_HEADERS)
+                r.raise_for_status()
+                self.time_granting_ticket = self._parse_time_granting_ticket(r.text)
+                self._tgt_created = time.monotonic()
+        return self.time_granting_ticket
 
     def get_service_ticket(self):
-        self.request_limiter.ready()
-        r = requests.post(
-            self.time_granting_ticket,
-            data={'service': 'http://umlsks.nlm.nih.gov'},
-            headers={
-                'Content-type': 'application/x-www-form-urlencoded',
-                'Accept': 'text/plain',
-                'User-Agent': 'python'
-            },
-        )
+        tgt = self.ensure_time_granting_ticket()
+        r = self._send('POST', tgt, TICKET_ENDPOINT,
+                       data={'service': 'http://umlsks.nlm.nih.gov'}, headers=FORM_HEADERS)
+        if r.status_code in TICKET_REJECTED_STATUSES or r.status_code == 404:
+            # time granting ticket no longer valid
+            logger.warning(f'Time granting ticket rejected ({r.status_code}); requesting a new one.')
+            tgt = self.ensure_time_granting_ticket(force=True)
+            r = self._send('POST', tgt, TICKET_ENDPOINT,
+                           data={'service': 'http://umlsks.nlm.nih.gov'}, headers=FORM_HEADERS)
         return r.text
 
+    def _send(self, method, url, endpoint, params=None, authenticate=False, **kwargs):
+        """Send request (waiting for the rate limiter before each attempt), retrying transient failures.
+
+        :param endpoint: TICKET_ENDPOINT or CONTENT_ENDPOINT (for the rate limiter)
+        :param params: query parameters
+        :param authenticate: add a (new) ticket to `params` for each attempt; retry if the ticket is rejected
+        :return: last response, which may have a failing status if retries were exhausted
+        """
+        import requests
+        host = urllib.parse.urlsplit(url).netloc
+        metrics = self.metrics
+        label = endpoint_label(url) if metrics is not None else None
+        if (ready := self._limiter_ready) is None:
+            ready = self._limiter_ready = endpoint_ready(self.request_limiter)
+        attempt = 0
+        while True:
+            self.circuit_breaker.before_request(host)
+            if metrics is None:
+                query = {**(params or {}), **self.ticket_provider.get_params()} if authenticate else params
+                ready(endpoint)
+            else:
+                if authenticate:
+                    with metrics.timer(label, 'ticket'):
+                        query = {**(params or {}), **self.ticket_provider.get_params()}
+                else:
+                    query = params
+                with metrics.timer(label, 'limiter'):
+                    ready(endpoint)
+                metrics.pre_request(method, url, query)
+                metrics.inc('requests', label)
+                start = time.perf_counter()
+            retry_after = None
+            try:
+                r = self._http.request(
+                    method, url,
+                    params=urllib.parse.urlencode(query, safe=',') if query is not None else None,
+                    **kwargs
+                )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if metrics is not None:
+                    self._record_response(metrics, label, method, url, query, None, start)
+                self.circuit_breaker.record_failure(host)
+                if not self.retry_policy.can_retry(attempt):
+                    raise
+                reason = redact_auth_params(str(e))
+            else:
+                if metrics is not None:
+                    self._record_response(metrics, label, method, url, query, r, start)
+                if r.status_code in self.retry_policy.retry_statuses:
+                    self.circuit_breaker.record_failure(host)
+                    retry_after = r.headers.get('Retry-After')
+                elif authenticate and self.ticket_provider.uses_tickets and r.status_code in TICKET_REJECTED_STATUSES:
+                    self.circuit_breaker.record_success(host)
+                    retry_after = 0  # retry immediately with a new ticket
+                else:
+                    self.circuit_breaker.record_success(host)
+                    return r
+                if not self.retry_policy.can_retry(attempt):
+                    return r
+                reason = f'status {r.status_code}'
+            if metrics is not None:
+                metrics.inc('retries', label)
+            delay = self.retry_policy.get_delay(attempt, retry_after)
+            logger.warning(f'Request to {redact_auth_params(url)} failed ({reason}); '
+                           f'retry {attempt + 1} in {delay:.1f}s.')
+            if delay > 0:
+                self.retry_policy.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    def _record_response(metrics, label, method, url, query, r, start):
+        elapsed = time.perf_counter() - start
+        metrics.observe(label, 'http', elapsed)
+        if r is None or r.status_code >= 400:
+            metrics.inc('errors', label)
+        if r is not None:
+            metrics.inc('bytes', label, len(r.content))
+        metrics.post_request(method, url, query, r, elapsed)
+
     def _build_url(self, *url):
-        if len(url) == 1 and url[0].startswith('https'):
-            return url[0]
+        if len(url) == 1 and url[0].startswith('http'):
+            url = url[0]
         else:
-            return '/'.join((self.base_url, *url))
+            url = '/'.join((self.base_url, *url))
+        if self.release_tracker is not None:
+            return self.release_tracker.resolve_url(url)
+        return url
+
+    def resolve_version(self, version):
+        """Concrete release for `version` if releases are tracked (e.g., 'current' -> '2022AB')"""
+        if self.release_tracker is None:
+            return version
+        return self.release_tracker.resolve(version)
 
     def _has_error(self, data: dict):
         if 'status' in data:
@@ -55,60 +334,151 @@ class BasicAuthenticator:
             return True
         return False
 
-    def get(self, *url, limit_pages=None, **params):
-        """
+    def _fetch_page(self, url, params):
+        """Retrieve and decode a single page of results"""
+        if self.metrics is not None:
+            return self._fetch_page_instrumented(url, params)
+        if self.cache is not None and (result := self.cache.get(url, params)) is not None:
+            return result
+        if self.single_flight is None:
+            return self._request_page(url, params)
+        return self.single_flight.do(make_cache_key(url, params), self._request_page, url, params)
+
+    def _fetch_page_instrumented(self, url, params):
+        label = endpoint_label(url)
+        self.metrics.inc('pages', label)
+        if self.cache is not None:
+            if (result := self.cache.get(url, params)) is not None:
+                self.metrics.inc('cache_hits', label)
+                return result
+            self.metrics.inc('cache_misses', label)
+        if self.single_flight is None:
+            return self._request_page(url, params)
+        requested = []
+
+        def request_page():
+            requested.append(True)
+            return self._request_page(url, params)
+
+        result = self.single_flight.do(make_cache_key(url, params), request_page)
+        if not requested:
+            self.metrics.inc('coalesced', label)
+        return result
+
+    def _request_page(self, url, params):
+        import requests
+        r = self._send('GET', url, CONTENT_ENDPOINT, params=params, authenticate=True)
+        # check for errors
+        try:
+            r.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            logger.error(redact_auth_params(str(e)))
+        # read result data
+        r.encoding = 'utf-8'
+        if r.status_code in self.retry_policy.retry_statuses:  # transient error, but retries exhausted
+            logger.error(r.text)
+            raise ValueError(r.text)
+        if self.metrics is None:
+            result = self._parse(r)
+        else:
+            with self.metrics.timer(endpoint_label(url), 'parse'):
+                result = self._parse(r)
+        if self.cache is not None and r.ok and 'status' not in result:
+            self.cache.set(url, params, result)
+        return result
+
+    def _parse(self, r):
+        if self._decode is None:
+            return json.loads(r.text)
+        return self._decode(r.content)
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.page_workers,
+                                                    thread_name_prefix='umls-page')
+        return self._executor
+
+    def iter_pages(self, *url, limit_pages=None, parallel=None, **params) -> Iterator[dict]:
+        """Yield each page of results as it arrives.
+
+        The first page is always yielded (even if it reports an error or no results); retrieval stops
+        at the first subsequent page with an error.
 
         :param url: destination to query
         :param limit_pages: return no more than this number of pages (None/0 will be interpreted as return everything)
+        :param parallel: once the page count is known, retrieve remaining pages concurrently
+            (defaults to True if `page_workers` > 1)
         :param params: these will be passed onto the UTS UMLS API
-        :return:
         """
-        results = {'result': []}
-        page_number = 1
-        page_count = 1  # init to 1, will be updated each iteration
+        if parallel is None:
+            parallel = self.page_workers > 1
+        url = self._build_url(*url)
         params = {
-            'pageSize': 25,
-            'pageNumber': page_number,
+            'pageSize': AUTO_PAGE_SIZE if parallel else 25,
+            'pageNumber': 1,
             **params,
         }
-        while page_number <= page_count:
-            if limit_pages and limit_pages > page_number:
-                # return early if, e.g., testing: just grab the first page
-                return results
-            # get service ticket
-            params['ticket'] = self.get_service_ticket()
-            self.request_limiter.ready()
-            r = requests.get(
-                self._build_url(*url),
-                params=urllib.parse.urlencode(params, safe=','),
+        first_page = params['pageNumber']
+        result = self._fetch_page(url, params)
+        yield result
+        if 'status' in result or result.get('recCount', None) in {0, 1}:
+            return
+        page_count = result.get('pageCount', 1)  # check for single-page results
+        last_page = page_count
+        if limit_pages:
+            last_page = min(page_count, first_page + limit_pages - 1)
+        page_numbers = range(first_page + 1, last_page + 1)
+        if parallel:
+            pages = map_ordered(
+                lambda page_number: self._fetch_page(url, {**params, 'pageNumber': page_number}),
+                page_numbers, self._get_executor(), window=self.page_workers,
             )
-            # check for errors
-            try:
-                r.raise_for_status()
-            except requests.exceptions.HTTPError as e:
-                logger.error(e)
-            # read result data
-            r.encoding = 'utf-8'
-            if r.status_code == 502:
-                logger.error(r.text)
-                raise ValueError(r.text)
-            result = json.loads(r.text)
+        else:
+            pages = (self._fetch_page(url, {**params, 'pageNumber': page_number}) for page_number in page_numbers)
+        for page_number, result in zip(page_numbers, pages):
             if self._has_error(result):
-                return results
-            # prepare for retrieving subsequent pages
-            rec_count = result.get('recCount', None)
-            if rec_count == 0:
-                return None
-            elif rec_count == 1:
-                return result
-            if result['pageNumber'] < page_number:  # problem, lower number retrieved, already looked at this
+                break
+            if result['pageNumber'] != page_number:  # problem, different page retrieved than requested
                 logger.warning(f'Page {page_number} not retrievable (expected page count: {page_count}).')
-                return results
-            page_number = result['pageNumber'] + 1  # prepare to get next page
-            params['pageNumber'] = page_number
-            page_count = result.get('pageCount', 1)  # check for single-page results
-            if page_count == 1:
-                return result
+                break
+            yield result
+
+    def iter_results(self, *url, max_items=None, **params) -> Iterator[dict]:
+        """Yield each item in `result` across pages, requesting the next page only when needed.
+
+        :param url: destination to query (should return a list of results)
+        :param max_items: stop after this many items
+        :param params: see `iter_pages`
+        """
+        items = (
+            item
+            for page in self.iter_pages(*url, **params) if not self._has_error(page) and page.get('recCount') != 0
+            for item in page['result']
+        )
+        yield from itertools.islice(items, max_items)
+
+    def get(self, *url, limit_pages=None, parallel=None, **params):
+        """
+
+        :param url: destination to query
+        :param limit_pages: return no more than this number of pages (None/0 will be interpreted as return everything)
+        :param parallel: once the page count is known, retrieve remaining pages concurrently
+            (defaults to True if `page_workers` > 1)
+        :param params: these will be passed onto the UTS UMLS API
+        :return:
+        """
+        pages = self.iter_pages(*url, limit_pages=limit_pages, parallel=parallel, **params)
+        result = next(pages)
+        if self._has_error(result):
+            return {'result': []}
+        rec_count = result.get('recCount', None)
+        if rec_count == 0:
+            return None
+        elif rec_count == 1 or result.get('pageCount', 1) == 1:
+            return result
+        results = {**result, 'result': list(result['result'])}
+        for result in pages:
             results['result'] += result['result']
         return results
 
@@ -124,18 +494,40 @@ class LazyAuthenticator:
         return self.auth.get(*url, **params)
 
     @classmethod
-    def from_apikey(cls, apikey, version='current', request_limiter=None):
-        return cls(BasicAuthenticator(apikey, request_limiter=request_limiter), version=version)
+    def from_apikey(cls, apikey, version='current', request_limiter=None, **kwargs):
+        return cls(BasicAuthenticator(apikey, request_limiter=request_limiter, **kwargs), version=version)
 
-    def get_atoms_for_cui(self, cui, version=None, **params):
-        return self.auth.get(
-            'content', version or self.version, 'CUI', cui, 'atoms',
+    def close(self):
+        self.auth.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def iter_pages(self, *url, **params):
+        return self.auth.iter_pages(*url, **params)
+
+    def iter_results(self, *url, **params):
+        return self.auth.iter_results(*url, **params)
+
+    def _get(self, stream, *url, **params):
+        return (self.auth.iter_pages if stream else self.auth.get)(*url, **params)
+
+    def get_atoms_for_cui(self, cui, version=None, stream=False, **params):
+        """
+
+        :param stream: if True, return an iterator over pages (see `BasicAuthenticator.iter_pages`)
+        """
+        return self._get(
+            stream, 'content', version or self.version, 'CUI', cui, 'atoms',
             **params,
         )
 
-    def get_definitions_for_cui(self, cui, version=None, language='ENG', **params):
-        return self.auth.get(
-            'content', version or self.version, 'CUI', cui, 'definitions',
+    def get_definitions_for_cui(self, cui, version=None, language='ENG', stream=False, **params):
+        return self._get(
+            stream, 'content', version or self.version, 'CUI', cui, 'definitions',
             language=language, **params
         )
 
@@ -145,9 +537,9 @@ class LazyAuthenticator:
             **params
         )
 
-    def get_relations_for_cui(self, cui, version=None, **params):
-        return self.auth.get(
-            'content', version or self.version, 'CUI', cui, 'relations',
+    def get_relations_for_cui(self, cui, version=None, stream=False, **params):
+        return self._get(
+            stream, 'content', version or self.version, 'CUI', cui, 'relations',
             **params,
         )
 
@@ -156,29 +548,88 @@ class LazyAuthenticator:
             'search', version or self.version, string=term, **params
         )
 
+    def crosswalk(self, source, code, target_source=None, version=None, stream=False, **params):
+        """
+
+        :param source: vocabulary of `code` (e.g., ICD10CM)
+        :param target_source: only return codes from this vocabulary (e.g., SNOMEDCT_US); default all
+        """
+        if target_source:
+            params['targetSource'] = target_source
+        return self._get(
+            stream, 'crosswalk', version or self.version, 'source', source, code,
+            **params,
+        )
+
 
 class FriendlyAuthenticator:
     """Attempts to format results and provide iterators. If you want more control, try Lazy or Basic."""
 
-    def __init__(self, authenticator: BasicAuthenticator, version='current'):
+    def __init__(self, authenticator: BasicAuthenticator, version='current', related_memo: LruMemo = None,
+                 max_workers=4, search_index=None, records=False, crosswalk_memo: LruMemo = None):
+        """
+
+        :param authenticator:
+        :param version: UMLS release (e.g., 2022AA)
+        :param related_memo: remembers the concept for each relatedId; defaults to one shared by all instances
+        :param max_workers: number of threads for running independent requests (e.g., for a concept and
+            its definition) concurrently; 0 runs them sequentially
+        :param search_index: answer `search` from this index (see `umls_api_tool.search_index.TermIndex`)
+            rather than the UTS search endpoint
+        :param records: yield compact NamedTuples (see `umls_api_tool.records`) rather than dicts for atoms,
+            definitions, details, relations and crosswalk mappings
+        :param crosswalk_memo: remembers the mappings for each (source, code, target_source, version)
+        """
         self.auth = LazyAuthenticator(authenticator, version=version)
         self.version = version
+        self.related_memo = RELATED_CONCEPTS if related_memo is None else related_memo
+        self.max_workers = max_workers
+        self.search_index = search_index
+        self.records = records
+        self.crosswalk_memo = LruMemo() if crosswalk_memo is None else crosswalk_memo
+        if records:
+            self._atom, self._definition, self._details, self._relation = Atom, Definition, Details, Relation
+            self._mapping = Mapping
+        else:
+            self._atom = self._definition = self._details = self._relation = self._mapping = dict
+        self.metrics = getattr(authenticator, 'metrics', None)  # also times get_details_for_cui, etc.
+        self._executor = None
+        self._executor_lock = threading.Lock()
 
     @classmethod
-    def from_apikey(cls, apikey, version='current', request_limiter=None):
-        return cls(BasicAuthenticator(apikey, request_limiter=request_limiter), version=version)
+    def from_apikey(cls, apikey, version='current', request_limiter=None, related_memo=None, max_workers=4,
+                    search_index=None, records=False, crosswalk_memo=None, **kwargs):
+        return cls(BasicAuthenticator(apikey, request_limiter=request_limiter, **kwargs), version=version,
+                   related_memo=related_memo, max_workers=max_workers, search_index=search_index,
+                   records=records, crosswalk_memo=crosswalk_memo)
 
-    def _check_error(self, data, context):
-        if data is None:
-            logger.warning(f'Data is empty: {context}')
-            return True
-        elif err := data.get('error'):
-            logger.warning(f'Error for {context}: {err}')
-            return True
-        return False
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='umls-friendly')
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self.auth.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    _check_error = staticmethod(check_error)
 
     def search(self, term, version=None, **params) -> Iterator[dict]:
         """Search terms and get back result CUIs"""
+        if self.search_index is not None:
+            yield from self.search_index.search(term, sabs=params.get('sabs'),
+                                                searchType=params.get('searchType', 'words'))
+            return None
         data = self.auth.search_for_term(term, version or self.version, **params)
         if self._check_error(data, term):
             return None
@@ -189,88 +640,282 @@ class FriendlyAuthenticator:
                 'source': result['rootSource'],
             }
 
+    def iter_search(self, term, version=None, max_results=None, **params) -> Iterator[dict]:
+        """Like `search`, but retrieve subsequent pages until results are exhausted or `max_results` found"""
+        if self.search_index is not None:
+            yield from self.search_index.search(term, sabs=params.get('sabs'),
+                                                searchType=params.get('searchType', 'words'),
+                                                max_results=max_results)
+            return None
+        n_results = 0
+        for page_number in itertools.count(params.pop('pageNumber', 1)):
+            data = self.auth.search_for_term(term, version or self.version, pageNumber=page_number, **params)
+            if self._check_error(data, term):
+                return None
+            results = data['result']['results']
+            for result in results:
+                if result['ui'] == 'NONE':  # no (more) results
+                    return None
+                yield {
+                    'cui': result['ui'],
+                    'name': result['name'],
+                    'source': result['rootSource'],
+                }
+                n_results += 1
+                if max_results and n_results >= max_results:
+                    return None
+            if len(results) < data.get('pageSize', 25):
+                return None
+
+    def search_many(self, terms, sabs=None, version=None, top_k=None, workers=None, **params) -> list:
+        """Search for each term in each vocabulary concurrently, merging results by CUI.
+
+        Each concept is ranked by its best position in any search (ties broken by the order of `terms`
+        and `sabs`), so only the first `top_k` results of each search need to be retrieved.
+
+        :param terms: search strings
+        :param sabs: search each of these root source abbreviations separately; default all vocabularies
+        :param top_k: return this many concepts; default all results
+        :param workers: number of searches in flight (default: `max_workers`)
+        :return: list of {'cui', 'name', 'sources', 'terms', 'rank'} ordered by rank
+        """
+        searches = [(term, sab) for term in dict.fromkeys(terms) for sab in (sabs or [None])]
+        workers = workers or self.max_workers or 1
+        if top_k and 'pageSize' not in params:
+            params['pageSize'] = min(top_k, MAX_SEARCH_PAGE_SIZE)  # usually a single page is enough
+
+        def run_search(term_sab):
+            term, sab = term_sab
+            sab_params = {**params, 'sabs': sab} if sab else params
+            return list(self.iter_search(term, version, max_results=top_k, **sab_params))
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='umls-search') as executor:
+            all_results = list(map_ordered(run_search, searches, executor, window=workers))
+        merged = {}
+        best = {}  # cui -> (rank, index of search)
+        for order, ((term, _), results) in enumerate(zip(searches, all_results)):
+            for rank, result in enumerate(results):
+                if (concept := merged.get(result['cui'])) is None:
+                    concept = merged[result['cui']] = {
+                        'cui': result['cui'], 'name': result['name'], 'sources': [], 'terms': [], 'rank': rank,
+                    }
+                    best[result['cui']] = (rank, order)
+                elif rank < concept['rank']:
+                    concept['rank'] = rank
+                    best[result['cui']] = (rank, order)
+                if result['source'] not in concept['sources']:
+                    concept['sources'].append(result['source'])
+                if term not in concept['terms']:
+                    concept['terms'].append(term)
+        concepts = sorted(merged.values(), key=lambda concept: best[concept['cui']])
+        return concepts[:top_k] if top_k else concepts
+
+    def _iter_results(self, pages, context) -> Iterator[dict]:
+        """Yield items from each page as it arrives"""
+        for page in pages:
+            if page.get('recCount', None) == 0:
+                page = None
+            if self._check_error(page, context):
+                return None
+            yield from page.get('result', ())
+
     def get_atoms_for_cui(self, cui, version=None, **params) -> Iterator[dict]:
         """Returns generator spitting out the next atom"""
-        data = self.auth.get_atoms_for_cui(cui, version or self.version, **params)
-        if self._check_error(data, cui):
-            return None
-        for atom in data['result']:
-            yield {
-                'cui': cui,
-                'aui': atom['ui'],
-                'name': atom['name'],
-                'source': atom['rootSource'],
-                'termtype': atom['termType'],
-            }
+        pages = self.auth.get_atoms_for_cui(cui, version or self.version, stream=True, **params)
+        make_atom = self._atom
+        for atom in self._iter_results(pages, cui):
+            yield make_atom(
+                cui=cui,
+                aui=atom['ui'],
+                name=atom['name'],
+                source=atom['rootSource'],
+                termtype=atom['termType'],
+            )
 
     def get_definitions_for_cui(self, cui, version=None, **params) -> Iterator[dict]:
-        data = self.auth.get_definitions_for_cui(cui, version or self.version, **params)
-        if self._check_error(data, cui):
-            return None
-        for definition in data['result']:
-            yield {
-                'cui': cui,
-                'source': definition['rootSource'],
-                'definition': definition['value'],
-            }
+        return self._get_definitions_for_cui(cui, version, self._definition, **params)
+
+    def _get_definitions_for_cui(self, cui, version, make_definition, **params):
+        pages = self.auth.get_definitions_for_cui(cui, version or self.version, stream=True, **params)
+        for definition in self._iter_results(pages, cui):
+            yield make_definition(
+                cui=cui,
+                source=definition['rootSource'],
+                definition=definition['value'],
+            )
+
+    def _get_first_definition(self, cui, version=None, **params):
+        return next(self._get_definitions_for_cui(cui, version, dict, pageSize=1, **params), None)
 
     def get_details_for_cui(self, cui, version=None, **params) -> dict:
+        """Get concept with its first definition, or None if the concept is not found.
+
+        If `max_workers`, both are requested concurrently: the definition is then usually requested even if
+        the concept request fails (it is only cancelled if it has not started). With `max_workers=0`, the
+        definition is only requested once the concept has been found.
+        """
+        if self.metrics is None:
+            return self._get_details_for_cui(cui, version, **params)
+        with self.metrics.timer('details', 'total'):
+            return self._get_details_for_cui(cui, version, **params)
+
+    def _get_details_for_cui(self, cui, version=None, **params) -> dict:
+        definition_future = None
+        if self.max_workers:
+            definition_future = self._get_executor().submit(self._get_first_definition, cui, version, **params)
         data = self.auth.get_details_for_cui(cui, version or self.version, **params)
-        try:
-            definition = next(self.get_definitions_for_cui(cui, pageSize=1, **params))
-        except StopIteration:
-            definition = None
-        if self._check_error(data, cui):
+        if self._check_error(data, cui) or not data['result']:  # failed requests return an empty result
+            if definition_future:
+                definition_future.cancel()
             return None
+        if definition_future:
+            definition = definition_future.result()
+        else:
+            definition = self._get_first_definition(cui, version, **params)
         details = data['result']
-        return {
-            'cui': cui,
-            'name': details['name'],
-            'definition': definition['definition'] if definition else '',
-            'source': definition['source'] if definition else '',
-            'semtypes': [semtype['name'] for semtype in details['semanticTypes']],
-        }
+        return self._details(
+            cui=cui,
+            name=details['name'],
+            definition=definition['definition'] if definition else '',
+            source=definition['source'] if definition else '',
+            semtypes=[semtype['name'] for semtype in details['semanticTypes']],
+        )
 
-    def get_relations_for_cui(self, cui, version=None, **params) -> dict:
-        data = self.auth.get_relations_for_cui(cui, version or self.version, **params)
-        if self._check_error(data, cui):
+    def prefetch(self, cuis, kinds=('details', 'atoms', 'definitions', 'relations'), workers=None,
+                 max_ahead=None, **kwargs) -> Iterator[str]:
+        """Retrieve `kinds` of data for upcoming CUIs in the background, yielding each CUI once cached.
+
+        See `umls_api_tool.prefetch.Prefetcher` for further options.
+
+        :param workers: number of CUIs to retrieve concurrently (default: `max_workers`)
+        :param max_ahead: number of CUIs which may be retrieved before they are consumed
+        """
+        from umls_api_tool.prefetch import prefetch
+        return prefetch(self, cuis, kinds, workers=workers or self.max_workers or 1, max_ahead=max_ahead, **kwargs)
+
+    def get_details_for_cuis(self, cuis, version=None, workers=None, **params) -> Iterator[dict]:
+        """Get details for each CUI (in order), retrieving several CUIs at once.
+
+        :param workers: number of CUIs in flight (default: `max_workers`)
+        """
+        workers = workers or self.max_workers or 1
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='umls-details') as executor:
+            yield from map_ordered(
+                lambda cui: self.get_details_for_cui(cui, version, **params), cuis, executor, window=workers,
+            )
+
+    def _resolve_related_concept(self, related_id):
+        """Find (target cui, name) for a relation's relatedId url (e.g., an atom or source concept)"""
+        rel_data = successful_response(self.auth.get(related_id), related_id)['result']
+        cui_url = related_concept_url(rel_data)
+        return parse_related_concept(
+            rel_data, None if cui_url is None else successful_response(self.auth.get(cui_url), cui_url),
+        )
+
+    def _get_related_concept(self, related_id):
+        """(target cui, name) for a relation's relatedId, or None; failed lookups are not remembered"""
+        try:
+            return self.related_memo.get_or_compute(related_id, lambda: self._resolve_related_concept(related_id))
+        except LookupError:
             return None
-        found_cuis = set()  # cui, relation -> to prevent dupes
+
+    @staticmethod
+    def _unique_relations(relations):
         related_ids = set()  # to prevent duplicates/excess queries
-        for relation in data['result']:
+        for relation in relations:
             # don't call again if this was already found
             if relation['relatedIdName'] in related_ids:
                 continue
             related_ids.add(relation['relatedIdName'])
-            # get relevant CUI
+            yield relation
+
+    def _format_relations(self, cui, relations):
+        found_cuis = set()  # cui, relation -> to prevent dupes
+        for relation in relations:
+            if (concept := self._get_related_concept(relation['relatedId'])) is None:
+                continue
+            target_cui, name = concept
             relation_label = relation['relationLabel']
             addl_relation_label = relation['additionalRelationLabel']
-            rel_data = self.auth.get(relation['relatedId'])['result']
-            if (cui_url := rel_data.get('concepts', rel_data.get('concept', None))) is not None:
-                cui_data = self.auth.get(cui_url)
-                if not cui_data:
-                    logger.warning(f'Failed: {rel_data}')
-                    continue
-                cui_data = cui_data['result']
-            elif rel_data['classType'] == 'Concept':
-                cui_data = rel_data
-            else:
-                logger.warning(f'Failed to identify concept: {rel_data}')
-                continue
-            if not cui_data or cui_data.get('recCount', -1) == 0:
-                continue
-            elif 'results' in cui_data:
-                target_cui = cui_data['results'][0]['ui']
-                name = cui_data['results'][0]['name']
-            else:
-                target_cui = cui_data['ui']
-                name = cui_data['name']
             if (cui_group := (target_cui, relation_label, addl_relation_label)) not in found_cuis:
                 found_cuis.add(cui_group)
-                yield {
-                    'source_cui': cui,
-                    'target_cui': target_cui,
-                    'name': name,
-                    'relation_label': relation_label,
-                    'additional_relation_label': addl_relation_label,
-                }
+                yield self._relation(
+                    source_cui=cui,
+                    target_cui=target_cui,
+                    name=name,
+                    relation_label=relation_label,
+                    additional_relation_label=addl_relation_label,
+                )
+
+    def get_relations_for_cui(self, cui, version=None, **params) -> Iterator[dict]:
+        pages = self.auth.get_relations_for_cui(cui, version or self.version, stream=True, **params)
+        relations = self._format_relations(cui, self._unique_relations(self._iter_results(pages, cui)))
+        if self.metrics is None:
+            yield from relations
+        else:
+            with self.metrics.timer('relations', 'total'):
+                yield from relations
+
+    def get_relations_for_cuis(self, cuis, version=None, **params) -> Iterator[dict]:
+        """Get relations for a batch of CUIs, resolving each distinct relatedId only once.
+
+        All relations for the batch are retrieved before any related concepts are looked up.
+        """
+        batch = []
+        for cui in cuis:
+            data = self.auth.get_relations_for_cui(cui, version or self.version, **params)
+            if self._check_error(data, cui):
+                continue
+            batch.append((cui, list(self._unique_relations(data['result']))))
+        for related_id in dict.fromkeys(relation['relatedId'] for _, relations in batch for relation in relations):
+            self._get_related_concept(related_id)
+        for cui, relations in batch:
+            yield from self._format_relations(cui, relations)
+
+    def crosswalk(self, source, code, target_source=None, version=None, **params) -> list:
+        """Map `code` from the `source` vocabulary to codes in `target_source` (default: all vocabularies)
+
+        Results are remembered per (source, code, target_source, version) in `crosswalk_memo`.
+        """
+        version = self.auth.auth.resolve_version(version or self.version)
+        if params:
+            return list(self._crosswalk(source, code, target_source, version, **params))
+        return self.crosswalk_memo.get_or_compute(
+            (source, code, target_source, version),
+            lambda: list(self._crosswalk(source, code, target_source, version)),
+        )
+
+    def _crosswalk(self, source, code, target_source, version, **params) -> Iterator[dict]:
+        pages = self.auth.crosswalk(source, code, target_source, version, stream=True, **params)
+        for mapping in self._iter_results(pages, f'{source} {code}'):
+            yield self._mapping(
+                source=source,
+                code=code,
+                target_source=mapping['rootSource'],
+                target_code=mapping['ui'],
+                target_name=mapping['name'],
+            )
+
+    def crosswalk_codes(self, source, codes, target_source=None, version=None, workers=None,
+                        **params) -> Iterator[tuple]:
+        """Yield (code, mappings) for each distinct code (in order), mapping several codes at once.
+
+        `mappings` is None if the code could not be retrieved (e.g., retries were exhausted).
+
+        :param workers: number of codes in flight (default: `max_workers`)
+        """
+        workers = workers or self.max_workers or 1
+        seen = set()
+        unique_codes = (code for code in codes if not (code in seen or seen.add(code)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='umls-crosswalk') as executor:
+            yield from map_ordered(
+                lambda code: (code, self._safe_crosswalk(source, code, target_source, version, **params)),
+                unique_codes, executor, window=workers * 2,
+            )
+
+    def _safe_crosswalk(self, source, code, target_source, version, **params):
+        try:
+            return self.crosswalk(source, code, target_source, version, **params)
+        except Exception as e:
+            logger.error(f'Failed to map {source} {code}: {redact_auth_params(str(e))}')
+            return None
@@ -0,0 +1,260 @@
+"""
+Caches for responses retrieved by `BasicAuthenticator`.
+
+Responses are keyed by the url path and query parameters (excluding authentication). Releases other
+than 'current' do not change, so by default these never expire; 'current' results will change when
+a new release is published and so expire after `current_ttl` seconds (unless the authenticator resolves
+'current' to the concrete release: see `umls_api_tool.releases`).
+
+Usage:
+    auth = BasicAuthenticator(apikey, cache=SqliteCache('umls-cache.db'))
+"""
+import json
+import re
+import sqlite3
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+
+CURRENT_VERSION = 'current'
+DEFAULT_CURRENT_TTL = 24 * 60 * 60  # seconds
+DEFAULT_MAX_ENTRIES = 1_000_000
+ACCESS_FLUSH_INTERVAL = 5.0  # seconds between writes of the access times of SqliteCache hits
+ACCESS_FLUSH_SIZE = 1000  # or once this many hits are pending
+AUTH_PARAMS = frozenset({'ticket', 'apiKey'})
+# after these path segments comes a release (e.g., /content/2022AA/...)
+VERSIONED_ENDPOINTS = frozenset({'content', 'search', 'crosswalk', 'semantic-network'})
+_AUTH_PARAM_VALUE = re.compile(rf'\b({"|".join(sorted(AUTH_PARAMS))})=[^&\s\'"]+')
+_TIME_GRANTING_TICKET = re.compile(r'\b(TGT-)[^/?#&\s\'"]+')  # in the path of service ticket requests
+
+
+def make_cache_key(url, params):
+    """Normalized url path + sorted query parameters, ignoring authentication"""
+    path = urllib.parse.urlsplit(url).path.rstrip('/')
+    query = urllib.parse.urlencode(sorted((k, str(v)) for k, v in params.items() if k not in AUTH_PARAMS))
+    return f'{path}?{query}'
+
+
+def redact_auth_params(text):
+    """Mask credentials in urls within `text` (e.g., an error message) before logging: values of authentication
+    parameters and time granting tickets"""
+    return _TIME_GRANTING_TICKET.sub(r'\1***', _AUTH_PARAM_VALUE.sub(r'\1=***', text))
+
+
+def get_version(url):
+    """Extract UMLS release from url (e.g., '.../rest/content/2022AA/CUI/...' -> '2022AA')"""
+    parts = urllib.parse.urlsplit(url).path.strip('/').split('/')
+    for endpoint, version in zip(parts, parts[1:]):
+        if endpoint in VERSIONED_ENDPOINTS:
+            return version
+    return CURRENT_VERSION
+
+
+class ResponseCache:
+    """Common bookkeeping for caches: expiry policy and hit/miss counters.
+
+    Subclasses implement `_get`, `_set`, `clear`, and `get_current_release`/`set_current_release`.
+    """
+
+    def __init__(self, ttl=None, current_ttl=DEFAULT_CURRENT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+
+        :param ttl: seconds before pinned releases (e.g., '2022AA') expire; None to never expire
+        :param current_ttl: seconds before 'current' release responses expire; None to never expire,
+            0 to not cache 'current' responses
+        :param max_entries: least recently used entries beyond this number will be removed
+        """
+        self.ttl = ttl
+        self.current_ttl = current_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def _ttl_for(self, version):
+        return self.current_ttl if version == CURRENT_VERSION else self.ttl
+
+    def get(self, url, params):
+        version = get_version(url)
+        data = self._get(make_cache_key(url, params), self._ttl_for(version))
+        with self._stats_lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def set(self, url, params, data):
+        version = get_version(url)
+        if self._ttl_for(version) == 0:
+            return
+        self._set(make_cache_key(url, params), version, data)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def _get(self, key, ttl):
+        raise NotImplementedError
+
+    def _set(self, key, version, data):
+        raise NotImplementedError
+
+    def clear(self, version=None):
+        """Remove all entries, or only those for `version`"""
+        raise NotImplementedError
+
+    def get_current_release(self):
+        """Release which 'current' referred to when the cache was last used (see `umls_api_tool.releases`)"""
+        raise NotImplementedError
+
+    def set_current_release(self, release):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemoryCache(ResponseCache):
+    """In-process LRU cache."""
+
+    def __init__(self, ttl=None, current_ttl=DEFAULT_CURRENT_TTL, max_entries=10_000):
+        super().__init__(ttl=ttl, current_ttl=current_ttl, max_entries=max_entries)
+        self._data = OrderedDict()  # key -> (created, version, data)
+        self._lock = threading.Lock()
+        self._current_release = None
+
+    def _get(self, key, ttl):
+        with self._lock:
+            if (entry := self._data.get(key)) is None:
+                return None
+            created, version, data = entry
+            if ttl is not None and time.time() - created > ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return data
+
+    def _set(self, key, version, data):
+        with self._lock:
+            self._data[key] = (time.time(), version, data)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self, version=None):
+        with self._lock:
+            if version is None:
+                self._data.clear()
+            else:
+                for key in [key for key, (_, v, _) in self._data.items() if v == version]:
+                    del self._data[key]
+
+    def get_current_release(self):
+        return self._current_release
+
+    def set_current_release(self, release):
+        self._current_release = release
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SqliteCache(ResponseCache):
+    """Persistent LRU cache stored in a SQLite database.
+
+    Access times of hits are written in batches (see `ACCESS_FLUSH_INTERVAL`), and before evicting entries.
+    """
+
+    def __init__(self, path, ttl=None, current_ttl=DEFAULT_CURRENT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        super().__init__(ttl=ttl, current_ttl=current_ttl, max_entries=max_entries)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' key TEXT PRIMARY KEY, version TEXT, data TEXT, created REAL, accessed REAL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+        self._conn.commit()
+        self._count = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        self._accessed = {}  # key -> access time not yet written
+        self._flushed = time.time()
+
+    def _flush_accessed(self):
+        """Write pending access times (with the lock held)"""
+        if self._accessed:
+            self._conn.executemany('UPDATE responses SET accessed = ? WHERE key = ?',
+                                   [(accessed, key) for key, accessed in self._accessed.items()])
+            self._conn.commit()
+            self._accessed.clear()
+        self._flushed = time.time()
+
+    def _get(self, key, ttl):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT data, created FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            data, created = row
+            if ttl is not None and now - created > ttl:
+                self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self._conn.commit()
+                self._accessed.pop(key, None)
+                self._count -= 1
+                return None
+            self._accessed[key] = now
+            if len(self._accessed) >= ACCESS_FLUSH_SIZE or now - self._flushed > ACCESS_FLUSH_INTERVAL:
+                self._flush_accessed()
+        return json.loads(data)
+
+    def _set(self, key, version, data):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, version, data, created, accessed) VALUES (?, ?, ?, ?, ?)',
+                (key, version, json.dumps(data), now, now)
+            )
+            self._accessed.pop(key, None)
+            self._count += 1  # may overcount on replace; corrected when evicting
+            if self._count > self.max_entries:
+                self._flush_accessed()
+                self._count = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+                if (excess := self._count - self.max_entries) > 0:
+                    self._conn.execute(
+                        'DELETE FROM responses WHERE key IN'
+                        ' (SELECT key FROM responses ORDER BY accessed LIMIT ?)', (excess,)
+                    )
+                    self._count -= excess
+            self._conn.commit()
+
+    def clear(self, version=None):
+        with self._lock:
+            self._flush_accessed()
+            if version is None:
+                self._conn.execute('DELETE FROM responses')
+            else:
+                self._conn.execute('DELETE FROM responses WHERE version = ?', (version,))
+            self._conn.commit()
+            self._count = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def get_current_release(self):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE name = 'current_release'").fetchone()
+        return row[0] if row else None
+
+    def set_current_release(self, release):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('current_release', ?)", (release,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._flush_accessed()
+            self._conn.close()
+
+    def __len__(self):
+        return self._count
@@ -0,0 +1,121 @@
+"""
+Command line interface.
+
+Usage: umls-api-tool enrich -k API_KEY [-v current] --input cui-list.txt --kinds details atoms
+       umls-api-tool enrich -k API_KEY --apikeys API_KEY2 --processes 8 --input cui-list.txt
+       umls-api-tool crosswalk -k API_KEY --source ICD10CM --target SNOMEDCT_US --input codes.txt
+       umls-api-tool build-local --rrf-dir 2022AA/META --db umls-2022AA.db
+"""
+import argparse
+
+from umls_api_tool.args import add_auth_args
+
+
+def _add_enrich_parser(subparsers):
+    from umls_api_tool.enrich import KINDS
+    from umls_api_tool.export import SINKS
+    parser = subparsers.add_parser(
+        'enrich', fromfile_prefix_chars='@',
+        help='Retrieve details/atoms/definitions/relations for a file of CUIs (resumable).'
+    )
+    add_auth_args(parser)
+    parser.add_argument('-i', '--input', dest='input_file', default='cui-list.txt',
+                        help='File with one CUI per line.')
+    parser.add_argument('-o', '--outdir', default='.',
+                        help='Directory to write cui-{kind}.{format} files and checkpoint to.')
+    parser.add_argument('--kinds', nargs='+', choices=KINDS, default=list(KINDS),
+                        help='Data to retrieve for each CUI.')
+    parser.add_argument('--format', dest='output_format', choices=list(SINKS), default='csv',
+                        help='Output format (parquet and arrow require pyarrow).')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Number of CUIs to retrieve concurrently (all share the rate limit).')
+    parser.add_argument('--checkpoint', default=None,
+                        help='File recording completed CUIs (default: OUTDIR/enrich.checkpoint).')
+    parser.add_argument('--cache', default=None,
+                        help='Path to SQLite database for caching responses.')
+    parser.add_argument('--on-release-change', dest='on_release_change', choices=('snapshot', 'invalidate'),
+                        default='snapshot',
+                        help="With version 'current', whether to keep (snapshot) or remove (invalidate) cached"
+                             " responses for the previous release once a new release is published.")
+    parser.add_argument('--processes', type=int, default=0,
+                        help='Retrieve CUIs using this number of worker processes rather than threads.')
+    parser.add_argument('--apikeys', nargs='+', default=(),
+                        help='Additional API keys; CUIs are assigned to each key in turn (requires --processes).')
+    parser.add_argument('--requests-per-second', dest='requests_per_second', type=float, default=None,
+                        help='Rate limit for each API key, shared by all processes (default: 20).')
+    parser.set_defaults(func=_enrich)
+
+
+def _enrich(**kwargs):
+    from umls_api_tool.enrich import enrich
+    enrich(**kwargs)
+
+
+def _add_crosswalk_parser(subparsers):
+    from umls_api_tool.export import SINKS
+    parser = subparsers.add_parser(
+        'crosswalk', fromfile_prefix_chars='@',
+        help='Map a file of codes from one vocabulary to another (resumable).'
+    )
+    add_auth_args(parser)
+    parser.add_argument('--source', required=True,
+                        help='Vocabulary of the input codes (e.g., ICD10CM).')
+    parser.add_argument('--target', dest='target_source', default=None,
+                        help='Vocabulary to map to (e.g., SNOMEDCT_US); default: all vocabularies.')
+    parser.add_argument('-i', '--input', dest='input_file', default='codes.txt',
+                        help='File with one code per line.')
+    parser.add_argument('-o', '--outdir', default='.',
+                        help='Directory to write mapping table and checkpoint to.')
+    parser.add_argument('--format', dest='output_format', choices=list(SINKS), default='csv',
+                        help='Output format (parquet and arrow require pyarrow).')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Number of codes to map concurrently (all share the rate limit).')
+    parser.add_argument('--checkpoint', default=None,
+                        help='File recording completed codes (default: OUTDIR/crosswalk.checkpoint).')
+    parser.add_argument('--cache', default=None,
+                        help='Path to SQLite database for caching responses.')
+    parser.add_argument('--on-release-change', dest='on_release_change', choices=('snapshot', 'invalidate'),
+                        default='snapshot',
+                        help="With version 'current', whether to keep (snapshot) or remove (invalidate) cached"
+                             " responses for the previous release once a new release is published.")
+    parser.set_defaults(func=_crosswalk)
+
+
+def _crosswalk(**kwargs):
+    from umls_api_tool.crosswalk import crosswalk
+    crosswalk(**kwargs)
+
+
+def _add_build_local_parser(subparsers):
+    parser = subparsers.add_parser(
+        'build-local', fromfile_prefix_chars='@',
+        help='Build local store from UMLS RRF files for use with LocalAuthenticator.'
+    )
+    parser.add_argument('--rrf-dir', dest='rrf_dir', required=True,
+                        help='Directory containing MRCONSO.RRF, MRDEF.RRF, MRSTY.RRF and MRREL.RRF.')
+    parser.add_argument('--db', dest='db_path', required=True,
+                        help='Path of SQLite database to create.')
+    parser.add_argument('-v', '--version', default=None,
+                        help='UMLS release of the RRF files (e.g., 2022AA).')
+    parser.set_defaults(func=_build_local)
+
+
+def _build_local(**kwargs):
+    from umls_api_tool.local import build_local_store
+    build_local_store(**kwargs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='umls-api-tool', fromfile_prefix_chars='@')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    _add_enrich_parser(subparsers)
+    _add_crosswalk_parser(subparsers)
+    _add_build_local_parser(subparsers)
+    args = vars(parser.parse_args(argv))
+    args.pop('command')
+    func = args.pop('func')
+    func(**args)
+
+
+if __name__ == '__main__':
+    main()
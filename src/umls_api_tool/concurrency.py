@@ -0,0 +1,23 @@
+"""Helpers for running requests concurrently while preserving order."""
+import itertools
+from collections import deque
+from concurrent.futures import Executor
+from typing import Callable, Iterable, Iterator
+
+
+def map_ordered(func: Callable, iterable: Iterable, executor: Executor, window: int) -> Iterator:
+    """Like `executor.map`, but only keeps `window` calls ahead of the consumer.
+
+    Results are yielded in input order; calls which have not started are cancelled if the consumer stops.
+    """
+    iterable = iter(iterable)
+    pending = deque(executor.submit(func, item) for item in itertools.islice(iterable, max(window, 1)))
+    try:
+        while pending:
+            result = pending.popleft().result()
+            for item in itertools.islice(iterable, 1):
+                pending.append(executor.submit(func, item))
+            yield result
+    finally:
+        for future in pending:
+            future.cancel()
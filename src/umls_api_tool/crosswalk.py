@@ -0,0 +1,79 @@
+"""
+Map a (large) file of codes from one vocabulary to another (e.g., ICD10CM to SNOMEDCT_US).
+
+The mapping table (one row per source code and target code) is written incrementally and each completed
+code is recorded in a checkpoint file so that an interrupted run can be resumed by re-running the same
+command. Duplicate codes in the input are mapped once. As in `umls_api_tool.enrich`, with columnar formats
+(parquet, arrow), completed codes are recorded once the output file has been closed.
+"""
+import os
+import time
+
+from umls_api_tool.auth import FriendlyAuthenticator, DEFAULT_POOL_SIZE
+from umls_api_tool.cache import CURRENT_VERSION
+from umls_api_tool.enrich import Checkpoint, read_checkpoint, read_cuis as read_codes
+from umls_api_tool.export import open_sink
+from umls_api_tool.log import logger
+from umls_api_tool.releases import SNAPSHOT, resolve_current_release
+
+CHECKPOINT_FILENAME = 'crosswalk.checkpoint'
+
+
+def crosswalk(apikey, source, target_source=None, version='current', input_file='codes.txt', outdir='.',
+              output_format='csv', workers=4, checkpoint=None, cache=None, report_every=1000,
+              on_release_change=SNAPSHOT, **auth_kwargs):
+    """Map codes in `input_file`, writing `outdir/{source}-{target_source}-crosswalk.{output_format}`
+
+    :param apikey: UMLS api key
+    :param source: vocabulary of input codes (e.g., ICD10CM)
+    :param target_source: vocabulary to map to (e.g., SNOMEDCT_US); default all vocabularies
+    :param version: UMLS release
+    :param input_file: file with one code per line
+    :param outdir: directory to write output file to
+    :param output_format: one of 'csv', 'jsonl', 'parquet', 'arrow'
+    :param workers: number of codes to map concurrently
+    :param checkpoint: file recording completed codes (default: `outdir/crosswalk.checkpoint`)
+    :param cache: path to SQLite response cache
+    :param report_every: log throughput after this many codes
+    :param on_release_change: see `umls_api_tool.enrich.enrich`
+    :param auth_kwargs: passed on to BasicAuthenticator
+    :return: number of codes mapped, number of codes without any mapping, number failed
+    """
+    os.makedirs(outdir, exist_ok=True)
+    checkpoint = checkpoint or os.path.join(outdir, CHECKPOINT_FILENAME)
+    completed = read_checkpoint(checkpoint)
+    if completed:
+        logger.info(f'Resuming: skipping {len(completed)} completed codes in {checkpoint}')
+    kwargs = {'pool_size': max(DEFAULT_POOL_SIZE, workers), **auth_kwargs}
+    if cache:
+        from umls_api_tool.cache import SqliteCache
+        kwargs['cache'] = SqliteCache(cache)
+    start = time.monotonic()
+    n_done = n_unmapped = n_failed = 0
+    try:
+        if version == CURRENT_VERSION:
+            version = resolve_current_release(apikey, cache=kwargs.get('cache'), on_change=on_release_change,
+                                              **auth_kwargs)
+        with FriendlyAuthenticator.from_apikey(apikey, version, max_workers=workers, **kwargs) as auth, \
+                open_sink(output_format, outdir, 'crosswalk', prefix=f'{source}-{target_source or "all"}') as sink, \
+                Checkpoint(checkpoint, [sink]) as checkpointer:
+            codes = read_codes(input_file, skip=completed)
+            for code, mappings in auth.crosswalk_codes(source, codes, target_source):
+                if mappings is None:
+                    n_failed += 1
+                    continue
+                sink.write_all(mappings)
+                checkpointer.done(code)
+                n_done += 1
+                n_unmapped += not mappings
+                if n_done % report_every == 0:
+                    elapsed = time.monotonic() - start
+                    logger.info(f'Completed {n_done} codes ({n_done / elapsed:.1f} codes/s;'
+                                f' {n_unmapped} unmapped; {n_failed} failed)')
+    finally:
+        if 'cache' in kwargs:
+            kwargs['cache'].close()
+    elapsed = time.monotonic() - start
+    logger.info(f'Finished {n_done} codes in {elapsed:.1f}s ({n_done / max(elapsed, 1e-9):.1f} codes/s;'
+                f' {n_unmapped} unmapped; {n_failed} failed and can be retried by re-running)')
+    return n_done, n_unmapped, n_failed
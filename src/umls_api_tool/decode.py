@@ -0,0 +1,35 @@
+"""
+JSON decoders for response bodies.
+
+The fast decoders parse the raw response bytes directly (skipping the intermediate `str`), using
+`orjson` or `msgspec` if installed (`pip install umls_api_tool[fast]`) and falling back to the stdlib.
+
+Usage:
+    auth = BasicAuthenticator(apikey, json_backend='auto')
+"""
+import importlib
+import importlib.util
+import json
+
+FAST_BACKENDS = ('orjson', 'msgspec')  # in order of preference; imported when first requested
+
+
+def available_backends():
+    return ['json', *(backend for backend in FAST_BACKENDS if importlib.util.find_spec(backend) is not None)]
+
+
+def get_decoder(backend='auto'):
+    """Return function decoding json bytes
+
+    :param backend: 'orjson', 'msgspec', 'json' (stdlib), or 'auto' for the fastest available
+    """
+    if backend == 'auto':
+        backend = next((name for name in FAST_BACKENDS if importlib.util.find_spec(name) is not None), 'json')
+    if backend == 'json':
+        return json.loads  # accepts bytes
+    if backend in FAST_BACKENDS and importlib.util.find_spec(backend) is not None:
+        module = importlib.import_module(backend)
+        if backend == 'orjson':
+            return module.loads
+        return importlib.import_module('msgspec.json').Decoder().decode
+    raise ValueError(f'JSON backend not available: {backend}; expected one of {available_backends()} or "auto"')
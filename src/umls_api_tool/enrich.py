@@ -0,0 +1,196 @@
+"""
+Enrich a (large) file of CUIs with details, atoms, definitions and/or relations.
+
+Output is written incrementally (one file per kind) and each completed CUI is recorded in a checkpoint
+file so that an interrupted run can be resumed by re-running the same command. A CUI that was being
+written when the process stopped may appear twice in the output.
+
+Columnar formats (parquet, arrow) cannot be appended to, so completed CUIs are only recorded once the
+output files have been closed; a resumed run writes its output to new files alongside the old ones
+(e.g., `cui-atoms.1.parquet`).
+"""
+import contextlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator
+
+from umls_api_tool.auth import FriendlyAuthenticator, DEFAULT_POOL_SIZE
+from umls_api_tool.cache import CURRENT_VERSION, redact_auth_params
+from umls_api_tool.concurrency import map_ordered
+from umls_api_tool.export import open_sink
+from umls_api_tool.log import logger
+from umls_api_tool.releases import SNAPSHOT, resolve_current_release
+from umls_api_tool.request_limiter import TokenBucketRequestLimiter, MAX_REQUESTS_PER_SECOND
+
+KINDS = ('details', 'atoms', 'definitions', 'relations')
+CHECKPOINT_FILENAME = 'enrich.checkpoint'
+
+
+def read_cuis(path, skip=None) -> Iterator[str]:
+    """Stream CUIs from file (one per line), ignoring blank lines and those in `skip`"""
+    skip = skip or set()
+    with open(path, encoding='utf8') as fh:
+        for line in fh:
+            if (cui := line.strip()) and cui not in skip:
+                yield cui
+
+
+def read_checkpoint(path) -> set:
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding='utf8') as fh:
+        return {line.strip() for line in fh if line.strip()}
+
+
+class Checkpoint:
+    """Record completed items (e.g., CUIs) in `path` once their records are safely stored by `sinks`.
+
+    If all sinks are durable on flush (csv, jsonl), each item is recorded as soon as it is done; otherwise,
+    items are recorded when the sinks are closed (so an item is never recorded without its records).
+    Closing the checkpoint closes the sinks.
+    """
+
+    def __init__(self, path, sinks):
+        self.path = path
+        self.sinks = list(sinks)
+        self.deferred = not all(sink.durable_on_flush for sink in self.sinks)
+        self._pending = []
+        self._fh = open(path, 'a', encoding='utf8')
+
+    def done(self, item):
+        """Record `item`, all of whose records have been written to the sinks"""
+        if self.deferred:
+            self._pending.append(item)
+            return
+        for sink in self.sinks:
+            sink.flush()
+        self._fh.write(f'{item}\n')
+        self._fh.flush()
+
+    def close(self):
+        try:
+            for sink in self.sinks:
+                sink.close()
+            self._fh.writelines(f'{item}\n' for item in self._pending)
+            self._pending.clear()
+        finally:
+            self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def enrich_cui(auth: FriendlyAuthenticator, cui, kinds=KINDS) -> dict:
+    """Retrieve records of each kind for a single CUI"""
+    records = {}
+    for kind in kinds:
+        if kind == 'details':
+            details = auth.get_details_for_cui(cui)
+            records[kind] = [details] if details else []
+        elif kind == 'atoms':
+            records[kind] = list(auth.get_atoms_for_cui(cui))
+        elif kind == 'definitions':
+            records[kind] = list(auth.get_definitions_for_cui(cui))
+        elif kind == 'relations':
+            records[kind] = list(auth.get_relations_for_cui(cui))
+        else:
+            raise ValueError(f'Unrecognized kind: {kind}; expected one of {KINDS}')
+    return records
+
+
+def _safe_enrich_cui(auth, cui, kinds):
+    try:
+        return enrich_cui(auth, cui, kinds)
+    except Exception as e:
+        logger.error(f'Failed to retrieve {cui}: {redact_auth_params(str(e))}')
+        return None
+
+
+def enrich_cuis(auth: FriendlyAuthenticator, cuis: Iterable[str], kinds=KINDS, workers=4) -> Iterator[tuple]:
+    """Yield (cui, records) in input order, retrieving up to `workers` CUIs concurrently.
+
+    `records` is None if the CUI could not be retrieved.
+    """
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='umls-enrich') as executor:
+        yield from map_ordered(
+            lambda cui: (cui, _safe_enrich_cui(auth, cui, kinds)), cuis, executor, window=workers * 2,
+        )
+
+
+def enrich(apikey, version='current', input_file='cui-list.txt', outdir='.', kinds=KINDS,
+           output_format='csv', workers=4, checkpoint=None, cache=None, report_every=100, processes=0,
+           apikeys=(), requests_per_second=None, on_release_change=SNAPSHOT, **auth_kwargs):
+    """Enrich CUIs in `input_file`, writing `outdir/cui-{kind}.{output_format}`
+
+    :param apikey: UMLS api key
+    :param version: UMLS release
+    :param input_file: file with one CUI per line
+    :param outdir: directory to write output files to
+    :param kinds: any of 'details', 'atoms', 'definitions', 'relations'
+    :param output_format: one of 'csv', 'jsonl', 'parquet', 'arrow' (see `umls_api_tool.export.SINKS`)
+    :param workers: number of CUIs to retrieve concurrently
+    :param checkpoint: file recording completed CUIs (default: `outdir/enrich.checkpoint`)
+    :param cache: path to SQLite response cache
+    :param report_every: log throughput after this many CUIs
+    :param processes: if set, retrieve CUIs using this number of worker processes (one CUI at a time
+        each) instead of `workers` threads
+    :param apikeys: additional api keys to assign CUIs to in turn (requires `processes`)
+    :param requests_per_second: rate budget of each api key (shared by all processes)
+    :param on_release_change: if `version` is 'current', it is resolved to the concrete release once for the
+        whole run; SNAPSHOT keeps or INVALIDATE removes responses cached for a previous release
+    :param auth_kwargs: passed on to BasicAuthenticator
+    """
+    os.makedirs(outdir, exist_ok=True)
+    checkpoint = checkpoint or os.path.join(outdir, CHECKPOINT_FILENAME)
+    completed = read_checkpoint(checkpoint)
+    if completed:
+        logger.info(f'Resuming: skipping {len(completed)} completed CUIs in {checkpoint}')
+    if apikeys and not processes:
+        raise ValueError('Multiple api keys require `processes`.')
+    kwargs = {'pool_size': max(DEFAULT_POOL_SIZE, workers), **auth_kwargs}
+    if requests_per_second and not processes:
+        kwargs['request_limiter'] = TokenBucketRequestLimiter(requests_per_second)
+    if cache and not processes:
+        from umls_api_tool.cache import SqliteCache
+        kwargs['cache'] = SqliteCache(cache)
+    start = time.monotonic()
+    n_done = n_failed = 0
+    try:
+        if version == CURRENT_VERSION:
+            version = resolve_current_release(apikey, cache=kwargs.get('cache', cache), on_change=on_release_change,
+                                              **auth_kwargs)
+        with contextlib.ExitStack() as stack:
+            sinks = {kind: open_sink(output_format, outdir, kind) for kind in kinds}
+            checkpointer = stack.enter_context(Checkpoint(checkpoint, sinks.values()))
+            cuis = read_cuis(input_file, skip=completed)
+            if processes:
+                from umls_api_tool.parallel import enrich_cuis_parallel
+                results = enrich_cuis_parallel(
+                    [apikey, *apikeys], cuis, version, kinds, processes=processes, cache=cache,
+                    requests_per_second=requests_per_second or MAX_REQUESTS_PER_SECOND, **kwargs,
+                )
+            else:
+                auth = stack.enter_context(FriendlyAuthenticator.from_apikey(apikey, version, **kwargs))
+                results = enrich_cuis(auth, cuis, kinds, workers)
+            for cui, records in results:
+                if records is None:
+                    n_failed += 1
+                    continue
+                for kind, sink in sinks.items():
+                    sink.write_all(records[kind])
+                checkpointer.done(cui)
+                n_done += 1
+                if n_done % report_every == 0:
+                    elapsed = time.monotonic() - start
+                    logger.info(f'Completed {n_done} CUIs ({n_done / elapsed:.1f} CUIs/s; {n_failed} failed)')
+    finally:
+        if 'cache' in kwargs:
+            kwargs['cache'].close()
+    elapsed = time.monotonic() - start
+    logger.info(f'Finished {n_done} CUIs in {elapsed:.1f}s ({n_done / max(elapsed, 1e-9):.1f} CUIs/s;'
+                f' {n_failed} failed and can be retried by re-running)')
+    return n_done, n_failed
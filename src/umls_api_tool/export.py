@@ -0,0 +1,203 @@
+"""Streaming writers for records produced by `FriendlyAuthenticator`.
+
+CSV and JSONL are always available; Parquet and Arrow IPC require `pyarrow` (`pip install .[arrow]`)
+and are written in batches with a fixed schema (list values such as semtypes are list columns).
+"""
+import csv
+import json
+import importlib
+import os
+
+FIELDS = {
+    'details': ['cui', 'name', 'definition', 'source', 'semtypes'],
+    'atoms': ['cui', 'aui', 'name', 'source', 'termtype'],
+    'definitions': ['cui', 'source', 'definition'],
+    'relations': ['source_cui', 'target_cui', 'name', 'relation_label', 'additional_relation_label'],
+    'crosswalk': ['source', 'code', 'target_source', 'target_code', 'target_name'],
+}
+LIST_FIELDS = frozenset({'semtypes'})
+LIST_SEPARATOR = '|'  # for list values (e.g., semtypes) in CSV
+DEFAULT_BATCH_SIZE = 10_000  # records per batch (row group) in columnar formats
+
+
+def as_dict(record):
+    """Records may be dicts or NamedTuples from `umls_api_tool.records`"""
+    return record._asdict() if hasattr(record, '_asdict') else record
+
+
+class Sink:
+    """Write one record at a time to `path`, appending if the file already exists (see ArrowSink for exceptions)."""
+    extension = None
+    durable_on_flush = True  # if False, records are only safely stored once the sink is closed
+
+    def __init__(self, path, fields):
+        self.path = path
+        self.fields = fields
+
+    def write(self, record: dict):
+        raise NotImplementedError
+
+    def write_all(self, records):
+        for record in records:
+            self.write(record)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class CsvSink(Sink):
+    extension = 'csv'
+
+    def __init__(self, path, fields):
+        super().__init__(path, fields)
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._fh = open(path, 'a', newline='', encoding='utf8')
+        self._writer = csv.DictWriter(self._fh, fieldnames=fields, extrasaction='ignore')
+        if is_new:
+            self._writer.writeheader()
+
+    def write(self, record: dict):
+        self._writer.writerow({
+            key: LIST_SEPARATOR.join(value) if isinstance(value, (list, tuple)) else value
+            for key, value in as_dict(record).items()
+        })
+
+    def flush(self):
+        self._fh.flush()
+
+    def close(self):
+        self._fh.close()
+
+
+class JsonlSink(Sink):
+    extension = 'jsonl'
+
+    def __init__(self, path, fields):
+        super().__init__(path, fields)
+        self._fh = open(path, 'a', encoding='utf8')
+
+    def write(self, record: dict):
+        record = as_dict(record)
+        self._fh.write(json.dumps({field: record.get(field) for field in self.fields}) + '\n')
+
+    def flush(self):
+        self._fh.flush()
+
+    def close(self):
+        self._fh.close()
+
+
+def _import_pyarrow(extension):
+    """Import pyarrow when first needed, as it is slow to import"""
+    try:
+        return importlib.import_module('pyarrow')
+    except ImportError:
+        raise ImportError(f'{extension} output requires pyarrow: pip install pyarrow') from None
+
+
+def get_arrow_schema(fields):
+    pyarrow = _import_pyarrow('arrow')
+    return pyarrow.schema([
+        (field, pyarrow.list_(pyarrow.string()) if field in LIST_FIELDS else pyarrow.string()) for field in fields
+    ])
+
+
+def _next_part(path):
+    """`path`, or if it exists, the first of `name.1.ext`, `name.2.ext`, etc. which does not"""
+    stem, ext = os.path.splitext(path)
+    part = 0
+    while os.path.exists(path):
+        part += 1
+        path = f'{stem}.{part}{ext}'
+    return path
+
+
+class ArrowSink(Sink):
+    """Arrow IPC file, written in batches of `batch_size` records.
+
+    Columnar files cannot be appended to: if the file already exists (e.g., when resuming), a new part is
+    written alongside it (`cui-atoms.1.arrow`, etc.), unless no records are written to it. The file is written
+    to a temporary path and only renamed once closed.
+    """
+    extension = 'arrow'
+    durable_on_flush = False
+
+    def __init__(self, path, fields, batch_size=DEFAULT_BATCH_SIZE):
+        self._pyarrow = _import_pyarrow(self.extension)
+        super().__init__(_next_part(path), fields)
+        self._is_part = self.path != path
+        self.n_records = 0
+        self.schema = get_arrow_schema(fields)
+        self.batch_size = batch_size
+        self._columns = {field: [] for field in fields}
+        self._size = 0
+        self._temp_path = f'{self.path}.tmp'
+        self._writer = self._open_writer(self._temp_path)
+
+    def _open_writer(self, path):
+        return importlib.import_module('pyarrow.ipc').new_file(path, self.schema)
+
+    def write(self, record: dict):
+        record = as_dict(record)
+        for field, values in self._columns.items():
+            values.append(record.get(field))
+        self._size += 1
+        self.n_records += 1
+        if self._size >= self.batch_size:
+            self._write_batch()
+
+    def _write_batch(self):
+        if not self._size:
+            return
+        pyarrow = self._pyarrow
+        batch = pyarrow.record_batch(
+            [pyarrow.array(self._columns[field], type=self.schema.field(field).type) for field in self.fields],
+            schema=self.schema,
+        )
+        self._writer.write_table(pyarrow.Table.from_batches([batch]))
+        for values in self._columns.values():
+            values.clear()
+        self._size = 0
+
+    def close(self):
+        if self._writer is None:
+            return
+        self._write_batch()
+        self._writer.close()
+        self._writer = None
+        if self._is_part and not self.n_records:
+            os.remove(self._temp_path)
+        else:
+            os.replace(self._temp_path, self.path)
+
+
+class ParquetSink(ArrowSink):
+    """Parquet file with one row group per batch (see ArrowSink)."""
+    extension = 'parquet'
+
+    def _open_writer(self, path):
+        return importlib.import_module('pyarrow.parquet').ParquetWriter(path, self.schema)
+
+
+SINKS = {
+    'csv': CsvSink,
+    'jsonl': JsonlSink,
+    'parquet': ParquetSink,
+    'arrow': ArrowSink,
+}
+
+
+def open_sink(output_format, outdir, kind, prefix='cui'):
+    """Open sink for `kind` of record (see FIELDS) as, e.g., `outdir/cui-atoms.csv`"""
+    sink_class = SINKS[output_format]
+    path = os.path.join(outdir, f'{prefix}-{kind}.{sink_class.extension}')
+    return sink_class(path, FIELDS[kind])
@@ -0,0 +1,239 @@
+"""
+Compact store of concept relations, populated lazily from `FriendlyAuthenticator.get_relations_for_cui`
+(or all at once from a local store/MRREL), for multi-hop expansion of concepts.
+
+CUIs and relation labels are interned as integers and each concept's edges are kept in arrays, so that
+large neighborhoods (or all of MRREL) fit in memory. Once a concept's relations have been retrieved, they
+are never requested again, including after `save`/`load`.
+
+Usage:
+    graph = ConceptGraph.load('graph.pkl') if os.path.exists('graph.pkl') else ConceptGraph()
+    with FriendlyAuthenticator.from_apikey(apikey, '2022AA') as auth:
+        depths = graph.expand(['C0011849'], depth=2, labels={'RB', 'RN', 'isa'}, max_nodes=500, auth=auth)
+    graph.save('graph.pkl')
+"""
+import pickle
+import sqlite3
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator
+
+from umls_api_tool.cache import redact_auth_params
+from umls_api_tool.concurrency import map_ordered
+from umls_api_tool.export import as_dict
+from umls_api_tool.log import logger
+
+
+class ConceptGraph:
+
+    def __init__(self):
+        self._ids = {}  # cui -> node id
+        self._cuis = []  # node id -> cui
+        self._names = []  # node id -> name (or None)
+        self._targets = []  # node id -> array of target node ids; None if relations not yet retrieved
+        self._edge_labels = []  # node id -> array of label ids (parallel to targets)
+        self._label_ids = {}  # (relation_label, additional_relation_label) -> label id
+        self._labels = []  # label id -> (relation_label, additional_relation_label)
+
+    def _intern(self, cui, name=None):
+        if (node := self._ids.get(cui)) is None:
+            node = self._ids[cui] = len(self._cuis)
+            self._cuis.append(cui)
+            self._names.append(name)
+            self._targets.append(None)
+            self._edge_labels.append(None)
+        elif name and self._names[node] is None:
+            self._names[node] = name
+        return node
+
+    def _intern_label(self, relation_label, additional_relation_label):
+        key = (relation_label or '', additional_relation_label or '')
+        if (label := self._label_ids.get(key)) is None:
+            label = self._label_ids[key] = len(self._labels)
+            self._labels.append(key)
+        return label
+
+    def _set_edges(self, node, edges):
+        """Replace edges of node with (target node, label id) pairs, ignoring duplicates and self-loops"""
+        edges = [edge for edge in dict.fromkeys(edges) if edge[0] != node]
+        self._targets[node] = array('i', (target for target, _ in edges))
+        self._edge_labels[node] = array('H', (label for _, label in edges))
+
+    def set_relations(self, cui, relations, name=None):
+        """Record all relations of `cui`, as yielded by `FriendlyAuthenticator.get_relations_for_cui`"""
+        node = self._intern(cui, name)
+        edges = []
+        for relation in map(as_dict, relations):
+            edges.append((
+                self._intern(relation['target_cui'], relation['name']),
+                self._intern_label(relation['relation_label'], relation['additional_relation_label']),
+            ))
+        self._set_edges(node, edges)
+
+    def is_expanded(self, cui):
+        """True if relations of `cui` have been retrieved"""
+        return (node := self._ids.get(cui)) is not None and self._targets[node] is not None
+
+    def get_name(self, cui):
+        return self._names[self._ids[cui]] if cui in self._ids else None
+
+    def _allowed_labels(self, labels):
+        if not labels:
+            return None
+        return {
+            label for label, (relation_label, additional_label) in enumerate(self._labels)
+            if relation_label in labels or additional_label in labels
+        }
+
+    def _neighbor_nodes(self, node, allowed):
+        if (targets := self._targets[node]) is None:
+            return
+        if allowed is None:
+            yield from targets
+        else:
+            for target, label in zip(targets, self._edge_labels[node]):
+                if label in allowed:
+                    yield target
+
+    def neighbors(self, cui, labels=None) -> Iterator[dict]:
+        """Yield known relations of `cui` (only the first hop; see `expand`)
+
+        :param labels: only include relations with these relation labels or additional relation labels
+            (e.g., {'RB', 'RN'} or {'isa'})
+        """
+        if (node := self._ids.get(cui)) is None or self._targets[node] is None:
+            return
+        allowed = self._allowed_labels(labels)
+        for target, label in zip(self._targets[node], self._edge_labels[node]):
+            if allowed is None or label in allowed:
+                relation_label, additional_label = self._labels[label]
+                yield {
+                    'source_cui': cui,
+                    'target_cui': self._cuis[target],
+                    'name': self._names[target],
+                    'relation_label': relation_label,
+                    'additional_relation_label': additional_label,
+                }
+
+    def _fetch(self, auth, cui):
+        """Retrieve relations of `cui` unless already known; returns None if nothing to add"""
+        if auth is None or self.is_expanded(cui):
+            return None
+        try:
+            return list(auth.get_relations_for_cui(cui))
+        except Exception as e:
+            logger.error(f'Failed to retrieve relations for {cui}: {redact_auth_params(str(e))}')
+            return None
+
+    def expand(self, cuis: Iterable[str], depth=1, labels=None, max_nodes=None, auth=None, workers=4) -> dict:
+        """Breadth-first expansion from `cuis`, retrieving relations of unseen concepts as needed.
+
+        :param depth: maximum number of hops
+        :param labels: only follow relations with these relation labels or additional relation labels
+        :param max_nodes: stop once this many concepts (including `cuis`) have been found
+        :param auth: FriendlyAuthenticator used to retrieve relations of concepts not yet in the graph;
+            if None, only the relations already in the graph are used
+        :param workers: number of concepts in each frontier to retrieve concurrently
+        :return: cui -> number of hops from `cuis`, in the order found
+        """
+        depths = {}
+        for cui in cuis:
+            if max_nodes and len(depths) >= max_nodes:
+                return depths
+            depths.setdefault(cui, 0)
+        frontier = list(depths)
+        with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix='umls-graph') as executor:
+            for hop in range(1, depth + 1):
+                next_frontier = []
+                results = map_ordered(lambda cui: (cui, self._fetch(auth, cui)), frontier, executor,
+                                      window=max(workers, 1) * 2)
+                for cui, relations in results:
+                    if relations is not None:
+                        self.set_relations(cui, relations)
+                    if (node := self._ids.get(cui)) is None:
+                        continue
+                    allowed = self._allowed_labels(labels)
+                    for target in self._neighbor_nodes(node, allowed):
+                        if (target_cui := self._cuis[target]) in depths:
+                            continue
+                        if max_nodes and len(depths) >= max_nodes:
+                            results.close()  # cancel pending retrievals
+                            return depths
+                        depths[target_cui] = hop
+                        next_frontier.append(target_cui)
+                if not next_frontier:
+                    break
+                frontier = next_frontier
+        return depths
+
+    def _add_edges(self, node, edges):
+        if (targets := self._targets[node]) is not None:
+            edges = list(zip(targets, self._edge_labels[node])) + edges
+        self._set_edges(node, edges)
+
+    @classmethod
+    def _from_rows(cls, rows):
+        """Build complete graph from (cui1, relation_label, cui2, additional_label) rows (best sorted by cui1)"""
+        graph = cls()
+        current, edges = None, []
+        for cui1, relation_label, cui2, additional_label in rows:
+            if (node := graph._intern(cui1)) != current:
+                if current is not None:
+                    graph._add_edges(current, edges)
+                current, edges = node, []
+            edges.append((graph._intern(cui2), graph._intern_label(relation_label, additional_label)))
+        if current is not None:
+            graph._add_edges(current, edges)
+        for node, targets in enumerate(graph._targets):  # concepts without relations
+            if targets is None:
+                graph._set_edges(node, [])
+        return graph
+
+    @classmethod
+    def from_local_store(cls, db_path, include_suppressible=False):
+        """Build from all relations in SQLite store created by `umls_api_tool.local.build_local_store`"""
+        conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+        sql = 'SELECT CUI1, REL, CUI2, RELA FROM rel'
+        if not include_suppressible:
+            sql += " WHERE SUPPRESS = 'N'"
+        graph = cls._from_rows(conn.execute(sql + ' ORDER BY CUI1'))
+        for cui, name in conn.execute("SELECT CUI, STR FROM conso WHERE TS = 'P' AND ISPREF = 'Y' AND LAT = 'ENG'"):
+            if (node := graph._ids.get(cui)) is not None and graph._names[node] is None:
+                graph._names[node] = name
+        conn.close()
+        return graph
+
+    @classmethod
+    def from_rrf(cls, mrrel_path, include_suppressible=False):
+        """Build directly from MRREL.RRF (which is sorted by CUI1)"""
+
+        def read_rows():
+            with open(mrrel_path, encoding='utf8') as fh:
+                for line in fh:
+                    row = line.split('|')
+                    if not include_suppressible and row[14] != 'N':
+                        continue
+                    yield row[0], row[3], row[4], row[7]
+
+        return cls._from_rows(read_rows())
+
+    def save(self, path):
+        with open(path, 'wb') as fh:
+            pickle.dump(self.__dict__, fh, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        graph = cls()
+        with open(path, 'rb') as fh:
+            graph.__dict__.update(pickle.load(fh))
+        return graph
+
+    def __contains__(self, cui):
+        return cui in self._ids
+
+    def __len__(self):
+        return len(self._cuis)
+
+    @property
+    def n_edges(self):
+        return sum(len(targets) for targets in self._targets if targets is not None)
@@ -0,0 +1,298 @@
+"""
+Answer queries from a local copy of the UMLS Metathesaurus rather than the UTS REST API.
+
+Build the store once from a licensed RRF release (MRCONSO, MRDEF, MRSTY, MRREL):
+    umls-api-tool build-local --rrf-dir 2022AA/META --db umls-2022AA.db
+
+Then use it anywhere a BasicAuthenticator is expected:
+    auth = FriendlyAuthenticator(LocalAuthenticator('umls-2022AA.db'))
+
+Responses have the same shape as those from the UTS REST API (only the fields used by this library
+are guaranteed to be present).
+"""
+import itertools
+import math
+import os
+import sqlite3
+import threading
+import urllib.parse
+
+from umls_api_tool.auth import BasicAuthenticator, UTS_BASE_URL
+from umls_api_tool.log import logger
+from umls_api_tool.request_limiter import ForgetfulRequestLimiter
+
+# column names for the RRF files used; see https://www.ncbi.nlm.nih.gov/books/NBK9685/
+RRF_COLUMNS = {
+    'MRCONSO': ['CUI', 'LAT', 'TS', 'LUI', 'STT', 'SUI', 'ISPREF', 'AUI', 'SAUI', 'SCUI', 'SDUI', 'SAB', 'TTY',
+                'CODE', 'STR', 'SRL', 'SUPPRESS', 'CVF'],
+    'MRDEF': ['CUI', 'AUI', 'ATUI', 'SATUI', 'SAB', 'DEF', 'SUPPRESS', 'CVF'],
+    'MRSTY': ['CUI', 'TUI', 'STN', 'STY', 'ATUI', 'CVF'],
+    'MRREL': ['CUI1', 'AUI1', 'STYPE1', 'REL', 'CUI2', 'AUI2', 'STYPE2', 'RELA', 'RUI', 'SRUI', 'SAB', 'SL',
+              'RG', 'DIR', 'SUPPRESS', 'CVF'],
+}
+TABLES = {
+    # table: (rrf file, columns to keep, indexed columns)
+    'conso': ('MRCONSO', ['CUI', 'LAT', 'TS', 'ISPREF', 'AUI', 'SAB', 'TTY', 'CODE', 'STR', 'SUPPRESS'],
+              ['CUI', 'AUI']),
+    'def': ('MRDEF', ['CUI', 'AUI', 'SAB', 'DEF', 'SUPPRESS'], ['CUI']),
+    'sty': ('MRSTY', ['CUI', 'TUI', 'STY'], ['CUI']),
+    'rel': ('MRREL', ['CUI1', 'AUI1', 'REL', 'CUI2', 'AUI2', 'RELA', 'RUI', 'SAB', 'SUPPRESS'], ['CUI1']),
+}
+BATCH_SIZE = 10_000
+
+
+def read_rrf(path, columns):
+    """Yield dict for each line of pipe-delimited RRF file"""
+    with open(path, encoding='utf8') as fh:
+        for line in fh:
+            yield dict(zip(columns, line.rstrip('\n').split('|')))
+
+
+def build_local_store(rrf_dir, db_path, version=None):
+    """Load RRF files from `rrf_dir` into an indexed SQLite database at `db_path`
+
+    :param rrf_dir: directory containing MRCONSO.RRF, etc. (usually the release's META directory)
+    :param db_path: SQLite database to create (any existing data will be replaced)
+    :param version: UMLS release (e.g., 2022AA); defaults to name of parent of `rrf_dir` if it looks like a release
+    """
+    if version is None:
+        candidate = os.path.basename(os.path.dirname(os.path.abspath(rrf_dir)))
+        version = candidate if len(candidate) == 6 and candidate[:4].isdigit() else None
+    conn = sqlite3.connect(str(db_path))
+    conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+    conn.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', ('version', version))
+    for table, (rrf, columns, indexes) in TABLES.items():
+        path = os.path.join(rrf_dir, f'{rrf}.RRF')
+        conn.execute(f'DROP TABLE IF EXISTS {table}')
+        conn.execute(f'CREATE TABLE {table} ({", ".join(columns)})')
+        if not os.path.exists(path):
+            logger.warning(f'Missing {path}: {table} will be empty.')
+            continue
+        logger.info(f'Loading {path}')
+        insert = f'INSERT INTO {table} VALUES ({", ".join("?" for _ in columns)})'
+        rows = (tuple(row[column] for column in columns) for row in read_rrf(path, RRF_COLUMNS[rrf]))
+        while batch := list(itertools.islice(rows, BATCH_SIZE)):
+            conn.executemany(insert, batch)
+        for column in indexes:
+            conn.execute(f'CREATE INDEX {table}_{column.lower()} ON {table} ({column})')
+        conn.commit()
+    conn.execute('ANALYZE')
+    conn.commit()
+    conn.close()
+
+
+PREFERRED_NAME_ORDER = "ORDER BY LAT = 'ENG' DESC, TS = 'P' DESC, ISPREF = 'Y' DESC, rowid"
+
+
+class LocalAuthenticator(BasicAuthenticator):
+    """Drop-in replacement for BasicAuthenticator which reads from a store built by `build_local_store`.
+
+    Supports the content endpoints for CUIs (details, atoms, definitions, relations) and AUIs, and search.
+    The requested version is ignored: the store contains a single release (see `self.release`).
+    """
+
+    def __init__(self, db_path, base_url=UTS_BASE_URL, **kwargs):
+        super().__init__(None, ForgetfulRequestLimiter(), pool_size=0, base_url=base_url, **kwargs)
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self.release = self._query_one('SELECT value FROM meta WHERE key = ?', ('version',))
+
+    def _connect(self):
+        if (conn := getattr(self._local, 'conn', None)) is None:
+            conn = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True, check_same_thread=False)
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _query(self, sql, args=()):
+        return self._connect().execute(sql, args).fetchall()
+
+    def _query_one(self, sql, args=()):
+        row = self._connect().execute(sql, args).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        super().close()
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def _url(self, version, *parts):
+        return '/'.join((self.base_url, 'content', version, *parts))
+
+    def _get_name(self, cui):
+        return self._query_one(f'SELECT STR FROM conso WHERE CUI = ? {PREFERRED_NAME_ORDER} LIMIT 1', (cui,))
+
+    @staticmethod
+    def _error(message, status=404):
+        return {'status': status, 'error': message}
+
+    @staticmethod
+    def _filters(params, sab_column='SAB', suppress_column='SUPPRESS'):
+        """Build WHERE clause additions for common parameters"""
+        clauses, args = [], []
+        if sabs := params.get('sabs'):
+            sabs = str(sabs).split(',')
+            clauses.append(f'{sab_column} IN ({", ".join("?" for _ in sabs)})')
+            args += sabs
+        if str(params.get('includeSuppressible', 'false')).lower() != 'true':
+            clauses.append(f"{suppress_column} = 'N'")
+        return ''.join(f' AND {clause}' for clause in clauses), args
+
+    def _paginate(self, count_sql, select_sql, args, params, formatter):
+        page_size = int(params.get('pageSize', 25))
+        page_number = int(params.get('pageNumber', 1))
+        rec_count = self._query_one(count_sql, args)
+        rows = self._query(f'{select_sql} LIMIT ? OFFSET ?', (*args, page_size, (page_number - 1) * page_size))
+        return {
+            'pageSize': page_size,
+            'pageNumber': page_number,
+            'pageCount': math.ceil(rec_count / page_size),
+            'recCount': rec_count,
+            'result': [formatter(row) for row in rows],
+        }
+
+    def _get_concept(self, version, cui):
+        if (name := self._get_name(cui)) is None:
+            return self._error(f'No concept found for {cui}')
+        return {
+            'pageSize': 25,
+            'pageNumber': 1,
+            'pageCount': 1,
+            'result': {
+                'classType': 'Concept',
+                'ui': cui,
+                'name': name,
+                'semanticTypes': [
+                    {'name': sty, 'uri': '/'.join((self.base_url, 'semantic-network', version, 'TUI', tui))}
+                    for tui, sty in self._query('SELECT TUI, STY FROM sty WHERE CUI = ?', (cui,))
+                ],
+                'atomCount': self._query_one('SELECT COUNT(*) FROM conso WHERE CUI = ?', (cui,)),
+                'atoms': self._url(version, 'CUI', cui, 'atoms'),
+                'definitions': self._url(version, 'CUI', cui, 'definitions'),
+                'relations': self._url(version, 'CUI', cui, 'relations'),
+            },
+        }
+
+    def _format_atom(self, version, row):
+        aui, cui, name, sab, tty, lat, code = row
+        return {
+            'classType': 'Atom',
+            'ui': aui,
+            'name': name,
+            'rootSource': sab,
+            'termType': tty,
+            'language': lat,
+            'code': code,
+            'concept': self._url(version, 'CUI', cui),
+        }
+
+    def _get_atoms(self, version, cui, params):
+        filters, args = self._filters(params)
+        if language := params.get('language'):
+            filters += ' AND LAT = ?'
+            args.append(language)
+        if ttys := params.get('ttys'):
+            ttys = str(ttys).split(',')
+            filters += f' AND TTY IN ({", ".join("?" for _ in ttys)})'
+            args += ttys
+        return self._paginate(
+            f'SELECT COUNT(*) FROM conso WHERE CUI = ?{filters}',
+            f'SELECT AUI, CUI, STR, SAB, TTY, LAT, CODE FROM conso WHERE CUI = ?{filters} ORDER BY rowid',
+            (cui, *args), params, lambda row: self._format_atom(version, row),
+        )
+
+    def _get_atom(self, version, aui):
+        rows = self._query('SELECT AUI, CUI, STR, SAB, TTY, LAT, CODE FROM conso WHERE AUI = ?', (aui,))
+        if not rows:
+            return self._error(f'No atom found for {aui}')
+        return {'pageSize': 25, 'pageNumber': 1, 'pageCount': 1, 'result': self._format_atom(version, rows[0])}
+
+    def _get_definitions(self, version, cui, params):
+        filters, args = self._filters(params)
+        return self._paginate(
+            f'SELECT COUNT(*) FROM def WHERE CUI = ?{filters}',
+            f'SELECT SAB, DEF FROM def WHERE CUI = ?{filters} ORDER BY rowid',
+            (cui, *args), params,
+            lambda row: {'classType': 'Definition', 'rootSource': row[0], 'value': row[1], 'sourceOriginated': True},
+        )
+
+    def _get_relations(self, version, cui, params):
+        filters, args = self._filters(params)
+        return self._paginate(
+            f'SELECT COUNT(*) FROM rel WHERE CUI1 = ?{filters}',
+            f'SELECT RUI, CUI2, REL, RELA, SAB,'
+            f' (SELECT STR FROM conso WHERE conso.CUI = rel.CUI2 {PREFERRED_NAME_ORDER} LIMIT 1)'
+            f' FROM rel WHERE CUI1 = ?{filters} ORDER BY rowid',
+            (cui, *args), params,
+            lambda row: {
+                'classType': 'ConceptRelation',
+                'ui': row[0],
+                'relatedId': self._url(version, 'CUI', row[1]),
+                'relatedIdName': row[5],
+                'relationLabel': row[2],
+                'additionalRelationLabel': row[3],
+                'rootSource': row[4],
+            },
+        )
+
+    def _get_search(self, version, params):
+        term = str(params.get('string', '')).lower()
+        search_type = params.get('searchType', 'words')
+        filters, args = self._filters(params)
+        if search_type == 'exact':
+            condition, condition_args = 'lower(STR) = ?', [term]
+        elif search_type == 'rightTruncation':
+            condition, condition_args = 'lower(STR) LIKE ?', [f'{term}%']
+        elif search_type == 'leftTruncation':
+            condition, condition_args = 'lower(STR) LIKE ?', [f'%{term}']
+        else:  # words, normalizedWords, etc.
+            words = term.split() or ['']
+            condition = ' AND '.join('lower(STR) LIKE ?' for _ in words)
+            condition_args = [f'%{word}%' for word in words]
+        page_size = int(params.get('pageSize', 25))
+        page_number = int(params.get('pageNumber', 1))
+        rows = self._query(
+            f'SELECT CUI, MIN(SAB) FROM conso WHERE {condition}{filters} GROUP BY CUI ORDER BY MIN(rowid)'
+            f' LIMIT ? OFFSET ?',
+            (*condition_args, *args, page_size, (page_number - 1) * page_size)
+        )
+        return {
+            'pageSize': page_size,
+            'pageNumber': page_number,
+            'result': {
+                'classType': 'searchResults',
+                'results': [
+                    {'ui': cui, 'rootSource': sab, 'uri': self._url(version, 'CUI', cui), 'name': self._get_name(cui)}
+                    for cui, sab in rows
+                ],
+            },
+        }
+
+    def _fetch_page(self, url, params):
+        """Answer a single page of results from the local store"""
+        base_path = urllib.parse.urlsplit(self.base_url).path
+        parts = urllib.parse.urlsplit(url).path[len(base_path):].strip('/').split('/')
+        endpoint, version = parts[0], parts[1] if len(parts) > 1 else 'current'
+        if endpoint == 'search':
+            return self._get_search(version, params)
+        elif endpoint == 'content' and len(parts) in {4, 5}:
+            _, version, ui_type, ui, *kind = parts
+            kind = kind[0] if kind else None
+            if ui_type == 'CUI':
+                if kind is None:
+                    return self._get_concept(version, ui)
+                elif kind == 'atoms':
+                    return self._get_atoms(version, ui, params)
+                elif kind == 'definitions':
+                    return self._get_definitions(version, ui, params)
+                elif kind == 'relations':
+                    return self._get_relations(version, ui, params)
+            elif ui_type == 'AUI' and kind is None:
+                return self._get_atom(version, ui)
+        return self._error(f'Not supported by local store: {url}', status=400)
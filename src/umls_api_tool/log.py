@@ -0,0 +1,18 @@
+"""
+Deferred import of `loguru`.
+
+`loguru` is only imported when something is first logged, keeping it out of the startup time of short-lived
+processes (e.g., `umls-api-tool --help`). Messages are still attributed to the calling module, so
+`loguru.logger.disable('umls_api_tool')` and other loguru configuration work as usual.
+"""
+
+
+class _LazyLogger:
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        from loguru import logger
+        return getattr(logger, name)
+
+
+logger = _LazyLogger()
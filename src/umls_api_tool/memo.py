@@ -0,0 +1,57 @@
+"""Bounded, thread-safe memoization shared across authenticators."""
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LruMemo:
+    """Remember up to `maxsize` most recently used results."""
+
+    def __init__(self, maxsize=100_000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, key, func):
+        """Return memoized value for `key`, calling `func()` to compute it if absent"""
+        if (value := self.get(key, _MISSING)) is _MISSING:
+            value = func()
+            self.set(key, value)
+        return value
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data)}
+
+
+# relatedId url -> (cui, name) or None; shared by all FriendlyAuthenticators unless one is specified
+RELATED_CONCEPTS = LruMemo()
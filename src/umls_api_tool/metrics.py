@@ -0,0 +1,185 @@
+"""
+Instrumentation for requests made by the authenticators.
+
+Each request is split into phases which are recorded in per-endpoint latency histograms:
+    ticket: acquiring authentication (e.g., requesting a service ticket)
+    limiter: waiting for the request limiter
+    http: sending the request and reading the response
+    parse: decoding the json response
+FriendlyAuthenticator methods are additionally recorded as the 'total' phase (e.g., endpoint 'details').
+
+Counters (per endpoint): requests, pages, bytes, errors, retries, cache_hits, cache_misses, coalesced.
+
+Usage:
+    metrics = Metrics()
+    auth = BasicAuthenticator(apikey, metrics=metrics)
+    ...
+    print(metrics.to_prometheus())
+
+Instrumentation is disabled unless a `Metrics` instance is provided.
+"""
+import bisect
+import threading
+import time
+import urllib.parse
+
+from umls_api_tool.cache import VERSIONED_ENDPOINTS
+from umls_api_tool.log import logger
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+PHASES = ('ticket', 'limiter', 'http', 'parse', 'total')
+COUNTERS = ('requests', 'pages', 'bytes', 'errors', 'retries', 'cache_hits', 'cache_misses', 'coalesced')
+
+
+def endpoint_label(url):
+    """Low-cardinality name for url, dropping release and identifiers
+
+    E.g., '.../rest/content/2022AA/CUI/C0000737/atoms' -> 'content/CUI/atoms'
+    """
+    parts = urllib.parse.urlsplit(url).path.strip('/').split('/')
+    for i, part in enumerate(parts):
+        if part in VERSIONED_ENDPOINTS:
+            rest = parts[i + 2:]
+            if len(rest) > 2:
+                return f'{part}/{rest[0]}/{rest[-1]}'
+            elif rest:
+                return f'{part}/{rest[0]}'
+            return part
+    return 'ticket' if 'cas' in parts else parts[-1]
+
+
+class Histogram:
+    """Cumulative histogram of observed durations (seconds)"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        total = 0
+        for count in self.counts:
+            total += count
+            yield total
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'buckets': dict(zip((*self.buckets, float('inf')), self.cumulative_counts())),
+        }
+
+
+class Metrics:
+    """Thread-safe collection of latency histograms and counters, plus request hooks.
+
+    Hooks:
+        pre_request(method, url, params) is called before each attempt
+        post_request(method, url, params, response, elapsed) is called after each attempt; `response`
+            is None if the request raised an exception
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix='umls'):
+        self.buckets = buckets
+        self.prefix = prefix
+        self.histograms = {}  # (endpoint, phase) -> Histogram
+        self.counters = {}  # (name, endpoint) -> int
+        self.pre_request_hooks = []
+        self.post_request_hooks = []
+        self._lock = threading.Lock()
+
+    def add_hook(self, pre_request=None, post_request=None):
+        if pre_request is not None:
+            self.pre_request_hooks.append(pre_request)
+        if post_request is not None:
+            self.post_request_hooks.append(post_request)
+
+    def pre_request(self, method, url, params):
+        for hook in self.pre_request_hooks:
+            try:
+                hook(method, url, params)
+            except Exception as e:
+                logger.exception(f'pre_request hook failed: {e}')
+
+    def post_request(self, method, url, params, response, elapsed):
+        for hook in self.post_request_hooks:
+            try:
+                hook(method, url, params, response, elapsed)
+            except Exception as e:
+                logger.exception(f'post_request hook failed: {e}')
+
+    def observe(self, endpoint, phase, seconds):
+        with self._lock:
+            if (histogram := self.histograms.get((endpoint, phase))) is None:
+                histogram = self.histograms[endpoint, phase] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def inc(self, name, endpoint, amount=1):
+        with self._lock:
+            self.counters[name, endpoint] = self.counters.get((name, endpoint), 0) + amount
+
+    def timer(self, endpoint, phase):
+        """Context manager recording elapsed time of block"""
+        return _Timer(self, endpoint, phase)
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def snapshot(self):
+        """Current values as {'histograms': {endpoint: {phase: {...}}}, 'counters': {endpoint: {name: value}}}"""
+        with self._lock:
+            histograms = {}
+            for (endpoint, phase), histogram in self.histograms.items():
+                histograms.setdefault(endpoint, {})[phase] = histogram.snapshot()
+            counters = {}
+            for (name, endpoint), value in self.counters.items():
+                counters.setdefault(endpoint, {})[name] = value
+        return {'histograms': histograms, 'counters': counters}
+
+    def to_prometheus(self):
+        """Current values in Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+        name = f'{self.prefix}_request_phase_seconds'
+        lines.append(f'# HELP {name} Time spent in each phase of a request.')
+        lines.append(f'# TYPE {name} histogram')
+        for (endpoint, phase), histogram in histograms:
+            labels = f'endpoint="{endpoint}",phase="{phase}"'
+            for bound, count in zip((*histogram.buckets, '+Inf'), histogram.cumulative_counts()):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+            lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+        previous = None
+        for (counter, endpoint), value in sorted(counters):
+            name = f'{self.prefix}_{counter}_total'
+            if counter != previous:
+                lines.append(f'# TYPE {name} counter')
+                previous = counter
+            lines.append(f'{name}{{endpoint="{endpoint}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+class _Timer:
+    __slots__ = ('metrics', 'endpoint', 'phase', 'start')
+
+    def __init__(self, metrics, endpoint, phase):
+        self.metrics = metrics
+        self.endpoint = endpoint
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.metrics.observe(self.endpoint, self.phase, time.perf_counter() - self.start)
@@ -0,0 +1,70 @@
+"""
+Scale out bulk CUI jobs across worker processes and API keys.
+
+CUIs are read from a single stream and assigned to the API keys in turn. Each key has its own rate budget
+(`SharedTokenBucketRequestLimiter`, shared by all worker processes on this host) and each worker process
+creates its own authenticator (and time granting ticket) per key. Results are merged in input order.
+
+Usage:
+    for cui, records in enrich_cuis_parallel([apikey1, apikey2], cuis, '2022AA', processes=8):
+        ...
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, Sequence
+
+from umls_api_tool.auth import FriendlyAuthenticator
+from umls_api_tool.concurrency import map_ordered
+from umls_api_tool.enrich import KINDS, _safe_enrich_cui
+from umls_api_tool.request_limiter import SharedTokenBucketRequestLimiter, MAX_REQUESTS_PER_SECOND
+
+# state of each worker process (set by `_init_worker`)
+_config = None
+_authenticators = {}  # index of apikey -> FriendlyAuthenticator
+
+
+def _init_worker(apikeys, limiters, version, kinds, cache, auth_kwargs):
+    global _config
+    _config = (apikeys, limiters, version, kinds, cache, auth_kwargs)
+    _authenticators.clear()
+
+
+def _get_authenticator(key_index):
+    if (auth := _authenticators.get(key_index)) is None:
+        apikeys, limiters, version, _, cache, auth_kwargs = _config
+        if cache:
+            from umls_api_tool.cache import SqliteCache
+            auth_kwargs = {**auth_kwargs, 'cache': SqliteCache(cache)}
+        auth = _authenticators[key_index] = FriendlyAuthenticator.from_apikey(
+            apikeys[key_index], version, limiters[key_index], **auth_kwargs
+        )
+    return auth
+
+
+def _enrich_task(task):
+    cui, key_index = task
+    return cui, _safe_enrich_cui(_get_authenticator(key_index), cui, _config[3])
+
+
+def enrich_cuis_parallel(apikeys: Sequence[str], cuis: Iterable[str], version='current', kinds=KINDS,
+                         processes=None, requests_per_second=MAX_REQUESTS_PER_SECOND, cache=None,
+                         mp_context=None, **auth_kwargs) -> Iterator[tuple]:
+    """Yield (cui, records) in input order, like `enrich.enrich_cuis`, retrieving one CUI per process at a time.
+
+    :param apikeys: UMLS api keys; CUIs are assigned to each in turn
+    :param processes: number of worker processes (default: number of CPUs)
+    :param requests_per_second: rate budget of each api key, shared by all processes
+    :param cache: path to SQLite response cache (opened by each process)
+    :param mp_context: multiprocessing start method (e.g., 'spawn'); default is the platform's default
+    :param auth_kwargs: passed on to BasicAuthenticator
+    """
+    if not apikeys:
+        raise ValueError('At least one apikey is required.')
+    processes = processes or os.cpu_count() or 1
+    context = multiprocessing.get_context(mp_context)
+    limiters = [SharedTokenBucketRequestLimiter(requests_per_second, context=context) for _ in apikeys]
+    tasks = ((cui, i % len(apikeys)) for i, cui in enumerate(cuis))
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=_init_worker,
+                             initargs=(list(apikeys), limiters, version, kinds, cache, auth_kwargs)) as executor:
+        yield from map_ordered(_enrich_task, tasks, executor, window=processes * 2)
@@ -0,0 +1,112 @@
+"""
+Warm the response cache for a batch of CUIs ahead of (or instead of) consuming them.
+
+For each CUI, the requests that `FriendlyAuthenticator` makes for each kind (details, definitions,
+atoms, relations) are made in a background executor, under the authenticator's rate limiter, so
+that the pages land in the response cache (and related concepts in the related memo). Later
+`FriendlyAuthenticator` calls for these CUIs are then answered from memory.
+
+Usage:
+    with FriendlyAuthenticator.from_apikey(apikey, '2022AA') as auth:
+        for cui in auth.prefetch(cuis, kinds=('details', 'atoms'), max_ahead=50):
+            details = auth.get_details_for_cui(cui)  # already cached
+            ...
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator
+
+from umls_api_tool.cache import MemoryCache, redact_auth_params
+from umls_api_tool.concurrency import map_ordered
+from umls_api_tool.enrich import KINDS, enrich_cui
+from umls_api_tool.log import logger
+
+DEFAULT_CACHE_ENTRIES = 10_000  # pages, if the authenticator has no response cache
+
+
+class Prefetcher:
+    """Retrieve CUIs concurrently, keeping no more than `max_ahead` prefetched CUIs waiting to be consumed."""
+
+    def __init__(self, auth, kinds=KINDS, workers=4, max_ahead=None, on_progress=None, report_every=None,
+                 cache_entries=DEFAULT_CACHE_ENTRIES):
+        """
+
+        :param auth: FriendlyAuthenticator; if its authenticator has no response cache, a `MemoryCache` of
+            `cache_entries` pages is used while prefetching (i.e., until the CUIs have all been yielded)
+        :param kinds: any of 'details', 'atoms', 'definitions', 'relations'
+        :param workers: number of CUIs to retrieve concurrently
+        :param max_ahead: number of CUIs which may be retrieved before the consumer has reached them
+            (default: twice `workers`); the cache must be able to hold this many CUIs' pages
+        :param on_progress: called with `stats()` after each CUI is retrieved (from a worker thread)
+        :param report_every: log progress after this many CUIs
+        """
+        self.auth = auth
+        self.kinds = kinds
+        self.workers = workers
+        self.max_ahead = max_ahead or workers * 2
+        self.on_progress = on_progress
+        self.report_every = report_every
+        self.cache_entries = cache_entries
+        self.completed = 0
+        self.failed = 0
+        self._start = None
+        self._lock = threading.Lock()
+
+    def _prefetch(self, cui):
+        try:
+            enrich_cui(self.auth, cui, self.kinds)
+            failed = False
+        except Exception as e:
+            logger.warning(f'Failed to prefetch {cui}: {redact_auth_params(str(e))}')
+            failed = True
+        with self._lock:
+            self.completed += 1
+            self.failed += failed
+            completed = self.completed
+        if self.report_every and completed % self.report_every == 0:
+            stats = self.stats()
+            logger.info(f'Prefetched {completed} CUIs ({stats["cuis_per_second"]:.1f} CUIs/s;'
+                        f' {stats["failed"]} failed)')
+        if self.on_progress is not None:
+            self.on_progress(self.stats())
+        return cui
+
+    def __call__(self, cuis: Iterable[str]) -> Iterator[str]:
+        """Yield each CUI (in order) once its data has been retrieved"""
+        basic = self.auth.auth.auth
+        cache = None
+        if basic.cache is None:
+            basic.cache = cache = MemoryCache(max_entries=self.cache_entries)
+        self._start = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='umls-prefetch') as executor:
+                yield from map_ordered(self._prefetch, cuis, executor, window=self.max_ahead)
+        finally:
+            if cache is not None and basic.cache is cache:
+                basic.cache = None  # not the caller's cache to keep
+
+    def stats(self):
+        elapsed = time.monotonic() - self._start if self._start is not None else 0
+        return {
+            'completed': self.completed,
+            'failed': self.failed,
+            'elapsed': elapsed,
+            'cuis_per_second': self.completed / elapsed if elapsed else 0.0,
+        }
+
+
+def prefetch(auth, cuis: Iterable[str], kinds=KINDS, workers=4, max_ahead=None, **kwargs) -> Iterator[str]:
+    """Yield each CUI once its data is cached, retrieving up to `max_ahead` CUIs ahead of the consumer"""
+    return Prefetcher(auth, kinds, workers=workers, max_ahead=max_ahead, **kwargs)(cuis)
+
+
+def warm_up(auth, cuis: Iterable[str], kinds=KINDS, workers=4, **kwargs) -> dict:
+    """Retrieve all `cuis` (e.g., to fill a persistent `SqliteCache`), returning final `stats()`
+
+    If the authenticator has no response cache, only the related memo is kept afterwards.
+    """
+    prefetcher = Prefetcher(auth, kinds, workers=workers, **kwargs)
+    for _ in prefetcher(cuis):
+        pass
+    return prefetcher.stats()
@@ -0,0 +1,45 @@
+"""
+Compact record types which `FriendlyAuthenticator(records=True)` yields instead of dicts.
+
+Each is a NamedTuple with the same fields (and order) as `umls_api_tool.export.FIELDS`, so they take
+less memory than the equivalent dict, can be unpacked, and `record._asdict()` recovers the dict.
+"""
+from typing import List, NamedTuple
+
+
+class Atom(NamedTuple):
+    cui: str
+    aui: str
+    name: str
+    source: str
+    termtype: str
+
+
+class Definition(NamedTuple):
+    cui: str
+    source: str
+    definition: str
+
+
+class Details(NamedTuple):
+    cui: str
+    name: str
+    definition: str
+    source: str
+    semtypes: List[str]
+
+
+class Relation(NamedTuple):
+    source_cui: str
+    target_cui: str
+    name: str
+    relation_label: str
+    additional_relation_label: str
+
+
+class Mapping(NamedTuple):
+    source: str
+    code: str
+    target_source: str
+    target_code: str
+    target_name: str
@@ -0,0 +1,169 @@
+"""
+Resolve the 'current' UMLS release to the concrete release it refers to (e.g., '2022AB').
+
+Responses for 'current' change whenever NLM publishes a new release, so they can only be cached briefly
+(see `current_ttl` in `umls_api_tool.cache`). With a release tracker, `BasicAuthenticator` requests
+the concrete release instead, so responses are cached (and memoized) under that release and never go
+stale. The release is looked up on first use and again every `refresh_interval` seconds; when it changes,
+responses cached for the previous release are either kept as a snapshot (e.g., for requests naming that
+release) or removed from the cache.
+
+Usage:
+    auth = BasicAuthenticator(apikey, cache=SqliteCache('umls-cache.db'), release_tracker=ReleaseTracker)
+    auth = BasicAuthenticator(apikey, cache=SqliteCache('umls-cache.db'),
+                              release_tracker=functools.partial(ReleaseTracker, refresh_interval=24 * 60 * 60,
+                                                                on_change=INVALIDATE))
+"""
+import functools
+import os
+import threading
+import time
+import urllib.parse
+
+from umls_api_tool.auth import BasicAuthenticator
+from umls_api_tool.cache import CURRENT_VERSION, VERSIONED_ENDPOINTS, SqliteCache, redact_auth_params
+from umls_api_tool.log import logger
+from umls_api_tool.request_limiter import CONTENT_ENDPOINT
+
+# https://documentation.uts.nlm.nih.gov/automating-downloads.html
+RELEASE_TYPE = 'umls-full-release'
+SNAPSHOT = 'snapshot'  # keep responses cached for the previous release
+INVALIDATE = 'invalidate'  # remove responses cached for the previous release
+RETRY_INTERVAL = 5 * 60  # seconds before retrying a failed lookup
+
+
+def get_releases_url(base_url):
+    """Release API is next to the REST API (e.g., https://uts-ws.nlm.nih.gov/releases)"""
+    return urllib.parse.urljoin(base_url, '/releases')
+
+
+def parse_current_release(data):
+    """Release version (e.g., '2022AB') marked current in the response of the release API"""
+    for release in data:
+        if release.get('current'):
+            return release['releaseVersion']
+    raise ValueError(f'No current release in response: {data!r}')
+
+
+def replace_version(url, old, new):
+    """Replace release `old` in url (e.g., '.../content/current/CUI/...' -> '.../content/2022AB/CUI/...')"""
+    split = urllib.parse.urlsplit(url)
+    parts = split.path.split('/')
+    for i, part in enumerate(parts[:-1]):
+        if part in VERSIONED_ENDPOINTS:
+            if parts[i + 1] == old:
+                parts[i + 1] = new
+                return urllib.parse.urlunsplit(split._replace(path='/'.join(parts)))
+            break
+    return url
+
+
+class ReleaseTracker:
+    """Keep track of the release that 'current' refers to for one authenticator."""
+
+    def __init__(self, authenticator, refresh_interval=None, on_change=SNAPSHOT, releases_url=None,
+                 release_type=RELEASE_TYPE):
+        """
+
+        :param authenticator: BasicAuthenticator used to query the release API (and whose cache is
+            updated when the release changes)
+        :param refresh_interval: seconds before looking up the current release again; None to look it up
+            once (e.g., for short-lived processes)
+        :param on_change: SNAPSHOT to keep responses cached for the previous release or INVALIDATE to
+            remove them; also applies to a persistent cache last used with an older release
+        :param releases_url: release API (default: derived from the authenticator's `base_url`)
+        :param release_type: release type to look up
+        """
+        if on_change not in (SNAPSHOT, INVALIDATE):
+            raise ValueError(f'Unrecognized on_change: {on_change}; expected {SNAPSHOT!r} or {INVALIDATE!r}')
+        self.auth = authenticator
+        self.refresh_interval = refresh_interval
+        self.on_change = on_change
+        self.releases_url = releases_url or get_releases_url(authenticator.base_url)
+        self.release_type = release_type
+        self.release = None
+        self._checked = None  # time of last lookup
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """Call `listener(previous_release, release)` whenever the current release changes"""
+        self._listeners.append(listener)
+
+    def _is_due(self, now):
+        if self._checked is None:
+            return True
+        interval = self.refresh_interval if self.release is not None else RETRY_INTERVAL
+        return interval is not None and now - self._checked > interval
+
+    def get_release(self):
+        """Concrete release which 'current' refers to, or None if it could not be determined"""
+        if self._is_due(time.monotonic()):
+            with self._lock:
+                if self._is_due(now := time.monotonic()):
+                    self._refresh()
+                    self._checked = now  # only once looked up, so other threads wait for the result
+        return self.release
+
+    def _refresh(self):
+        try:
+            r = self.auth._send('GET', self.releases_url, CONTENT_ENDPOINT,
+                                params={'releaseType': self.release_type, 'current': 'true'})
+            r.raise_for_status()
+            release = parse_current_release(r.json())
+        except Exception as e:
+            logger.warning(f'Failed to look up current release ({redact_auth_params(str(e))});'
+                           f' using {CURRENT_VERSION!r}.')
+            return
+        previous = self.release
+        if release == previous:
+            return
+        self.release = release
+        logger.info(f'Current UMLS release is {release}.')
+        self._update_cache(release)
+        if previous is not None:
+            for listener in self._listeners:
+                listener(previous, release)
+
+    def _update_cache(self, release):
+        if (cache := self.auth.cache) is None:
+            return
+        previous = cache.get_current_release()
+        if previous is not None and previous != release:
+            logger.info(f'Release changed from {previous} to {release} since the cache was last used.')
+            if self.on_change == INVALIDATE:
+                cache.clear(previous)
+        if previous != release:
+            cache.clear(CURRENT_VERSION)  # responses cached before releases were tracked
+            cache.set_current_release(release)
+
+    def resolve(self, version):
+        """Concrete release for `version` ('current' if the release could not be determined)"""
+        if version != CURRENT_VERSION:
+            return version
+        return self.get_release() or version
+
+    def resolve_url(self, url):
+        if f'/{CURRENT_VERSION}' not in url or (release := self.get_release()) is None:
+            return url
+        return replace_version(url, CURRENT_VERSION, release)
+
+
+def resolve_current_release(apikey, cache=None, on_change=SNAPSHOT, **auth_kwargs):
+    """Look up the release 'current' refers to once, e.g., at the start of a batch job so that all workers
+    request (and cache) the same release
+
+    :param cache: ResponseCache or path to SqliteCache, updated as described in `ReleaseTracker` if the
+        release has changed since it was last used
+    :param on_change: SNAPSHOT or INVALIDATE
+    :param auth_kwargs: passed on to BasicAuthenticator
+    :return: concrete release, or 'current' if it could not be determined
+    """
+    response_cache = SqliteCache(cache) if isinstance(cache, (str, os.PathLike)) else cache
+    try:
+        with BasicAuthenticator(apikey, cache=response_cache, **auth_kwargs,
+                                release_tracker=functools.partial(ReleaseTracker, on_change=on_change)) as auth:
+            return auth.resolve_version(CURRENT_VERSION)
+    finally:
+        if response_cache is not cache:
+            response_cache.close()
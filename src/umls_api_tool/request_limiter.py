@@ -1,7 +1,26 @@
 import datetime
+import threading
 import time
 
 MAX_REQUESTS_PER_SECOND = 20  # Defined: https://documentation.uts.nlm.nih.gov/terms-of-service.html
+TICKET_ENDPOINT = 'ticket'
+CONTENT_ENDPOINT = 'content'
+
+
+def endpoint_ready(limiter, name='ready'):
+    """`limiter.ready` (or another method, e.g., 'async_ready') as a function of the endpoint.
+
+    Limiters written before the endpoint was passed define `ready(self)`; these are called without it.
+    """
+    ready = getattr(limiter, name)
+    import inspect  # deferred: only needed once per authenticator
+    try:
+        inspect.signature(ready).bind(CONTENT_ENDPOINT)
+    except TypeError:
+        return lambda endpoint: ready()
+    except ValueError:  # no signature available (e.g., some builtins)
+        pass
+    return ready
 
 
 class TimelyRequestLimiter:
@@ -11,14 +30,16 @@ class TimelyRequestLimiter:
         self._requests_per_second = requests_per_second
         self._end_time = datetime.datetime.now() + datetime.timedelta(seconds=1)
         self._counter = 0
+        self._lock = threading.Lock()  # shared by e.g., ticket prefetch thread
 
-    def ready(self):
-        self._counter += 1
-        if self._counter >= self._requests_per_second:
-            self._counter = 0
-            while datetime.datetime.now() < self._end_time:
-                time.sleep(0.02)
-            self._end_time = datetime.datetime.now() + datetime.timedelta(seconds=1)
+    def ready(self, endpoint=None):
+        with self._lock:
+            self._counter += 1
+            if self._counter >= self._requests_per_second:
+                self._counter = 0
+                while datetime.datetime.now() < self._end_time:
+                    time.sleep(0.02)
+                self._end_time = datetime.datetime.now() + datetime.timedelta(seconds=1)
 
 
 class SleepyRequestLimiter:
@@ -27,7 +48,7 @@ class SleepyRequestLimiter:
     def __init__(self, requests_per_second=MAX_REQUESTS_PER_SECOND):
         self._sleep_time = 1.0 / requests_per_second
 
-    def ready(self):
+    def ready(self, endpoint=None):
         time.sleep(self._sleep_time)
 
 
@@ -37,5 +58,180 @@ class ForgetfulRequestLimiter:
     def __init__(self, requests_per_second=MAX_REQUESTS_PER_SECOND):
         pass
 
-    def ready(self):
+    def ready(self, endpoint=None):
         pass
+
+
+class AsyncRequestLimiter:
+    """Space out requests from coroutines sharing an event loop."""
+
+    def __init__(self, requests_per_second=MAX_REQUESTS_PER_SECOND):
+        self._interval = 1.0 / requests_per_second
+        self._next_time = 0.0
+        self._lock = None
+
+    async def ready(self, endpoint=None):
+        import asyncio  # deferred: only needed by asyncio users
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_time - now
+            self._next_time = max(now, self._next_time) + self._interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class TokenBucketRequestLimiter:
+    """Allow up to `burst` requests at once while refilling at `requests_per_second`.
+
+    Each caller reserves the next available slot (so waiting callers are served in order) and then
+    sleeps only as long as needed. Thread-safe; coroutines should use `await async_ready()`.
+    """
+
+    def __init__(self, requests_per_second=MAX_REQUESTS_PER_SECOND, burst=1, clock=time.monotonic,
+                 sleep=time.sleep):
+        """
+
+        :param requests_per_second: sustained rate
+        :param burst: number of requests which may be sent without waiting after an idle period
+        :param clock: monotonic clock returning seconds (replace for testing)
+        :param sleep: function to sleep for a number of seconds (replace for testing)
+        """
+        self._rate = requests_per_second
+        self._capacity = burst
+        self._tokens = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token, returning the number of seconds to wait before it may be used."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self._rate
+
+    def available_in(self):
+        """Seconds until a token is available (without taking it)."""
+        with self._lock:
+            tokens = min(self._capacity, self._tokens + (self._clock() - self._updated) * self._rate)
+            if tokens >= 1 - 1e-9:  # rounding errors would otherwise require waiting for a negligible time
+                return 0.0
+            return (1 - tokens) / self._rate
+
+    def take_at(self, when):
+        """Take a token for a request sent at clock time `when` (which may be in the future)."""
+        with self._lock:
+            self._tokens = min(self._capacity, self._tokens + (when - self._updated) * self._rate) - 1
+            self._updated = when
+
+    def ready(self, endpoint=None):
+        if (wait := self.reserve()) > 0:
+            self._sleep(wait)
+
+    async def async_ready(self, endpoint=None):
+        if (wait := self.reserve()) > 0:
+            import asyncio
+            await asyncio.sleep(wait)
+
+
+class SharedTokenBucketRequestLimiter(TokenBucketRequestLimiter):
+    """TokenBucketRequestLimiter whose state is in shared memory, so that all processes on the same
+    host given this limiter share one rate budget.
+
+    It must be passed to worker processes when they are created (e.g., as an argument to a
+    `multiprocessing.Process`, or in `initargs` for a pool).
+    """
+
+    def __init__(self, requests_per_second=MAX_REQUESTS_PER_SECOND, burst=1, sleep=time.sleep, context=None):
+        """
+
+        :param context: multiprocessing context used to create the worker processes
+        """
+        self._rate = requests_per_second
+        self._capacity = burst
+        self._clock = time.monotonic  # system-wide, so comparable between processes
+        self._sleep = sleep
+        if context is None:
+            import multiprocessing as context
+        self._state = context.Array('d', [burst, self._clock()])  # tokens, updated
+
+    def reserve(self):
+        with self._state.get_lock():
+            tokens, updated = self._state[:]
+            now = self._clock()
+            tokens = min(self._capacity, tokens + (now - updated) * self._rate) - 1
+            self._state[:] = [tokens, now]
+        if tokens >= 0:
+            return 0.0
+        return -tokens / self._rate
+
+
+class EndpointRequestLimiter:
+    """Overall token bucket with additional (smaller) budgets for particular endpoints.
+
+    E.g., to ensure that ticket requests can only use 5 of the 20 available requests/second:
+        EndpointRequestLimiter(budgets={'ticket': 5})
+
+    The overall slot is only reserved once the endpoint's budget allows a request: reserving both up front and
+    sleeping for the longer wait would count the (earlier) overall slot without using it, letting other requests
+    exceed the overall rate around the time the delayed request is actually sent. The request is then counted
+    against the endpoint's budget at the time of its overall slot, when it is actually sent.
+    """
+
+    def __init__(self, requests_per_second=MAX_REQUESTS_PER_SECOND, budgets=None, burst=1,
+                 clock=time.monotonic, sleep=time.sleep):
+        """
+
+        :param requests_per_second: overall rate shared by all endpoints
+        :param budgets: endpoint ('ticket' or 'content') -> requests_per_second
+        :param burst: see TokenBucketRequestLimiter
+        """
+        self._overall = TokenBucketRequestLimiter(requests_per_second, burst=burst, clock=clock, sleep=sleep)
+        self._endpoints = {
+            endpoint: TokenBucketRequestLimiter(rps, burst=burst, clock=clock, sleep=sleep)
+            for endpoint, rps in (budgets or {}).items()
+        }
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    def _reserve(self, endpoint):
+        """Reserve the next overall slot if the endpoint's budget allows a request now.
+
+        :return: (seconds to wait before sending, None) or (None, seconds to wait before trying again)
+        """
+        bucket = self._endpoints.get(endpoint)
+        if bucket is None:
+            return self._overall.reserve(), None
+        with self._lock:
+            if (retry := bucket.available_in()) > 0:
+                return None, retry
+            wait = self._overall.reserve()
+            bucket.take_at(self._clock() + wait)
+            return wait, None
+
+    def ready(self, endpoint=None):
+        while True:
+            wait, retry = self._reserve(endpoint)
+            if retry is None:
+                break
+            self._sleep(retry)
+        if wait > 0:
+            self._sleep(wait)
+
+    async def async_ready(self, endpoint=None):
+        import asyncio
+        while True:
+            wait, retry = self._reserve(endpoint)
+            if retry is None:
+                break
+            await asyncio.sleep(retry)
+        if wait > 0:
+            await asyncio.sleep(wait)
@@ -0,0 +1,95 @@
+"""Retrying failed requests and avoiding a host which keeps failing."""
+import random
+import threading
+import time
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of sending a request to a host which has recently failed repeatedly."""
+
+
+class RetryPolicy:
+    """Exponential backoff with jitter, honoring `Retry-After`"""
+
+    def __init__(self, max_retries=5, backoff=0.5, max_backoff=60.0, jitter=0.5, retry_statuses=RETRY_STATUSES,
+                 sleep=time.sleep):
+        """
+
+        :param max_retries: number of times to retry a single request (0 to never retry)
+        :param backoff: seconds to wait before first retry; doubled for each subsequent retry
+        :param max_backoff: longest time to wait between retries
+        :param jitter: randomly add up to this fraction of the delay to spread out retries
+        :param retry_statuses: HTTP status codes considered to be transient
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_statuses = retry_statuses
+        self.sleep = sleep
+
+    def can_retry(self, attempt):
+        return attempt < self.max_retries
+
+    def get_delay(self, attempt, retry_after=None):
+        """Seconds to wait before retry number `attempt` (starting at 0)"""
+        if (delay := parse_retry_after(retry_after)) is None:
+            delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+            delay += delay * self.jitter * random.random()
+        return min(delay, self.max_backoff)
+
+
+def parse_retry_after(value):
+    """Retry-After header is either seconds or an HTTP date"""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    import email.utils  # deferred: rarely needed, and slow to import
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """Stop sending requests to a host after repeated failures.
+
+    After `failure_threshold` consecutive failures, requests to that host raise CircuitOpenError for
+    `reset_timeout` seconds; then a single trial request is allowed, and its success closes the circuit.
+    """
+
+    def __init__(self, failure_threshold=10, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = {}  # host -> consecutive failures
+        self._opened = {}  # host -> time circuit opened
+        self._lock = threading.Lock()
+
+    def before_request(self, host):
+        with self._lock:
+            if (opened := self._opened.get(host)) is None:
+                return
+            if self._clock() - opened < self.reset_timeout:
+                raise CircuitOpenError(f'Too many recent failures for {host}; not sending request.')
+            # half-open: let this request through, and re-open immediately if it fails
+            del self._opened[host]
+            self._failures[host] = self.failure_threshold - 1
+
+    def record_success(self, host):
+        with self._lock:
+            self._failures[host] = 0
+
+    def record_failure(self, host):
+        with self._lock:
+            self._failures[host] = self._failures.get(host, 0) + 1
+            if self._failures[host] >= self.failure_threshold:
+                self._opened[host] = self._clock()
+
+    def is_open(self, host):
+        return host in self._opened
@@ -0,0 +1,223 @@
+"""
+In-memory index for searching concept names without calling the UTS search endpoint.
+
+Build from a local store (see `umls_api_tool.local`), MRCONSO.RRF, or results of previous searches:
+    index = TermIndex.from_local_store('umls-2022AA.db')
+    auth = FriendlyAuthenticator(authenticator, search_index=index)
+    for result in auth.search('heart attack', sabs='SNOMEDCT_US'):
+        ...
+
+Supported `searchType` values mirror the UTS API: exact, words, normalizedString, normalizedWords,
+rightTruncation, leftTruncation and approximate.
+"""
+import bisect
+import difflib
+import pickle
+import re
+import sqlite3
+from collections import defaultdict
+from typing import Iterable, Iterator
+
+NON_WORD_PATTERN = re.compile(r'[^\w]+')
+APPROXIMATE_LENGTH_DIFFERENCE = 2  # close spellings of a word are looked for among words of similar length
+
+
+def tokenize(text):
+    return NON_WORD_PATTERN.sub(' ', text.lower()).split()
+
+
+def normalize(text):
+    """Lowercase, drop punctuation and sort words (approximates UMLS normalized strings)"""
+    return ' '.join(sorted(tokenize(text)))
+
+
+class TermIndex:
+
+    def __init__(self):
+        self._entries = []  # entry id -> (cui, source)
+        self._names = {}  # cui -> name to report
+        self._exact = defaultdict(list)  # lowercase string -> entry ids
+        self._normalized = defaultdict(list)  # normalized string -> entry ids
+        self._postings = defaultdict(list)  # word -> entry ids (ascending)
+        self._strings = None  # (sorted lowercase strings, entry ids) for prefix search
+        self._reversed_strings = None  # (sorted reversed lowercase strings, entry ids) for suffix search
+        self._tokens = None  # sorted words for prefix search
+        self._token_buckets = None  # (0 or -1, first or last character, length) -> words, for approximate search
+
+    def add(self, cui, name, source, preferred_name=None):
+        """Add a concept name (e.g., an atom)
+
+        :param preferred_name: name reported in search results for this CUI (default: first name added)
+        """
+        entry_id = len(self._entries)
+        self._entries.append((cui, source))
+        if preferred_name or cui not in self._names:
+            self._names[cui] = preferred_name or name
+        lower = name.lower()
+        self._exact[lower].append(entry_id)
+        self._normalized[normalize(name)].append(entry_id)
+        for token in set(tokenize(name)):
+            self._postings[token].append(entry_id)
+        self._strings = None  # must rebuild sorted structures
+
+    def add_search_results(self, results: Iterable[dict]):
+        """Add results with 'cui', 'name' and 'source' (e.g., from FriendlyAuthenticator.search)"""
+        for result in results:
+            self.add(result['cui'], result['name'], result['source'])
+
+    @classmethod
+    def from_local_store(cls, db_path, languages=('ENG',), include_suppressible=False):
+        """Build from SQLite store created by `umls_api_tool.local.build_local_store`"""
+        index = cls()
+        conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+        sql = 'SELECT CUI, STR, SAB FROM conso WHERE 1 = 1'
+        args = []
+        if languages:
+            sql += f' AND LAT IN ({", ".join("?" for _ in languages)})'
+            args += list(languages)
+        if not include_suppressible:
+            sql += " AND SUPPRESS = 'N'"
+        # preferred names first so that these become the reported names
+        sql += " ORDER BY TS = 'P' DESC, ISPREF = 'Y' DESC, rowid"
+        for cui, name, source in conn.execute(sql, args):
+            index.add(cui, name, source)
+        conn.close()
+        index.freeze()
+        return index
+
+    @classmethod
+    def from_rrf(cls, mrconso_path, languages=('ENG',), include_suppressible=False):
+        """Build directly from MRCONSO.RRF"""
+        index = cls()
+        with open(mrconso_path, encoding='utf8') as fh:
+            for line in fh:
+                row = line.split('|')
+                cui, lat, ts, ispref, sab, name, suppress = row[0], row[1], row[2], row[6], row[11], row[14], row[16]
+                if languages and lat not in languages:
+                    continue
+                if not include_suppressible and suppress != 'N':
+                    continue
+                index.add(cui, name, sab, preferred_name=name if ts == 'P' and ispref == 'Y' else None)
+        index.freeze()
+        return index
+
+    def freeze(self):
+        """Build sorted structures used for prefix/suffix searches (done automatically when needed)"""
+        strings = sorted((string, entry_id) for string, ids in self._exact.items() for entry_id in ids)
+        self._strings = [string for string, _ in strings], [entry_id for _, entry_id in strings]
+        strings = sorted((string[::-1], entry_id) for string, entry_id in strings)
+        self._reversed_strings = [string for string, _ in strings], [entry_id for _, entry_id in strings]
+        self._tokens = sorted(self._postings)
+        self._token_buckets = defaultdict(list)
+        for token in self._tokens:
+            for position in (0, -1):
+                self._token_buckets[position, token[position], len(token)].append(token)
+
+    def save(self, path):
+        with open(path, 'wb') as fh:
+            pickle.dump(self.__dict__, fh, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        with open(path, 'rb') as fh:
+            index.__dict__.update(pickle.load(fh))
+        return index
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _prefix_range(sorted_strings, prefix):
+        """Slice of sorted list containing strings which start with `prefix`"""
+        return slice(
+            bisect.bisect_left(sorted_strings, prefix),
+            bisect.bisect_left(sorted_strings, prefix + '\U0010ffff'),
+        )
+
+    @staticmethod
+    def _contains(postings, entry_id):
+        i = bisect.bisect_left(postings, entry_id)
+        return i < len(postings) and postings[i] == entry_id
+
+    def _word_alternatives(self, token, approximate=False):
+        """Postings lists for words matching `token`"""
+        if not approximate:
+            return [self._postings.get(token, [])]
+        # any word starting with token, else close spellings
+        tokens = self._tokens[self._prefix_range(self._tokens, token)]
+        tokens = tokens or self._close_words(token)
+        return [self._postings[t] for t in tokens]
+
+    def _close_words(self, token):
+        """Up to 3 words spelled like `token`, compared only with words of similar length which share its first or
+        last character (rather than the whole vocabulary)"""
+        if self._token_buckets is None:  # e.g., index saved by an earlier version
+            self.freeze()
+        lengths = range(len(token) - APPROXIMATE_LENGTH_DIFFERENCE, len(token) + APPROXIMATE_LENGTH_DIFFERENCE + 1)
+        candidates = {
+            word for position in (0, -1) for length in lengths
+            for word in self._token_buckets.get((position, token[position], length), ())
+        }
+        return difflib.get_close_matches(token, candidates, n=3)
+
+    def _match_words(self, tokens, approximate=False):
+        """Entries containing every token: candidates from the rarest token are checked against the rest"""
+        alternatives = sorted(
+            (self._word_alternatives(token, approximate) for token in set(tokens)),
+            key=lambda lists: sum(len(postings) for postings in lists),
+        )
+        if not alternatives:
+            return []
+        candidates = sorted({entry_id for postings in alternatives[0] for entry_id in postings})
+        for lists in alternatives[1:]:
+            candidates = [
+                entry_id for entry_id in candidates
+                if any(self._contains(postings, entry_id) for postings in lists)
+            ]
+        return candidates
+
+    def _match(self, term, search_type):
+        lower = term.lower()
+        if search_type == 'exact':
+            return self._exact.get(lower, [])
+        elif search_type == 'normalizedString':
+            return self._normalized.get(normalize(term), [])
+        elif search_type in {'rightTruncation', 'leftTruncation'}:
+            # results in alphabetical order of matching strings
+            if search_type == 'rightTruncation':
+                strings, entry_ids = self._strings
+            else:
+                strings, entry_ids = self._reversed_strings
+                lower = lower[::-1]
+            matches = self._prefix_range(strings, lower)
+            return (entry_ids[i] for i in range(matches.start, matches.stop))
+        elif search_type in {'words', 'normalizedWords', 'approximate'}:
+            return self._match_words(tokenize(term), approximate=search_type == 'approximate')
+        raise ValueError(f'Unsupported searchType: {search_type}')
+
+    def search(self, term, sabs=None, searchType='words', max_results=None) -> Iterator[dict]:
+        """Yield {'cui', 'name', 'source'} for each matching concept (once per concept)
+
+        :param sabs: comma-separated string or list of source abbreviations to restrict matches to
+        :param searchType: see module docstring
+        :param max_results: stop after this many concepts
+        """
+        if self._strings is None and searchType in {'rightTruncation', 'leftTruncation', 'approximate'}:
+            self.freeze()
+        if isinstance(sabs, str):
+            sabs = sabs.split(',')
+        sabs = set(sabs) if sabs else None
+        found = set()
+        for entry_id in self._match(term, searchType):
+            cui, source = self._entries[entry_id]
+            if cui in found or (sabs and source not in sabs):
+                continue
+            found.add(cui)
+            yield {
+                'cui': cui,
+                'name': self._names[cui],
+                'source': source,
+            }
+            if max_results and len(found) >= max_results:
+                break
@@ -0,0 +1,94 @@
+"""
+Coalesce concurrent identical requests ("single-flight").
+
+While a request is in flight, other callers asking for the same key wait for and share its result
+(or exception) instead of sending their own request. Nothing is remembered once the request completes;
+use a `ResponseCache` for that.
+
+Usage:
+    flight = SingleFlight()
+    page = flight.do(make_cache_key(url, params), fetch, url, params)
+"""
+import threading
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Single-flight for threaded callers."""
+
+    def __init__(self):
+        self.executed = 0  # calls which were actually made
+        self.coalesced = 0  # calls which shared another call's result
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """Return `func(*args, **kwargs)`, or wait for the result of an in-flight call with the same `key`"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        return {'executed': self.executed, 'coalesced': self.coalesced, 'in_flight': len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """Single-flight for coroutines running in one event loop."""
+
+    def __init__(self):
+        self.executed = 0
+        self.coalesced = 0
+        self._calls = {}
+
+    async def do(self, key, func, *args, **kwargs):
+        """Return `await func(*args, **kwargs)`, or wait for an in-flight call with the same `key`
+
+        The call runs as a separate task, so cancelling one caller does not cancel it for the others.
+        """
+        import asyncio  # deferred: not needed by threaded users
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(func(*args, **kwargs))
+            task.add_done_callback(lambda t: self._finish(key, t))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # mark as retrieved in case every caller was cancelled
+
+    def stats(self):
+        return {'executed': self.executed, 'coalesced': self.coalesced, 'in_flight': len(self._calls)}
@@ -0,0 +1,125 @@
+"""Strategies for authenticating requests to the UTS REST API."""
+import queue
+import threading
+import time
+
+from umls_api_tool.cache import redact_auth_params
+from umls_api_tool.log import logger
+
+# https://documentation.uts.nlm.nih.gov/rest/authentication.html
+TGT_LIFETIME = 8 * 60 * 60  # seconds
+SERVICE_TICKET_LIFETIME = 5 * 60  # seconds
+TICKET_REFRESH_MARGIN = 0.1  # refresh after 90% of lifetime has elapsed
+
+
+def parse_form_action(text):
+    """Time granting ticket (url) from the form in the html returned by the CAS endpoint"""
+    import html.parser  # deferred: only needed once per time granting ticket
+
+    class FormActionParser(html.parser.HTMLParser):
+        action = None
+
+        def handle_starttag(self, tag, attrs):
+            if tag == 'form' and self.action is None:
+                self.action = dict(attrs).get('action')
+
+    parser = FormActionParser()
+    parser.feed(text)
+    parser.close()
+    if not parser.action:
+        raise ValueError(f'No time granting ticket in response: {text[:200]!r}')
+    return parser.action
+
+
+class ServiceTicketProvider:
+    """Request a new single-use service ticket before each request."""
+    uses_tickets = True
+
+    def __init__(self, authenticator):
+        self.auth = authenticator
+
+    def get_params(self):
+        """Parameters to add to the query string to authenticate a single request."""
+        return {'ticket': self.auth.get_service_ticket()}
+
+    def close(self):
+        pass
+
+
+class PrefetchTicketProvider(ServiceTicketProvider):
+    """Keep a bounded queue of service tickets filled by a background thread.
+
+    The thread is started when the first ticket is needed. Tickets older than `max_age` seconds are
+    discarded rather than handed out.
+    """
+
+    def __init__(self, authenticator, size=10, max_age=SERVICE_TICKET_LIFETIME * (1 - TICKET_REFRESH_MARGIN),
+                 timeout=30):
+        """
+
+        :param authenticator: BasicAuthenticator
+        :param size: maximum number of tickets waiting to be used
+        :param max_age: seconds before a prefetched ticket is considered stale
+        :param timeout: seconds to wait for the background thread before fetching a ticket directly
+        """
+        super().__init__(authenticator)
+        self.max_age = max_age
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=size)
+        self._stop = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def _start(self):
+        with self._thread_lock:
+            if self._thread is None and not self._stop.is_set():
+                self._thread = threading.Thread(target=self._fill, name='umls-ticket-prefetch', daemon=True)
+                self._thread.start()
+
+    def _fill(self):
+        while not self._stop.is_set():
+            try:
+                ticket = self.auth.get_service_ticket()
+            except Exception as e:
+                logger.error(f'Failed to prefetch service ticket: {redact_auth_params(str(e))}')
+                self._stop.wait(1)
+                continue
+            item = (time.monotonic(), ticket)
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(item, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+
+    def get_params(self):
+        if self._thread is None:
+            self._start()
+        while True:
+            try:
+                created, ticket = self._queue.get(timeout=self.timeout)
+            except queue.Empty:
+                logger.warning('No prefetched service ticket available; requesting one directly.')
+                return super().get_params()
+            if time.monotonic() - created < self.max_age:
+                return {'ticket': ticket}
+
+    def close(self):
+        self._stop.set()
+        with self._thread_lock:
+            if self._thread is not None:
+                self._thread.join(timeout=5)
+
+
+class ApiKeyProvider:
+    """Send the api key as a query parameter: no time granting or service tickets are required."""
+    uses_tickets = False
+
+    def __init__(self, authenticator):
+        self.auth = authenticator
+
+    def get_params(self):
+        return {'apiKey': self.auth.apikey}
+
+    def close(self):
+        pass
@@ -0,0 +1,27 @@
+import pytest
+
+from stub_server import StubUtsServer
+from umls_api_tool.auth import BasicAuthenticator
+from umls_api_tool.request_limiter import ForgetfulRequestLimiter
+
+
+@pytest.fixture
+def stub_server():
+    with StubUtsServer() as server:
+        yield server
+
+
+@pytest.fixture
+def make_auth(stub_server):
+    """Create BasicAuthenticators for the stub server (without rate limiting), closing them afterwards"""
+    authenticators = []
+
+    def make_auth(request_limiter=None, **kwargs):
+        auth = BasicAuthenticator('stub', request_limiter or ForgetfulRequestLimiter(), base_url=stub_server.base_url,
+                                  auth_url=stub_server.auth_url, **kwargs)
+        authenticators.append(auth)
+        return auth
+
+    yield make_auth
+    for auth in authenticators:
+        auth.close()
@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import pytest
+
+from umls_api_tool.auth import FriendlyAuthenticator
+from umls_api_tool.memo import LruMemo
+from umls_api_tool.request_limiter import TokenBucketRequestLimiter
+from umls_api_tool.tickets import TGT_LIFETIME
+
+pytest.importorskip('aiohttp')
+
+from umls_api_tool.async_auth import AsyncBasicAuthenticator, AsyncFriendlyAuthenticator  # noqa: E402
+
+
+def run_async(stub_server, method, *args, **kwargs):
+    async def run():
+        auth = AsyncFriendlyAuthenticator(
+            AsyncBasicAuthenticator('stub', TokenBucketRequestLimiter(10_000), base_url=stub_server.base_url,
+                                    auth_url=stub_server.auth_url),
+            version='2022AA', related_memo=LruMemo(),
+        )
+        async with auth:
+            result = getattr(auth, method)(*args, **kwargs)
+            if hasattr(result, '__aiter__'):
+                return [item async for item in result]
+            return await result
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize('method', ['get_details_for_cui', 'get_atoms_for_cui', 'get_relations_for_cui'])
+def test_same_results_as_sync(stub_server, make_auth, method):
+    auth = FriendlyAuthenticator(make_auth(), version='2022AA', related_memo=LruMemo())
+    expected = getattr(auth, method)('C0000001')
+    if not isinstance(expected, dict):
+        expected = list(expected)
+    assert run_async(stub_server, method, 'C0000001') == expected
+
+
+def test_error_url_is_redacted(stub_server):
+    messages = []
+    loguru = pytest.importorskip('loguru')
+    handler = loguru.logger.add(messages.append, level='ERROR')
+
+    async def run():
+        async with AsyncBasicAuthenticator('secret-key', base_url=stub_server.base_url,
+                                           auth_url=stub_server.auth_url, use_apikey_param=True) as auth:
+            return await auth.get('no', 'such', 'endpoint')
+
+    try:
+        assert asyncio.run(run()) == {'result': []}
+    finally:
+        loguru.logger.remove(handler)
+    assert messages
+    assert not any('secret-key' in message for message in messages)
+
+
+def test_time_granting_ticket_refreshed(stub_server):
+    loguru = pytest.importorskip('loguru')
+    warnings = []
+
+    async def run():
+        async with AsyncBasicAuthenticator('stub', base_url=stub_server.base_url,
+                                           auth_url=stub_server.auth_url) as auth:
+            tgt = await auth.ensure_time_granting_ticket()
+            expired = f'{stub_server.base_url}/cas/v1/expired'  # rejected by the stub server (404)
+            auth.time_granting_ticket, auth._tgt_created = expired, time.monotonic()
+            first = await auth.get('content', '2022AA', 'CUI', 'C0000001', 'atoms')
+            assert auth.time_granting_ticket == tgt  # forced refresh after rejection
+            handler = loguru.logger.add(warnings.append, level='WARNING')
+            auth.time_granting_ticket, auth._tgt_created = expired, time.monotonic() - TGT_LIFETIME
+            second = await auth.get('content', '2022AA', 'CUI', 'C0000001', 'atoms')
+            loguru.logger.remove(handler)
+            assert auth.time_granting_ticket == tgt and not warnings  # refreshed before being rejected
+            return first, second
+
+    first, second = asyncio.run(run())
+    assert first['result'] and first == second
+
+
+def test_failed_related_concept_not_remembered(stub_server):
+    memo = LruMemo()
+    relation = {'relatedId': f'{stub_server.base_url}/content/2022AA/AUI/A0000001'}
+
+    async def run():
+        auth = AsyncFriendlyAuthenticator(
+            AsyncBasicAuthenticator('stub', base_url=stub_server.base_url, auth_url=stub_server.auth_url,
+                                    use_apikey_param=True),
+            version='2022AA', related_memo=memo,
+        )
+        async with auth:
+            stub_server.faults, stub_server.fault_rate = [404], 1.0
+            failed = await auth._get_related_concept(relation)
+            stub_server.fault_rate = 0.0
+            return failed, relation['relatedId'] in memo, await auth._get_related_concept(relation)
+
+    assert asyncio.run(run()) == (None, False, ('C0000001', 'Concept C0000001'))
+    assert relation['relatedId'] in memo
@@ -0,0 +1,72 @@
+import sqlite3
+import threading
+
+import pytest
+
+from umls_api_tool.cache import MemoryCache, SqliteCache
+
+URL = 'https://uts-ws.nlm.nih.gov/rest/content/2022AA/CUI/{}'
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_cache(request, tmp_path):
+    caches = []
+
+    def make_cache(**kwargs):
+        if request.param == 'memory':
+            cache = MemoryCache(**kwargs)
+        else:
+            cache = SqliteCache(tmp_path / 'cache.db', **kwargs)
+        caches.append(cache)
+        return cache
+
+    yield make_cache
+    for cache in caches:
+        cache.close()
+
+
+def test_get_and_set(make_cache):
+    cache = make_cache()
+    assert cache.get(URL.format('C1'), {'ticket': 'ST-1'}) is None
+    cache.set(URL.format('C1'), {'ticket': 'ST-1'}, {'result': 1})
+    assert cache.get(URL.format('C1'), {'ticket': 'ST-2'}) == {'result': 1}  # ignoring authentication
+    assert cache.stats() == {'hits': 1, 'misses': 1}
+
+
+def test_stats_counted_from_threads(make_cache):
+    cache = make_cache()
+    cache.set(URL.format('C1'), {}, {'result': 1})
+
+    def worker():
+        for i in range(500):
+            cache.get(URL.format('C1' if i % 2 else 'C2'), {})
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats() == {'hits': 2000, 'misses': 2000}
+
+
+def test_least_recently_used_evicted(make_cache):
+    cache = make_cache(max_entries=3)
+    for cui in ('C1', 'C2', 'C3'):
+        cache.set(URL.format(cui), {}, {'result': cui})
+    assert cache.get(URL.format('C1'), {}) == {'result': 'C1'}
+    cache.set(URL.format('C4'), {}, {'result': 'C4'})
+    assert len(cache) == 3
+    assert cache.get(URL.format('C2'), {}) is None
+    assert cache.get(URL.format('C1'), {}) == {'result': 'C1'}
+
+
+def test_sqlite_access_times_written_on_close(tmp_path):
+    path = tmp_path / 'cache.db'
+    cache = SqliteCache(path)
+    cache.set(URL.format('C1'), {}, {'result': 1})
+    cache._conn.execute('UPDATE responses SET accessed = 0')
+    cache.get(URL.format('C1'), {})
+    assert cache._conn.execute('SELECT accessed FROM responses').fetchone()[0] == 0  # not yet written
+    cache.close()
+    with sqlite3.connect(str(path)) as conn:
+        assert conn.execute('SELECT accessed FROM responses').fetchone()[0] > 0
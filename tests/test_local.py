@@ -0,0 +1,97 @@
+from pathlib import Path
+
+import pytest
+
+from umls_api_tool.auth import FriendlyAuthenticator
+from umls_api_tool.local import LocalAuthenticator, build_local_store
+from umls_api_tool.memo import LruMemo
+
+RRF_DIR = Path(__file__).resolve().parent.parent / 'examples' / 'local' / 'rrf'
+
+
+@pytest.fixture(scope='module')
+def db_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp('local') / 'umls.db'
+    build_local_store(str(RRF_DIR), str(path), version='2022AA')
+    return path
+
+
+@pytest.fixture
+def auth(db_path):
+    with FriendlyAuthenticator(LocalAuthenticator(db_path), related_memo=LruMemo()) as auth:
+        yield auth
+
+
+def test_release(db_path):
+    with LocalAuthenticator(db_path) as auth:
+        assert auth.release == '2022AA'
+
+
+def test_details(auth):
+    assert auth.get_details_for_cui('C0000001') == {
+        'cui': 'C0000001', 'name': 'Fever', 'definition': 'An abnormal elevation of body temperature.',
+        'source': 'MSH', 'semtypes': ['Sign or Symptom'],
+    }
+    assert auth.get_details_for_cui('C0000005')['semtypes'] == ['Organic Chemical', 'Pharmacologic Substance']
+
+
+def test_details_unknown_concept(auth):
+    assert auth.get_details_for_cui('C9999999') is None
+
+
+def test_details_without_definition(auth):
+    details = auth.get_details_for_cui('C0000004')
+    assert (details['name'], details['definition'], details['source']) == ('Body temperature', '', '')
+
+
+@pytest.mark.parametrize('page_size', [1, 2, 25])
+def test_atoms(auth, page_size):
+    atoms = list(auth.get_atoms_for_cui('C0000001', pageSize=page_size))
+    assert [(atom['aui'], atom['name'], atom['source'], atom['termtype']) for atom in atoms] == [
+        ('A0000001', 'Fever', 'MSH', 'MH'),
+        ('A0000002', 'Fever', 'SNOMEDCT_US', 'PT'),
+        ('A0000003', 'Pyrexia', 'SNOMEDCT_US', 'SY'),
+        ('A0000004', 'Fiebre', 'MSHSPA', 'MH'),
+    ]
+
+
+def test_atoms_filters(auth):
+    assert [atom['aui'] for atom in auth.get_atoms_for_cui('C0000001', sabs='MSH,MSHSPA')] == ['A0000001', 'A0000004']
+    assert [atom['aui'] for atom in auth.get_atoms_for_cui('C0000002')] == ['A0000005', 'A0000006']
+    suppressible = auth.get_atoms_for_cui('C0000002', includeSuppressible='true')
+    assert [atom['aui'] for atom in suppressible] == ['A0000005', 'A0000006', 'A0000007']
+
+
+def test_definitions(auth):
+    assert list(auth.get_definitions_for_cui('C0000001', pageSize=1)) == [
+        {'cui': 'C0000001', 'source': 'MSH', 'definition': 'An abnormal elevation of body temperature.'},
+        {'cui': 'C0000001', 'source': 'NCI', 'definition': 'A body temperature above the normal range.'},
+    ]
+    assert [d['source'] for d in auth.get_definitions_for_cui('C0000001', sabs='NCI')] == ['NCI']
+    assert list(auth.get_definitions_for_cui('C0000004')) == []
+
+
+def test_relations(auth):
+    relations = auth.get_relations_for_cui('C0000001', pageSize=1)
+    assert [(r['target_cui'], r['name'], r['relation_label'], r['additional_relation_label']) for r in relations] == [
+        ('C0000003', 'Influenza, Human', 'RO', 'manifestation_of'),
+        ('C0000004', 'Body temperature', 'RO', 'interprets'),
+    ]
+    relations = auth.get_relations_for_cui('C0000001', sabs='MSH')
+    assert [(r['target_cui'], r['relation_label']) for r in relations] == [('C0000004', 'RB')]
+
+
+def test_search(auth):
+    assert list(auth.iter_search('fever')) == [{'cui': 'C0000001', 'name': 'Fever', 'source': 'MSH'}]
+    assert [result['cui'] for result in auth.iter_search('flu', searchType='exact')] == ['C0000003']
+    assert list(auth.iter_search('aspirin', sabs='SNOMEDCT_US')) == [
+        {'cui': 'C0000005', 'name': 'Aspirin', 'source': 'SNOMEDCT_US'},
+    ]
+    assert list(auth.iter_search('no such concept')) == []
+
+
+def test_search_pagination(auth):
+    expected = ['C0000001', 'C0000002', 'C0000003', 'C0000004', 'C0000005']
+    assert [result['cui'] for result in auth.iter_search('a', pageSize=2)] == expected
+    assert [result['cui'] for result in auth.iter_search('a', pageSize=2, max_results=3)] == expected[:3]
+    assert [result['cui'] for result in auth.search('a', pageSize=2)] == expected[:2]
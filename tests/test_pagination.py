@@ -0,0 +1,84 @@
+import pytest
+
+from stub_server import StubUtsServer
+from umls_api_tool.auth import FriendlyAuthenticator
+
+ITEMS = 103  # atoms per CUI: several pages, the last one partial
+ATOMS = ('content', '2022AA', 'CUI', 'C0000001', 'atoms')
+PAGE_SIZE = 10
+PAGE_COUNT = -(-ITEMS // PAGE_SIZE)
+
+
+def item_numbers(results):
+    return [int(item['ui'][1:]) for item in results]
+
+
+@pytest.fixture
+def stub_server():
+    with StubUtsServer(items_per_cui=ITEMS) as server:
+        yield server
+
+
+@pytest.fixture(params=[1, 4], ids=['sequential', 'parallel'])
+def auth(request, make_auth):
+    return make_auth(page_workers=request.param)
+
+
+def test_get_merges_all_pages_in_order(auth):
+    result = auth.get(*ATOMS, pageSize=PAGE_SIZE)
+    assert item_numbers(result['result']) == list(range(ITEMS))
+    assert result['pageNumber'] == 1
+    assert result['pageCount'] == PAGE_COUNT
+
+
+def test_iter_pages_yields_each_page_in_order(auth):
+    pages = list(auth.iter_pages(*ATOMS, pageSize=PAGE_SIZE))
+    assert [page['pageNumber'] for page in pages] == list(range(1, PAGE_COUNT + 1))
+    for page in pages:
+        start = (page['pageNumber'] - 1) * PAGE_SIZE
+        assert item_numbers(page['result']) == list(range(start, min(start + PAGE_SIZE, ITEMS)))
+
+
+def test_iter_results_stops_early(auth, stub_server):
+    results = list(auth.iter_results(*ATOMS, pageSize=PAGE_SIZE, parallel=False, max_items=15))
+    assert item_numbers(results) == list(range(15))
+    assert stub_server.request_count == 2
+
+
+@pytest.mark.parametrize('limit_pages', [1, 2, PAGE_COUNT - 1])
+def test_limit_pages(auth, limit_pages):
+    result = auth.get(*ATOMS, pageSize=PAGE_SIZE, limit_pages=limit_pages)
+    assert item_numbers(result['result']) == list(range(limit_pages * PAGE_SIZE))
+
+
+@pytest.mark.parametrize('limit_pages', [None, 0, PAGE_COUNT, PAGE_COUNT + 1])
+def test_limit_pages_includes_last_page(auth, limit_pages):
+    pages = list(auth.iter_pages(*ATOMS, pageSize=PAGE_SIZE, limit_pages=limit_pages))
+    assert [page['pageNumber'] for page in pages] == list(range(1, PAGE_COUNT + 1))
+    assert item_numbers(pages[-1]['result']) == list(range((PAGE_COUNT - 1) * PAGE_SIZE, ITEMS))
+
+
+def test_limit_pages_from_later_page(auth):
+    pages = list(auth.iter_pages(*ATOMS, pageSize=PAGE_SIZE, pageNumber=3, limit_pages=2))
+    assert [page['pageNumber'] for page in pages] == [3, 4]
+
+
+def test_single_page(auth):
+    result = auth.get(*ATOMS, pageSize=ITEMS)
+    assert result['pageCount'] == 1
+    assert item_numbers(result['result']) == list(range(ITEMS))
+
+
+def test_one_request_per_page(auth, stub_server):
+    auth.get(*ATOMS, pageSize=PAGE_SIZE)
+    assert stub_server.request_count == PAGE_COUNT
+
+
+def test_crosswalk_codes(auth):
+    friendly = FriendlyAuthenticator(auth, version='2022AA')
+    mappings = friendly.crosswalk('SNOMEDCT_US', '123', 'MSH', pageSize=PAGE_SIZE)
+    assert [m['target_code'] for m in mappings] == [f'MSH123-{i}' for i in range(ITEMS)]
+    assert {(m['source'], m['code'], m['target_source']) for m in mappings} == {('SNOMEDCT_US', '123', 'MSH')}
+    assert [(code, len(m)) for code, m in friendly.crosswalk_codes('SNOMEDCT_US', ['1', '2', '1'], 'MSH')] == [
+        ('1', ITEMS), ('2', ITEMS),
+    ]
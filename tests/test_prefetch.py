@@ -0,0 +1,27 @@
+from umls_api_tool.auth import FriendlyAuthenticator
+from umls_api_tool.cache import MemoryCache
+from umls_api_tool.memo import LruMemo
+from umls_api_tool.prefetch import prefetch
+
+CUIS = [f'C{i:07d}' for i in range(1, 11)]
+
+
+def test_prefetched_cuis_answered_from_cache(make_auth, stub_server):
+    cache = MemoryCache()
+    auth = FriendlyAuthenticator(make_auth(cache=cache), version='2022AA', related_memo=LruMemo())
+    assert list(prefetch(auth, CUIS, kinds=('details', 'atoms'))) == CUIS
+    request_count = stub_server.request_count
+    for cui in CUIS:
+        auth.get_details_for_cui(cui)
+        list(auth.get_atoms_for_cui(cui))
+    assert stub_server.request_count == request_count
+    assert auth.auth.auth.cache is cache
+
+
+def test_temporary_cache_removed_afterwards(make_auth):
+    auth = FriendlyAuthenticator(make_auth(), version='2022AA', related_memo=LruMemo())
+    prefetched = prefetch(auth, CUIS, kinds=('details',))
+    assert next(prefetched) == CUIS[0]
+    assert isinstance(auth.auth.auth.cache, MemoryCache)
+    assert list(prefetched) == CUIS[1:]
+    assert auth.auth.auth.cache is None
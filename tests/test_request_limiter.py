@@ -0,0 +1,165 @@
+import heapq
+import threading
+from bisect import bisect_left
+
+import pytest
+
+from umls_api_tool.request_limiter import (
+    CONTENT_ENDPOINT, MAX_REQUESTS_PER_SECOND, TICKET_ENDPOINT, EndpointRequestLimiter, TokenBucketRequestLimiter,
+    endpoint_ready,
+)
+
+N_REQUESTS = 200
+TICKET_BUDGET = 5
+MIXED = [TICKET_ENDPOINT] * 4 + [CONTENT_ENDPOINT] * 4
+
+
+class FakeClock:
+    """Virtual time shared by several threads: it only advances (to the earliest wake-up) once all running
+    threads are sleeping, so sleeping takes no real time."""
+
+    def __init__(self, n_threads=1):
+        self.now = 0.0
+        self._running = n_threads
+        self._wakeups = []
+        self._condition = threading.Condition()
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        with self._condition:
+            wakeup = self.now + seconds
+            heapq.heappush(self._wakeups, wakeup)
+            self._stopped()
+            while self.now < wakeup:
+                self._condition.wait()
+
+    def done(self):
+        """Call when a thread exits"""
+        with self._condition:
+            self._stopped()
+
+    def _stopped(self):
+        self._running -= 1
+        if self._running == 0 and self._wakeups:
+            self.now = self._wakeups[0]
+            while self._wakeups and self._wakeups[0] <= self.now:
+                heapq.heappop(self._wakeups)
+                self._running += 1
+            self._condition.notify_all()
+
+
+class LegacyRequestLimiter:
+    """User-defined limiter written before the endpoint was passed to `ready`"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def ready(self):
+        self.calls += 1
+
+
+class EndpointRecordingLimiter:
+
+    def __init__(self):
+        self.endpoints = []
+
+    def ready(self, endpoint=None):
+        self.endpoints.append(endpoint)
+
+
+def test_endpoint_ready_passes_endpoint_if_accepted():
+    limiter = EndpointRecordingLimiter()
+    endpoint_ready(limiter)(TICKET_ENDPOINT)
+    assert limiter.endpoints == [TICKET_ENDPOINT]
+
+
+def test_endpoint_ready_omits_endpoint_for_legacy_limiter():
+    limiter = LegacyRequestLimiter()
+    endpoint_ready(limiter)(CONTENT_ENDPOINT)
+    assert limiter.calls == 1
+
+
+def test_authenticator_with_legacy_limiter(make_auth):
+    limiter = LegacyRequestLimiter()
+    auth = make_auth(request_limiter=limiter)
+    assert auth.get('content', '2022AA', 'CUI', 'C0000001', 'atoms')['result']
+    assert limiter.calls == 3  # time granting ticket, service ticket and page
+
+
+def test_authenticator_passes_endpoint(make_auth):
+    limiter = EndpointRecordingLimiter()
+    auth = make_auth(request_limiter=limiter)
+    auth.get('content', '2022AA', 'CUI', 'C0000001', 'atoms')
+    assert limiter.endpoints == [TICKET_ENDPOINT, TICKET_ENDPOINT, CONTENT_ENDPOINT]
+
+
+def max_in_window(timestamps, window=1.0):
+    """Largest number of requests sent within any half-open window of `window` seconds"""
+    timestamps = sorted(timestamps)
+    return max(
+        i - bisect_left(timestamps, ts - window + 1e-9) + 1
+        for i, ts in enumerate(timestamps)
+    )
+
+
+def send_requests(limiter_factory, endpoints):
+    """One thread per item of `endpoints`, each sending requests to that endpoint as soon as the limiter allows
+
+    :return: (virtual time, endpoint) of each request, time at which the first thread finished
+    """
+    clock = FakeClock(len(endpoints))
+    limiter = limiter_factory(clock)
+    sent = []
+    finished = []
+    lock = threading.Lock()
+
+    def worker(endpoint):
+        for _ in range(N_REQUESTS // len(endpoints)):
+            limiter.ready(endpoint)
+            with lock:
+                sent.append((clock(), endpoint))
+        finished.append(clock())
+        clock.done()
+
+    threads = [threading.Thread(target=worker, args=(endpoint,)) for endpoint in endpoints]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sent, min(finished)
+
+
+def sustained_rate(timestamps, end):
+    """Requests/second while all threads are sending"""
+    return (sum(ts <= end for ts in timestamps) - 1) / (end - min(timestamps))
+
+
+def token_bucket(clock):
+    return TokenBucketRequestLimiter(clock=clock, sleep=clock.sleep)
+
+
+def endpoint_limiter(clock):
+    return EndpointRequestLimiter(budgets={TICKET_ENDPOINT: TICKET_BUDGET}, clock=clock, sleep=clock.sleep)
+
+
+@pytest.mark.parametrize('limiter_factory, endpoints', [
+    (token_bucket, [None]),
+    (token_bucket, MIXED),
+    (endpoint_limiter, [TICKET_ENDPOINT, CONTENT_ENDPOINT]),
+    (endpoint_limiter, MIXED),
+], ids=['token-bucket', 'token-bucket-mixed', 'endpoint', 'endpoint-mixed'])
+def test_limit_respected_and_used(limiter_factory, endpoints):
+    sent, end = send_requests(limiter_factory, endpoints)
+    timestamps = [ts for ts, _ in sent]
+    assert len(timestamps) == N_REQUESTS
+    assert max_in_window(timestamps) <= MAX_REQUESTS_PER_SECOND
+    assert sustained_rate(timestamps, end) > 0.95 * MAX_REQUESTS_PER_SECOND
+
+
+@pytest.mark.parametrize('endpoints', [[TICKET_ENDPOINT, CONTENT_ENDPOINT], MIXED], ids=['1+1', '4+4'])
+def test_endpoint_budget_respected(endpoints):
+    sent, _ = send_requests(endpoint_limiter, endpoints)
+    tickets = [ts for ts, endpoint in sent if endpoint == TICKET_ENDPOINT]
+    assert max_in_window(tickets) <= TICKET_BUDGET
@@ -0,0 +1,100 @@
+import pytest
+
+from stub_server import StubUtsServer
+from umls_api_tool.auth import FriendlyAuthenticator
+from umls_api_tool.memo import LruMemo
+from umls_api_tool.retry import RetryPolicy, parse_retry_after
+from umls_api_tool.tickets import ServiceTicketProvider
+
+ITEMS = 30
+
+
+@pytest.fixture
+def stub_server():
+    with StubUtsServer(items_per_cui=ITEMS, fault_rate=0.2, retry_after=1, seed=1) as server:
+        yield server
+
+
+class RecordingRetryPolicy(RetryPolicy):
+    """Retry policy recording its delays instead of sleeping"""
+
+    def __init__(self, **kwargs):
+        self.delays = []
+        super().__init__(sleep=self.delays.append, **kwargs)
+
+
+class RejectedOnceTicketProvider(ServiceTicketProvider):
+    """Send an invalid ticket with the first request"""
+
+    def __init__(self, authenticator):
+        super().__init__(authenticator)
+        self.rejected = False
+
+    def get_params(self):
+        if not self.rejected:
+            self.rejected = True
+            return {'ticket': 'ST-invalid'}
+        return super().get_params()
+
+
+@pytest.mark.parametrize('value, expected', [(None, None), ('', None), ('soon', None), (0, 0.0), ('0', 0.0),
+                                             ('2.5', 2.5), ('-1', 0.0)])
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_retry_after_zero_is_immediate():
+    assert RetryPolicy(backoff=1.0).get_delay(3, retry_after=0) == 0.0
+
+
+def test_backoff_without_retry_after():
+    policy = RetryPolicy(backoff=0.5, jitter=0.5, max_backoff=3.0)
+    assert 0.5 <= policy.get_delay(0) <= 0.75
+    assert 1.0 <= policy.get_delay(1) <= 1.5
+    assert policy.get_delay(10) == 3.0
+
+
+def test_all_pages_retrieved_despite_faults(make_auth, stub_server):
+    auth = make_auth(retry_policy=RecordingRetryPolicy(max_retries=8, backoff=0.001))
+    for i in range(40):
+        data = auth.get('content', '2022AA', 'CUI', f'C{i:07d}', 'atoms', pageSize=10)
+        assert [item['ui'] for item in data['result']] == [f'A{j:07d}' for j in range(ITEMS)]
+    assert set(stub_server.fault_counts) == {429, 502, 503, 'reset'}
+    assert len(auth.retry_policy.delays) == sum(stub_server.fault_counts.values())  # one retry per fault
+    assert 1.0 in auth.retry_policy.delays  # Retry-After of 429 responses
+
+
+def test_rejected_ticket_retried_without_delay(make_auth, stub_server):
+    stub_server.fault_rate = 0.0
+    auth = make_auth(retry_policy=RecordingRetryPolicy(), ticket_provider=RejectedOnceTicketProvider)
+    data = auth.get('content', '2022AA', 'CUI', 'C0000001', 'atoms', pageSize=ITEMS)
+    assert auth.ticket_provider.rejected
+    assert len(data['result']) == ITEMS
+    assert auth.retry_policy.delays == []
+
+
+def test_time_granting_ticket_not_logged(make_auth, stub_server):
+    loguru = pytest.importorskip('loguru')
+    messages = []
+    handler = loguru.logger.add(messages.append, level='WARNING')
+    try:
+        auth = make_auth(retry_policy=RecordingRetryPolicy(max_retries=8, backoff=0.001))
+        for i in range(40):
+            auth.get('content', '2022AA', 'CUI', f'C{i:07d}', 'atoms', pageSize=ITEMS)
+    finally:
+        loguru.logger.remove(handler)
+    assert any('/cas/v1/tickets/TGT-***' in message for message in messages)
+    assert not any('TGT-stub' in message for message in messages)
+
+
+def test_failed_related_concept_not_remembered(make_auth, stub_server):
+    memo = LruMemo()
+    auth = FriendlyAuthenticator(make_auth(retry_policy=RecordingRetryPolicy(max_retries=0)), version='2022AA',
+                                 related_memo=memo)
+    related_id = f'{stub_server.base_url}/content/2022AA/AUI/A0000001'
+    stub_server.faults, stub_server.fault_rate = [404], 1.0
+    assert auth._get_related_concept(related_id) is None
+    assert related_id not in memo
+    stub_server.fault_rate = 0.0
+    assert auth._get_related_concept(related_id) == ('C0000001', 'Concept C0000001')
+    assert related_id in memo
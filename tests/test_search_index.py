@@ -0,0 +1,34 @@
+import pytest
+
+from umls_api_tool.search_index import TermIndex
+
+
+@pytest.fixture(scope='module')
+def index():
+    index = TermIndex()
+    for cui, name in [('C1', 'Myocardial infarction'), ('C2', 'Heart attack'), ('C3', 'Fever'),
+                      ('C4', 'Influenza'), ('C5', 'Heart failure')]:
+        index.add(cui, name, 'MSH')
+    return index
+
+
+def cuis(index, term, search_type):
+    return [result['cui'] for result in index.search(term, searchType=search_type)]
+
+
+@pytest.mark.parametrize('term, expected', [
+    ('heart', ['C2', 'C5']),
+    ('hea', ['C2', 'C5']),  # prefix
+    ('myocardail infraction', ['C1']),  # transposed letters
+    ('nfluenza', ['C4']),  # first letter missing
+    ('vever', ['C3']),  # first letter wrong
+    ('feverr', ['C3']),
+    ('xyz', []),
+])
+def test_approximate(index, term, expected):
+    assert cuis(index, term, 'approximate') == expected
+
+
+def test_words(index):
+    assert cuis(index, 'attack heart', 'words') == ['C2']
+    assert cuis(index, 'hea', 'words') == []